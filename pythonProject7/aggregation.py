@@ -0,0 +1,191 @@
+"""Операторы агрегации оценок экспертов и схемы весов экспертов.
+
+Оператор получает тензор нормализованных оценок (альтернативы ×
+критерии × эксперты), маску заполненных ячеек и вектор весов экспертов
+(сумма 1) и возвращает матрицу (альтернативы × критерии). Все операторы
+— свертки по оси экспертов на NumPy, без циклов по оценкам:
+  mean         — средневзвешенное; отсутствующая оценка считается нулем
+                 (исходное поведение DecisionMaker);
+  geometric    — взвешенное среднее геометрическое;
+  median       — взвешенная медиана;
+  trimmed_mean — средневзвешенное после отбрасывания доли trim крайних
+                 оценок с каждой стороны;
+  owa          — взвешенное OWA (WOWA) с квантификатором «большинство»
+                 Q(r) = (r - a) / (b - a) на [a, b]: крайние оценки с
+                 накопленным весом вне [a, b] не учитываются.
+Кроме mean, операторы учитывают только экспертов, оценивших ячейку, с
+перенормировкой их весов.
+
+Схема весов экспертов строит вектор весов по RatingStore:
+  uniform    — равные веса;
+  competence — пропорционально компетентности эксперта (Expert.contact);
+               эксперты без числовой компетентности получают среднюю.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+AGGREGATION_MEAN = 'mean'
+WEIGHTING_UNIFORM = 'uniform'
+WEIGHTING_COMPETENCE = 'competence'
+
+# Оператор: (значения, маска, веса экспертов, параметры) -> (альтернативы × критерии)
+Operator = Callable[..., np.ndarray]
+
+OPERATORS: Dict[str, Operator] = {}
+EXPERT_WEIGHTINGS: Dict[str, Callable[[List[str], Optional[Dict[str, float]]], np.ndarray]] = {}
+
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+# Допуск при сравнении накопленных весов с половиной (взвешенная медиана)
+_EPS = 1e-9
+
+
+def register_operator(name: str):
+    def decorator(func: Operator) -> Operator:
+        OPERATORS[name] = func
+        return func
+    return decorator
+
+
+def register_weighting(name: str):
+    def decorator(func):
+        EXPERT_WEIGHTINGS[name] = func
+        return func
+    return decorator
+
+
+def aggregate(name: str,
+              values: np.ndarray,
+              mask: np.ndarray,
+              weights: np.ndarray,
+              options: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    if name not in OPERATORS:
+        raise ValueError(f"Неизвестный оператор агрегации: {name}. Доступны: {', '.join(OPERATORS)}")
+    return OPERATORS[name](values, mask, weights, **(options or {}))
+
+
+def weighting_vector(name: str,
+                     experts: List[str],
+                     competence: Optional[Dict[str, float]] = None) -> np.ndarray:
+    if name not in EXPERT_WEIGHTINGS:
+        raise ValueError(f"Неизвестная схема весов экспертов: {name}. "
+                         f"Доступны: {', '.join(EXPERT_WEIGHTINGS)}")
+    return EXPERT_WEIGHTINGS[name](experts, competence)
+
+
+def parse_competence(text: Optional[str]) -> Optional[float]:
+    """Компетентность из произвольной строки: «8», «0,7», «8/10».
+
+    Берется первое число (или дробь a/b); None, если числа нет или оно
+    не положительное.
+    """
+    if not text:
+        return None
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        return None
+    value = float(numbers[0].replace(',', '.'))
+    if len(numbers) > 1 and re.search(r'\d\s*/\s*\d', text):
+        denominator = float(numbers[1].replace(',', '.'))
+        value = value / denominator if denominator else 0.0
+    return value if value > 0 else None
+
+
+@register_weighting(WEIGHTING_UNIFORM)
+def uniform_weights(experts: List[str], competence: Optional[Dict[str, float]] = None) -> np.ndarray:
+    #Равномерное распределение весов между экспертами
+    if not experts:
+        return np.zeros(0)
+    return np.full(len(experts), 1.0 / len(experts))
+
+
+@register_weighting(WEIGHTING_COMPETENCE)
+def competence_weights(experts: List[str], competence: Optional[Dict[str, float]] = None) -> np.ndarray:
+    #Веса пропорционально компетентности; без данных — равные
+    known = np.array([(competence or {}).get(e) or np.nan for e in experts], dtype=float)
+    if not experts or np.isnan(known).all():
+        return uniform_weights(experts)
+    known[np.isnan(known)] = np.nanmean(known)
+    return known / known.sum()
+
+
+def _cell_weights(mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    #Веса экспертов по ячейкам, перенормированные на оценивших ячейку
+    cell = np.where(mask, weights[np.newaxis, np.newaxis, :], 0.0)
+    total = cell.sum(axis=2, keepdims=True)
+    return np.divide(cell, total, out=np.zeros_like(cell), where=total > 0)
+
+
+def _sorted_by_value(values: np.ndarray, mask: np.ndarray, weights: np.ndarray, descending: bool = False):
+    """Значения и перенормированные веса, упорядоченные по оси экспертов.
+
+    Отсутствующие оценки уходят в конец и имеют нулевой вес.
+    """
+    keys = np.where(mask, -values if descending else values, np.inf)
+    order = np.argsort(keys, axis=2, kind='stable')
+    ordered = np.take_along_axis(values, order, axis=2)
+    cell = np.take_along_axis(_cell_weights(mask, weights), order, axis=2)
+    return ordered, cell
+
+
+@register_operator(AGGREGATION_MEAN)
+def weighted_mean(values: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # Сумма по всем экспертам: неоцененная ячейка вносит ноль
+    return np.einsum('ace,e->ac', np.where(mask, values, 0.0), weights)
+
+
+@register_operator('geometric')
+def weighted_geometric_mean(values: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    cell = _cell_weights(mask, weights)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.where(mask, np.log(values), 0.0)
+        # Нулевая оценка обращает среднее геометрическое в ноль
+        result = np.exp(np.where(cell > 0, logs * cell, 0.0).sum(axis=2))
+    return np.where(mask.any(axis=2), np.nan_to_num(result), 0.0)
+
+
+@register_operator('median')
+def weighted_median(values: np.ndarray, mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Взвешенная медиана; при равных весах и четном числе оценок —
+    среднее двух центральных, как у np.median."""
+    ordered, cell = _sorted_by_value(values, mask, weights)
+    cumulative = np.cumsum(cell, axis=2)
+    # Первые позиции, где накопленный вес достигает и превышает половину
+    lower = np.argmax(cumulative >= 0.5 - _EPS, axis=2)[..., np.newaxis]
+    upper = np.argmax(cumulative > 0.5 + _EPS, axis=2)[..., np.newaxis]
+    result = (np.take_along_axis(ordered, lower, axis=2) + np.take_along_axis(ordered, upper, axis=2)) / 2
+    return np.where(mask.any(axis=2), result[..., 0], 0.0)
+
+
+@register_operator('trimmed_mean')
+def weighted_trimmed_mean(values: np.ndarray, mask: np.ndarray, weights: np.ndarray,
+                          trim: float = 0.2) -> np.ndarray:
+    """Отбрасывается floor(trim · n) наименьших и наибольших оценок ячейки,
+    где n — число оценивших ее экспертов."""
+    if not 0 <= trim < 0.5:
+        raise ValueError("Доля отбрасываемых оценок должна быть в [0, 0.5)")
+    order = np.argsort(np.where(mask, values, np.inf), axis=2, kind='stable')
+    count = mask.sum(axis=2, keepdims=True)
+    cut = np.floor(count * trim)
+    position = np.arange(values.shape[2])[np.newaxis, np.newaxis, :]
+    keep = (position >= cut) & (position < count - cut)
+    kept_mask = np.zeros_like(mask)
+    np.put_along_axis(kept_mask, order, keep, axis=2)
+    cell = _cell_weights(kept_mask, weights)
+    return (np.where(kept_mask, values, 0.0) * cell).sum(axis=2)
+
+
+@register_operator('owa')
+def weighted_owa(values: np.ndarray, mask: np.ndarray, weights: np.ndarray,
+                 a: float = 0.1, b: float = 0.9) -> np.ndarray:
+    """WOWA по Торре: оценки по убыванию, вес позиции i равен
+    Q(S_i) - Q(S_{i-1}), где S — накопленные веса экспертов. При a=0, b=1
+    совпадает со средневзвешенным по оценившим."""
+    if not 0 <= a < b <= 1:
+        raise ValueError("Параметры квантификатора должны удовлетворять 0 <= a < b <= 1")
+    ordered, cell = _sorted_by_value(values, mask, weights, descending=True)
+    cumulative = np.cumsum(cell, axis=2)
+    quantified = np.clip((cumulative - a) / (b - a), 0.0, 1.0)
+    positional = np.diff(quantified, axis=2, prepend=0.0)
+    return (np.where(positional > 0, ordered, 0.0) * positional).sum(axis=2)
@@ -1,24 +1,129 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask import Flask, render_template, url_for, request, redirect
-from flask import session, flash
+from flask import session, flash, jsonify, make_response, send_file, abort
 from datetime import datetime
+import click
 import json
+import logging
 from pathlib import Path
 from data_parser import parse_input
-from decision_maker import DecisionMaker
+from decision_maker import DecisionMaker, decision_options
 from excel_exporter import ExcelExporter
+from incremental_scoring import IncrementalScore, expert_previous_values, record_submission
+import incremental_scoring
+import aggregation
+import mcdm
+import result_cache
+import sensitivity
+import solver_client
+import solver_backends
+import result_store
+import export_jobs
+import login_cache
+import metrics
+from solver_client import SolverError
+from functools import partial
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, or_, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from scale_cache import parsed_scale
+from compiled_scales import compile_scale
+from rating_ingest import collect_submission, store_ratings
+from rating_store import RatingStore
+from migrations import upgrade as upgrade_schema
+from db_config import configure_database, install_sqlite_pragmas
+import scale_cache
 import os
+import sys
+
+# При запуске python app.py модуль называется __main__, а модули приложения
+# берут db и модели через from app import ...; без этой записи они загрузили
+# бы app.py второй раз — со своим экземпляром Flask, базой и кэшами
+sys.modules.setdefault('app', sys.modules[__name__])
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 # Подключение к базе данных
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'kursach.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# URI, PRAGMA SQLite и пул соединений (переопределяются переменными окружения)
+configure_database(app, 'sqlite:///' + os.path.join(basedir, 'kursach.db'))
+# Кэш результатов расчета: лимит памяти и необязательный файл на диске
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['RESULT_CACHE_PATH'] = os.environ.get('RESULT_CACHE_PATH')
+# Повторная отправка оценок экспертом заменяет прежние, а не дублирует их
+app.config['RATINGS_UPSERT'] = os.environ.get('RATINGS_UPSERT', '1') != '0'
+# Оператор агрегации оценок экспертов (aggregation.OPERATORS), его параметры
+# в JSON и схема весов экспертов (uniform или competence по Expert.contact)
+app.config['AGGREGATION'] = os.environ.get('AGGREGATION', aggregation.AGGREGATION_MEAN)
+app.config['AGGREGATION_OPTIONS'] = json.loads(os.environ.get('AGGREGATION_OPTIONS') or '{}')
+app.config['EXPERT_WEIGHTING'] = os.environ.get('EXPERT_WEIGHTING', aggregation.WEIGHTING_UNIFORM)
+# Метод выбора (mcdm.METHODS: weighted_sum, topsis, vikor, ahp) и его параметры в JSON
+app.config['METHOD'] = os.environ.get('METHOD', mcdm.METHOD_WEIGHTED_SUM)
+app.config['METHOD_OPTIONS'] = json.loads(os.environ.get('METHOD_OPTIONS') or '{}')
+result_cache.configure(max_bytes=app.config['RESULT_CACHE_MAX_BYTES'],
+                       disk_path=app.config['RESULT_CACHE_PATH'],
+                       decision_options=decision_options(app.config))
+# Кэш входа экспертов: время жизни найденных и ненайденных записей, с
+app.config['LOGIN_CACHE'] = os.environ.get('LOGIN_CACHE', '1') != '0'
+app.config['LOGIN_CACHE_TTL'] = float(os.environ.get('LOGIN_CACHE_TTL', login_cache.DEFAULT_TTL))
+app.config['LOGIN_CACHE_NEGATIVE_TTL'] = float(os.environ.get('LOGIN_CACHE_NEGATIVE_TTL',
+                                                              login_cache.DEFAULT_NEGATIVE_TTL))
+login_cache.configure(ttl=app.config['LOGIN_CACHE_TTL'],
+                      negative_ttl=app.config['LOGIN_CACHE_NEGATIVE_TTL'])
+# Анализ чувствительности в /manager_archive/<id>/sensitivity: выборок по
+# умолчанию и предел на один запрос
+app.config['SENSITIVITY_SAMPLES'] = int(os.environ.get('SENSITIVITY_SAMPLES', 2000))
+app.config['SENSITIVITY_MAX_SAMPLES'] = int(os.environ.get('SENSITIVITY_MAX_SAMPLES', 20000))
+# Запросов на одной странице архива менеджера
+app.config['ARCHIVE_PAGE_SIZE'] = int(os.environ.get('ARCHIVE_PAGE_SIZE', 20))
+# Строк рейтинга на странице результата по умолчанию и предел для ?size=
+app.config['RESULT_PAGE_SIZE'] = int(os.environ.get('RESULT_PAGE_SIZE', 20))
+app.config['RESULT_MAX_PAGE_SIZE'] = int(os.environ.get('RESULT_MAX_PAGE_SIZE', 500))
+# Сколько лучших мест рейтинга показывать и выгружать (0 — весь рейтинг);
+# переопределяется параметром top у /decision_result и выгрузок.
+# Рассчитывается и сохраняется всегда полный рейтинг
+app.config['RESULT_TOP_K'] = int(os.environ.get('RESULT_TOP_K', 0)) or None
+# Каталог готовых выгрузок и число потоков, которые их строят
+app.config['EXPORT_DIR'] = os.environ.get('EXPORT_DIR', os.path.join(basedir, 'exports'))
+app.config['EXPORT_WORKERS'] = int(os.environ.get('EXPORT_WORKERS', 2))
+export_jobs.configure(app.config['EXPORT_DIR'], workers=app.config['EXPORT_WORKERS'])
+# Инструментирование (metrics.py): /metrics, журнал запросов дольше
+# SLOW_REQUEST_MS (0 — выключен) и выборочный профилировщик для доли
+# запросов PROFILE_RATE с записью профилей в PROFILE_DIR
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') != '0'
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+app.config['PROFILE_RATE'] = float(os.environ.get('PROFILE_RATE', 0))
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(basedir, 'profiles'))
+# Решатель: inprocess (DecisionMaker по таблицам запроса) или http (внешний сервис)
+app.config['SOLVER_BACKEND'] = os.environ.get('SOLVER_BACKEND', solver_backends.InProcessSolverBackend.name)
+# Внешний решатель: адрес, таймауты, повторы и фоновые задания
+app.config['SOLVER_URL'] = os.environ.get('SOLVER_URL', solver_client.DEFAULT_URL)
+app.config['SOLVER_CONNECT_TIMEOUT'] = float(os.environ.get('SOLVER_CONNECT_TIMEOUT', 3))
+app.config['SOLVER_READ_TIMEOUT'] = float(os.environ.get('SOLVER_READ_TIMEOUT', 60))
+app.config['SOLVER_RETRIES'] = int(os.environ.get('SOLVER_RETRIES', 3))
+app.config['SOLVER_BACKOFF'] = float(os.environ.get('SOLVER_BACKOFF', 0.5))
+app.config['SOLVER_POOL_SIZE'] = int(os.environ.get('SOLVER_POOL_SIZE', 10))
+app.config['SOLVER_WORKERS'] = int(os.environ.get('SOLVER_WORKERS', 4))
+# Обращение к решателю в фоне: /send_decision не ждет ответа
+app.config['SOLVER_ASYNC'] = os.environ.get('SOLVER_ASYNC', '1') != '0'
+solver_client.configure(url=app.config['SOLVER_URL'],
+                        connect_timeout=app.config['SOLVER_CONNECT_TIMEOUT'],
+                        read_timeout=app.config['SOLVER_READ_TIMEOUT'],
+                        retries=app.config['SOLVER_RETRIES'],
+                        backoff=app.config['SOLVER_BACKOFF'],
+                        pool_size=app.config['SOLVER_POOL_SIZE'])
+solver_backends.configure(app.config['SOLVER_BACKEND'],
+                          client=solver_client.default_client,
+                          workers=app.config['SOLVER_WORKERS'])
 
 # Инициализация базы
 db = SQLAlchemy(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config)
+    metrics.install(app, db.engine)
 
 # МОДЕЛИ
 class Manager(db.Model):
@@ -45,6 +150,15 @@ class Request(db.Model):
         nullable=False
     )
     is_active = db.Column(db.Boolean, default=True)
+    # Увеличивается при каждой записи оценок (см. rating_ingest.store_ratings)
+    ratings_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Счетчики прогресса для архива: участников ведут триггеры базы
+    # (migrations.py), оценки и сдавших экспертов — store_ratings
+    experts_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    alternatives_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    criteria_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    ratings_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    experts_submitted = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Добавляем внешний ключ для связи с Manager
     manager_id = db.Column(db.Integer, db.ForeignKey('managers.id'), nullable=False)
@@ -54,12 +168,27 @@ class Request(db.Model):
     alternatives = db.relationship('Alternative', backref='request', cascade='all, delete-orphan')
     criteria = db.relationship('Criterion', backref='request', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_requests_manager_created', 'manager_id', 'created_at', 'id'),
+    )
+
+    @property
+    def expected_ratings(self):
+        return self.experts_count * self.alternatives_count * self.criteria_count
+
+    @property
+    def completion(self):
+        #Процент заполнения матрицы оценок
+        if not self.expected_ratings:
+            return 0
+        return min(100, round(100 * self.ratings_count / self.expected_ratings))
+
 class Expert(db.Model):
     __tablename__ = 'experts'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     contact = db.Column(db.String(100))
-    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False, index=True)
 
     # Исправленная связь
     ratings = db.relationship('Rating', back_populates='expert', cascade='all, delete-orphan')
@@ -80,7 +209,7 @@ class Criterion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     is_qualitative = db.Column(db.Boolean, default=False)
-    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False, index=True)
     scale_id = db.Column(db.Integer, db.ForeignKey('scales.id'), nullable=False)
 
     # Исправленная связь
@@ -91,7 +220,7 @@ class Alternative(db.Model):
     __tablename__ = 'alternatives'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), nullable=False, index=True)
 
     # Исправленная связь
     ratings = db.relationship('Rating', back_populates='alternative')
@@ -105,6 +234,18 @@ class Rating(db.Model):
     criterion_id = db.Column(db.Integer, db.ForeignKey('criteria.id'), nullable=False)
     expert_id = db.Column(db.Integer, db.ForeignKey('experts.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Денормализованные поля для чтения матрицы оценок без разбора строк
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'))
+    numeric_value = db.Column(db.Float)  # значение числовой шкалы
+    scale_index = db.Column(db.SmallInteger)  # позиция значения лингвистической шкалы
+
+    # Индексы под основные запросы (см. migrations.py)
+    __table_args__ = (
+        db.Index('ix_ratings_expert_id', 'expert_id'),
+        db.Index('ix_ratings_criterion_alternative', 'criterion_id', 'alternative_id'),
+        db.Index('ix_ratings_request_matrix', 'request_id', 'alternative_id', 'criterion_id',
+                 'expert_id', 'numeric_value', 'scale_index'),
+    )
 
     # Исправленные связи
     alternative = db.relationship('Alternative', back_populates='ratings')
@@ -118,11 +259,189 @@ class DecisionRequest(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     result_summary = db.Column(db.String(500))
 
+class ScoreState(db.Model):
+    __tablename__ = 'score_states'
+    # Состояние инкрементального пересчета (см. incremental_scoring.py)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Request.ratings_version, до которой учтены оценки; -1 — неизвестна
+    ratings_version = db.Column(db.Integer, nullable=False, default=-1, server_default='-1')
+    payload = db.Column(db.LargeBinary, nullable=False)  # массивы NumPy (npz)
+    meta = db.Column(db.Text, nullable=False)  # имена и веса в JSON
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RequestResult(db.Model):
+    __tablename__ = 'request_results'
+    # Последний рассчитанный результат запроса (см. result_store.py)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id'), primary_key=True)
+    etag = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)  # JSON по столбцам, сжатый zlib
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Схема базы приводится к актуальной версии при запуске сервера (python app.py);
+# импорт модуля базу не меняет
+app.config['AUTO_MIGRATE'] = os.environ.get('AUTO_MIGRATE', '1') != '0'
+
+
+def init_database():
+    """Создание таблиц и применение миграций (migrations.py) к базе
+    SQLALCHEMY_DATABASE_URI; возвращает версию схемы. Вызывается явно:
+    init_db.py, flask --app app init-db или запуск app.py."""
+    with app.app_context():
+        db.create_all()
+        return upgrade_schema(db.engine)
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    #Создание и обновление схемы базы из командной строки
+    logging.basicConfig(level=logging.INFO)
+    click.echo(f"Версия схемы: {init_database()}")
+
+
+@app.cli.command('check-scores')
+@click.argument('request_ids', nargs=-1, type=int)
+@click.option('--rebuild', is_flag=True, help='Перестроить несогласованные состояния')
+def check_scores_command(request_ids, rebuild):
+    """Сверка состояний инкрементального пересчета с полным расчетом
+    DecisionMaker; без аргументов — все сохраненные состояния. Код
+    возврата 1, если есть расхождения (и не задан --rebuild)."""
+    if not request_ids:
+        request_ids = [request_id for request_id, in
+                       db.session.query(ScoreState.request_id).order_by(ScoreState.request_id)]
+    inconsistent = 0
+    for request_id in request_ids:
+        # Устаревшее состояние load удаляет: оно будет построено при следующем расчете
+        state = IncrementalScore.load(request_id)
+        if state is None:
+            click.echo(f"Запрос {request_id}: состояния нет")
+            continue
+        mismatches = state.check_consistency()
+        if not mismatches:
+            click.echo(f"Запрос {request_id}: согласовано")
+            continue
+        inconsistent += 1
+        click.echo(f"Запрос {request_id}: расходятся оценки {', '.join(mismatches)}")
+        if rebuild:
+            incremental_scoring.drop_score_state(request_id)
+            incremental_scoring.build_score_state(request_id)
+    if inconsistent and not rebuild:
+        raise SystemExit(1)
+
+
+@event.listens_for(Scale, 'after_update')
+@event.listens_for(Scale, 'after_delete')
+def invalidate_parsed_scale(mapper, connection, target):
+    scale_cache.invalidate(target.id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_rated_requests(session, flush_context):
+    # Запоминаем запросы, у которых меняются оценки, чтобы сбросить кэш после коммита
+    expert_ids = {
+        obj.expert_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Rating)
+    }
+    if expert_ids:
+        rows = session.connection().execute(
+            db.select(Expert.request_id).where(Expert.id.in_(expert_ids))
+        )
+        session.info.setdefault('rated_requests', set()).update(row[0] for row in rows)
+
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_rated_requests(session):
+    for request_id in session.info.pop('rated_requests', ()):
+        result_cache.invalidate_request(request_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_rated_requests(session):
+    session.info.pop('rated_requests', None)
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_login_changes(session, flush_context):
+    # Входы сбрасываются только после коммита: при сбросе во время flush
+    # параллельный вход успел бы снова закэшировать прежние строки
+    codes, request_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Request):
+            # Код доступа мог стать действительным или смениться
+            history = inspect(obj).attrs.access_code.history
+            codes.update(code for code in (obj.access_code, *history.deleted) if code)
+            request_ids.add(obj.id)
+        elif isinstance(obj, Expert):
+            history = inspect(obj).attrs.request_id.history
+            request_ids.update(rid for rid in (obj.request_id, *history.deleted) if rid is not None)
+    if codes:
+        session.info.setdefault('login_codes', set()).update(codes)
+    if request_ids:
+        session.info.setdefault('login_requests', set()).update(request_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_login_changes(session):
+    for access_code in session.info.pop('login_codes', ()):
+        login_cache.default_cache.invalidate_code(access_code)
+    for request_id in session.info.pop('login_requests', ()):
+        login_cache.default_cache.invalidate_request(request_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_login_changes(session):
+    session.info.pop('login_codes', None)
+    session.info.pop('login_requests', None)
+
+
+def score_state_enabled():
+    # Инкрементальное состояние повторяет только расчет с параметрами по умолчанию
+    return incremental_scoring.applicable(decision_options(app.config))
+
+
+def load_score_state(request_id):
+    # Ошибка чтения состояния не должна мешать сохранению оценок
+    try:
+        return IncrementalScore.load(request_id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f'Error loading score state: {str(e)}')
+        return None
+
+
+def update_score_state(request_id, score_state, submitted, previous, ratings_version):
+    """Учет сохраненных оценок в состоянии пересчета; без состояния оно
+    строится по всем оценкам запроса. ratings_version — версия оценок
+    после записи. При ошибке состояние удаляется, чтобы не отдавать
+    устаревший рейтинг."""
+    try:
+        if score_state:
+            record_submission(score_state, submitted, previous, ratings_version)
+        else:
+            incremental_scoring.build_score_state(request_id)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f'Error updating score state: {str(e)}')
+        try:
+            incremental_scoring.drop_score_state(request_id)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.error(f'Error dropping score state: {str(e)}')
+
+
 @app.route('/')
 def index_home():
     return render_template("home.html")
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return make_response(metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE})
+
+
 @app.route('/about')
 def about():
     return render_template("about.html")
@@ -148,22 +467,19 @@ def expert():
             flash('Код доступа должен состоять из 5 цифр', 'error')
             return redirect(url_for('expert_error'))
 
-        # Поиск запроса
-        request_entry = Request.query.filter_by(access_code=access_code).first()
+        # Поиск запроса и эксперта (повторные входы и неверные коды — из кэша)
+        if app.config['LOGIN_CACHE']:
+            request_id, expert_id = login_cache.default_cache.resolve(access_code, expert_name)
+        else:
+            request_id, expert_id = login_cache.lookup(access_code, expert_name)
 
-        if not request_entry:
+        if request_id is None:
             flash('Неверный код доступа', 'error')
             return redirect(url_for('expert_error'))
 
-        # Проверка эксперта
-        expert = Expert.query.filter_by(
-            name=expert_name,
-            request_id=request_entry.id
-        ).first()
-
-        if expert:
-            session['expert_id'] = expert.id
-            session['request_id'] = request_entry.id
+        if expert_id is not None:
+            session['expert_id'] = expert_id
+            session['request_id'] = request_id
             return redirect(url_for('expert_assessment'))
         else:
             flash('Эксперт не найден в данном запросе', 'error')
@@ -182,44 +498,33 @@ def expert_assessment():
     expert = Expert.query.get(expert_id)
     alternatives = Alternative.query.filter_by(request_id=request_id).all()
 
-    # Исправлено здесь
-    criterias = Criterion.query.filter_by(request_id=request_id).all()
+    # Критерии загружаются одним запросом вместе со шкалами
+    criterias = Criterion.query.options(joinedload(Criterion.scale)) \
+        .filter_by(request_id=request_id).all()
 
     for criteria in criterias:
-        scale = Scale.query.get(criteria.scale_id)
-        if scale:
-            criteria.scale_values = scale.values.split(';')
-            if scale.type == 'numeric':
-                criteria.min_val = min(map(float, criteria.scale_values))
-                criteria.max_val = max(map(float, criteria.scale_values))
-            else:
-                criteria.min_val = None
-                criteria.max_val = None
+        if criteria.scale:
+            criteria.parsed_scale = parsed_scale(criteria.scale)
+            criteria.scale_values = criteria.parsed_scale.values
+            criteria.min_val = criteria.parsed_scale.min_val
+            criteria.max_val = criteria.parsed_scale.max_val
 
     if request.method == 'POST':
         try:
-            for alt in alternatives:
-                for crit in criterias:
-                    field_name = f"rating_{alt.id}_{crit.id}"
-                    value = request.form.get(field_name)
-
-                    if value:
-                        if crit.scale.type == 'numeric':
-                            value = float(value)
-                            if not (crit.min_val <= value <= crit.max_val):
-                                flash(f'Значение для {crit.name} должно быть между {crit.min_val} и {crit.max_val}',
-                                      'error')
-                                return redirect(url_for('expert_assessment'))
-
-                        rating = Rating(
-                            value=str(value),
-                            alternative_id=alt.id,
-                            criterion_id=crit.id,
-                            expert_id=expert_id
-                        )
-                        db.session.add(rating)
-
-            db.session.commit()
+            # Состояние пересчета загружается до записи новых оценок
+            use_score_state = score_state_enabled()
+            score_state = load_score_state(request_id) if use_score_state else None
+            previous = expert_previous_values(expert_id) if score_state else {}
+            submitted, error = collect_submission(request.form, alternatives, criterias)
+            if error:
+                flash(error, 'error')
+                return redirect(url_for('expert_assessment'))
+
+            ratings_version = store_ratings(request_id, expert_id, submitted,
+                                            {crit.id: crit.parsed_scale for crit in criterias},
+                                            upsert=app.config['RATINGS_UPSERT'])
+            if use_score_state:
+                update_score_state(request_id, score_state, submitted, previous, ratings_version)
             flash('Оценки успешно сохранены!', 'success')
             return redirect(url_for('expert_finish'))
 
@@ -376,6 +681,11 @@ def manager_request_experts():
     request_id = session['request_data']['request_id']
 
     if request.method == 'POST':
+        # Эксперт входит по имени, а оценки и результаты адресуются по именам
+        names = [request.form.get(f'name_{i}') for i in range(total)]
+        if len(set(names)) < len(names):
+            flash('Имена экспертов не должны повторяться', 'error')
+            return redirect('/manager_request_experts')
         try:
             for i in range(total):
                 name = request.form.get(f'name_{i}')
@@ -438,13 +748,15 @@ def manager_request_scales():
                     flash('Максимум 10 значений в одной шкале', 'error')
                     return redirect(url_for('manager_request_scales'))
 
-                # Проверка числовых значений
-                if scale_type == 'numeric':
-                    try:
-                        [float(v) for v in values]
-                    except ValueError:
+                # Проверка числовых значений и нечетких чисел 'метка(l, m, u)'
+                try:
+                    compile_scale(scale_type, values, ordinal=True)
+                except ValueError as e:
+                    if scale_type == 'numeric':
                         flash('Для числовой шкалы вводите только числа', 'error')
-                        return redirect(url_for('manager_request_scales'))
+                    else:
+                        flash(f'Ошибка в значениях шкалы: {e}', 'error')
+                    return redirect(url_for('manager_request_scales'))
 
                 # Создание шкалы
                 scales.append(Scale(
@@ -512,6 +824,10 @@ def manager_request_criterias():
                     scale_id=scale_id
                 ))
 
+            if len({c.name for c in criteria}) < len(criteria):
+                flash('Названия критериев не должны повторяться', 'error')
+                return render_template('manager_request_criterias.html', count=count, scales=scales)
+
             db.session.bulk_save_objects(criteria)
             db.session.commit()
             flash('Все критерии успешно сохранены!', 'success')
@@ -560,6 +876,9 @@ def manager_request_alternatives():
             if not alternatives:
                 flash('Введите хотя бы одну альтернативу!', 'error')
                 return redirect(url_for('manager_request_alternatives'))
+            if len({a.name for a in alternatives}) < len(alternatives):
+                flash('Названия альтернатив не должны повторяться', 'error')
+                return redirect(url_for('manager_request_alternatives'))
 
             db.session.bulk_save_objects(alternatives)
             db.session.commit()
@@ -580,55 +899,224 @@ def manager_request_alternatives_error():
     return render_template("manager_request_alternatives_error.html",  count=num_alternatives)
 
 
+# Фильтры архива по состоянию запроса
+ARCHIVE_STATUSES = {
+    'active': 'В процессе',
+    'complete': 'Все оценки получены',
+    'closed': 'Закрыт',
+}
+
+
+def _archive_cursor(entry):
+    return f"{entry.created_at.isoformat()}~{entry.id}"
+
+
+def _parse_archive_cursor(raw):
+    try:
+        created_at, request_id = raw.rsplit('~', 1)
+        return datetime.fromisoformat(created_at), int(request_id)
+    except (AttributeError, ValueError):
+        return None
+
+
 @app.route('/manager_archive')
 def manager_archive():
     # Проверяем авторизацию менеджера
     if 'manager_id' not in session:
         return redirect(url_for('manager_login'))
 
-    # Получаем все запросы менеджера
-    manager = Manager.query.get(session['manager_id'])
-    requests = Request.query.filter_by(manager=manager) \
-        .order_by(Request.created_at.desc()).all()
+    page_size = app.config['ARCHIVE_PAGE_SIZE']
+    search = request.args.get('q', '').strip()
+    status = request.args.get('status', '')
+    cursor = _parse_archive_cursor(request.args.get('after'))
+
+    # Одна выборка по индексу (manager_id, created_at, id): keyset-пагинация
+    # и счетчики прогресса прямо из строк запросов, без обхода связей
+    query = Request.query.filter(Request.manager_id == session['manager_id'])
+    if search:
+        query = query.filter(Request.name.ilike(f"%{search}%"))
+    expected = Request.experts_count * Request.alternatives_count * Request.criteria_count
+    if status == 'active':
+        query = query.filter(Request.is_active.isnot(False),
+                             or_(expected == 0, Request.ratings_count < expected))
+    elif status == 'complete':
+        query = query.filter(expected > 0, Request.ratings_count >= expected)
+    elif status == 'closed':
+        query = query.filter(Request.is_active.is_(False))
+    if cursor is not None:
+        query = query.filter(tuple_(Request.created_at, Request.id) < tuple_(*cursor))
+    rows = query.order_by(Request.created_at.desc(), Request.id.desc()).limit(page_size + 1).all()
+
+    requests = rows[:page_size]
+    next_cursor = _archive_cursor(requests[-1]) if len(rows) > page_size else None
+    return render_template("manager_archive.html", requests=requests,
+                           export_formats=export_jobs.available_formats(),
+                           search=search, status=status, statuses=ARCHIVE_STATUSES,
+                           next_cursor=next_cursor, first_page=cursor is None)
+
+
+@app.route('/manager_archive/<int:request_id>/export/<fmt>')
+def manager_export(request_id, fmt):
+    if 'manager_id' not in session:
+        return redirect(url_for('manager_login'))
+    if fmt not in export_jobs.available_formats():
+        abort(404)
+    request_entry = Request.query.filter_by(id=request_id, manager_id=session['manager_id']).first_or_404()
+
+    key = (request_id, request_entry.ratings_version, fmt, requested_top_k(request.args))
+    path = export_jobs.default_jobs.ready(key)
+    if path is not None:
+        # conditional=True: ETag, If-Modified-Since и докачка по Range
+        return send_file(path, mimetype=export_jobs.MIMETYPES[fmt], as_attachment=True,
+                         download_name=f"{request_entry.name}.{export_jobs.EXTENSIONS[fmt]}",
+                         conditional=True, max_age=0)
+
+    # Выгрузка строится в фоне, страница обновляется до ее готовности.
+    # Ошибка показывается, пока организатор сам не запросит повтор (retry=1)
+    top = request.args.get('top')
+    if request.args.get('retry', type=int):
+        export_jobs.default_jobs.start(key, retry=True)
+        return redirect(url_for('manager_export', request_id=request_id, fmt=fmt, top=top))
+    job = export_jobs.default_jobs.start(key)
+    error = job['error'] if job['state'] == solver_client.JOB_FAILED else None
+    return render_template("export_pending.html", request_entry=request_entry, fmt=fmt, error=error,
+                           retry_url=url_for('manager_export', request_id=request_id, fmt=fmt,
+                                             top=top, retry=1))
+
+@app.route('/manager_archive/<int:request_id>/sensitivity')
+def manager_sensitivity(request_id):
+    # Устойчивость рейтинга запроса к весам критериев (Монте-Карло), JSON
+    if 'manager_id' not in session:
+        return redirect(url_for('manager_login'))
+    Request.query.filter_by(id=request_id, manager_id=session['manager_id']).first_or_404()
+
+    samples = request.args.get('samples', app.config['SENSITIVITY_SAMPLES'], type=int)
+    try:
+        store = RatingStore.from_db(request_id)
+        if not len(store):
+            raise ValueError(f"У запроса {request_id} нет оценок")
+        report = DecisionMaker(store, **decision_options(app.config)).sensitivity(
+            samples=min(samples, app.config['SENSITIVITY_MAX_SAMPLES']),
+            sampling=request.args.get('sampling', sensitivity.SAMPLING_DIRICHLET),
+            spread=request.args.get('spread', 0.2, type=float),
+            concentration=request.args.get('concentration', type=float),
+            seed=request.args.get('seed', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report)
+
+def requested_top_k(values):
+    # Число мест из параметра top (0 — весь рейтинг) или RESULT_TOP_K
+    top = values.get('top', type=int)
+    if top is None:
+        return app.config['RESULT_TOP_K']
+    return top if top > 0 else None
+
+
+def save_decision_result(results, request_id=None):
+    #Сохранение результата решателя; вызывается и из фонового потока
+    items = solver_backends.ranking_items(results)
+    if request_id is None:
+        # Общий файл остается только для задачи из decision_input.json
+        with open("decision_result.json", "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=4)
+
+    summary = ", ".join([f"{item['alternative']} → {item['score']}" for item in items])
+    with app.app_context():
+        title = "Новый запрос"
+        if request_id is not None:
+            title = db.session.get(Request, request_id).name
+            result_store.save_result(request_id, results)
+        new_req = DecisionRequest(title=title, result_summary=summary[:500])
+        db.session.add(new_req)
+        db.session.commit()
 
-    return render_template("manager_archive.html", requests=requests)
 
 @app.route('/send_decision', methods=['POST'])
 def send_decision():
-    import json
-    import requests
+    # Без request_id решается задача из decision_input.json
+    request_id = request.form.get('request_id', type=int)
+    # Решается и сохраняется весь рейтинг; top передается только просмотру
+    top = request.form.get('top', type=int)
+    on_done = partial(save_decision_result, request_id=request_id)
 
-    with open("decision_input.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
+    if app.config['SOLVER_ASYNC']:
+        job_id = solver_backends.default_jobs.submit(request_id, on_done=on_done)
+        return redirect(url_for('decision_result', job=job_id, top=top))
 
     try:
-        response = requests.post("http://127.0.0.1:1234/api/v1/make-decision", json=data)
-        response.raise_for_status()
-        result = response.json()
-
-        with open("decision_result.json", "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
-
-        summary = ", ".join([f"{item['alternative']} → {item['score']}" for item in result])
-        new_req = DecisionRequest(title="Новый запрос", result_summary=summary)
-        db.session.add(new_req)
-        db.session.commit()
+        results = solver_backends.default_backend.solve(request_id)
+    except SolverError as e:
+        return f"Ошибка при отправке в решатель: {str(e)}", 500
+    on_done(results)
+    if request_id is not None:
+        return redirect(url_for('request_result', request_id=request_id, top=top))
+    return redirect(url_for('decision_result', top=top))
 
-        return redirect("/decision_result")
 
-    except requests.RequestException as e:
-        return f"Ошибка при отправке в решатель: {str(e)}", 500
+@app.route('/decision_status/<job_id>')
+def decision_status(job_id):
+    job = solver_backends.default_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Задание не найдено'}), 404
+    return jsonify({'state': job['state'], 'error': job['error']})
 
 
 @app.route('/decision_result')
 def decision_result():
-    import json
+    job_id = request.args.get('job')
+    top = requested_top_k(request.args)
+    if job_id:
+        job = solver_backends.default_jobs.status(job_id)
+        if job is None:
+            return "Задание не найдено", 404
+        if job['state'] == solver_client.JOB_FAILED:
+            return f"Ошибка при отправке в решатель: {job['error']}", 500
+        if job['state'] != solver_client.JOB_DONE:
+            # Страница обновляется, пока решатель не ответит
+            return render_template("decision_result.html", result=[], pending=True)
+        if job['payload'] is not None:
+            return redirect(url_for('request_result', request_id=job['payload'], top=request.args.get('top')))
+        return render_template("decision_result.html",
+                               result=solver_backends.ranking_items(job['result'])[:top])
+
     try:
         with open("decision_result.json", "r", encoding="utf-8") as f:
             result = json.load(f)
     except FileNotFoundError:
         result = []
-    return render_template("decision_result.html", result=result)
+    return render_template("decision_result.html", result=result[:top])
+
+
+@app.route('/decision_result/<int:request_id>')
+def request_result(request_id):
+    # Повторный просмотр без изменений стоит одного чтения ETag
+    etag = result_store.current_etag(request_id)
+    if etag is None:
+        return "Результат для запроса еще не рассчитан", 404
+    # Рейтинг показывается постранично срезом сохраненного порядка
+    number = request.args.get('page', 1, type=int)
+    size = min(max(1, request.args.get('size', app.config['RESULT_PAGE_SIZE'], type=int)),
+               app.config['RESULT_MAX_PAGE_SIZE'])
+    top = requested_top_k(request.args)
+    page_etag = f"{etag}-{number}-{size}-{top or 0}"
+    if request.if_none_match.contains(page_etag):
+        response = make_response('', 304)
+    else:
+        _, page = result_store.load_page(request_id, number, size, etag, top)
+        response = make_response(render_template(
+            "decision_result.html",
+            result=[{'alternative': name, 'score': score} for name, score in page['ranking']],
+            criteria=page['criteria'],
+            criteria_scores=page['criteria_scores'],
+            page=page['page'],
+            request_id=request_id,
+            top=request.args.get('top', type=int),
+        ))
+    response.set_etag(page_etag)
+    # Браузер всегда перепроверяет результат, но получает 304 без тела
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 def main():
     try:
@@ -639,8 +1127,7 @@ def main():
 
         # 2. Расчет результатов
         print("[INFO] Расчет результатов...")
-        dm = DecisionMaker(input_data)
-        results = dm.calculate()
+        results = result_cache.cached_calculate(input_data)
 
         # 3. Экспорт в Excel
         output_path = Path('results.xlsx')
@@ -653,4 +1140,7 @@ def main():
         print(f"[FATAL] Критическая ошибка: {str(e)}")
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    if app.config['AUTO_MIGRATE']:
+        init_database()
+    app.run(port=int(os.environ.get('PORT', 5000)),
+            debug=os.environ.get('FLASK_DEBUG', '1') != '0')
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Пакетный пересчет множества входных файлов в пуле процессов.
+
+Пример запуска:
+    python batch_scoring.py archive/ --workers 4 --chunk-size 8 --summary summary.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from data_parser import parse_input
+from decision_maker import DecisionMaker, ENGINE_VECTORIZED, ENGINES
+from result_cache import ResultCache
+
+PathLike = Union[str, Path]
+
+
+def collect_inputs(sources: Iterable[PathLike]) -> List[Path]:
+    #Раскрытие каталогов в список JSON-файлов
+    paths = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            paths.extend(sorted(source.glob('*.json')))
+        else:
+            paths.append(source)
+    return paths
+
+
+def _score_one(path: Path, engine: str, cache: Optional[ResultCache]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        data = parse_input(path)
+        if cache is not None:
+            results = cache.calculate(data, engine=engine)
+        else:
+            results = DecisionMaker(data, engine=engine).calculate()
+        return {
+            'input': str(path),
+            'status': 'ok',
+            'results': results,
+            'elapsed': time.perf_counter() - started,
+        }
+    except Exception as e:
+        return {
+            'input': str(path),
+            'status': 'error',
+            'error': f"{type(e).__name__}: {e}",
+            'elapsed': time.perf_counter() - started,
+        }
+
+
+def _score_chunk(paths: List[Path], engine: str, cache_path: Optional[str]) -> List[Dict[str, Any]]:
+    # Выполняется в дочернем процессе: один вызов на пачку задач
+    cache = ResultCache(disk_path=cache_path) if cache_path else None
+    return [_score_one(path, engine, cache) for path in paths]
+
+
+def score_batch(sources: Iterable[PathLike],
+                workers: Optional[int] = None,
+                chunk_size: int = 1,
+                engine: str = ENGINE_VECTORIZED,
+                cache_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Расчет всех задач с выдачей результатов по мере готовности пачек.
+
+    Ошибка в одном файле не прерывает пакет: она возвращается как запись
+    со статусом 'error'. При заданном cache_path неизмененные задачи
+    берутся из дискового кэша результатов.
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер пачки должен быть положительным")
+    paths = collect_inputs(sources)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if not chunks:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_score_chunk, chunk, engine, cache_path) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def run_batch(sources: Iterable[PathLike],
+              summary_path: PathLike,
+              workers: Optional[int] = None,
+              chunk_size: int = 1,
+              engine: str = ENGINE_VECTORIZED,
+              cache_path: Optional[str] = None) -> Dict[str, Any]:
+    #Пакетный расчет с записью единой сводки и замером пропускной способности
+    started = time.perf_counter()
+    problems = []
+    for item in score_batch(sources, workers=workers, chunk_size=chunk_size,
+                            engine=engine, cache_path=cache_path):
+        if item['status'] == 'ok':
+            ranking = item['results']['ranking']
+            leader = ranking[0][0] if ranking else None
+            print(f"[INFO] {item['input']}: лидер {leader} ({item['elapsed']:.3f} с)")
+        else:
+            print(f"[ERROR] {item['input']}: {item['error']}")
+        problems.append(item)
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        'total': len(problems),
+        'succeeded': sum(1 for p in problems if p['status'] == 'ok'),
+        'failed': sum(1 for p in problems if p['status'] != 'ok'),
+        'workers': workers or os.cpu_count(),
+        'chunk_size': chunk_size,
+        'elapsed': elapsed,
+        'problems_per_second': len(problems) / elapsed if elapsed > 0 else 0.0,
+        'problems': sorted(problems, key=lambda p: p['input']),
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=4)
+
+    print(f"[INFO] Обработано задач: {summary['total']} "
+          f"(ошибок: {summary['failed']}) за {elapsed:.2f} с, "
+          f"{summary['problems_per_second']:.1f} задач/с")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Пакетный пересчет входных JSON-файлов")
+    parser.add_argument('inputs', nargs='+', help="JSON-файлы или каталоги с ними")
+    parser.add_argument('--summary', default='batch_summary.json', help="Файл сводки")
+    parser.add_argument('--workers', type=int, default=None, help="Число процессов")
+    parser.add_argument('--chunk-size', type=int, default=1, help="Задач в одной пачке")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_VECTORIZED)
+    parser.add_argument('--cache', default=None, help="Файл SQLite кэша результатов")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.inputs, args.summary,
+                        workers=args.workers,
+                        chunk_size=args.chunk_size,
+                        engine=args.engine,
+                        cache_path=args.cache)
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+"""Бенчмарки горячих путей. Запуск из каталога проекта: python -m benchmarks.<модуль>"""
@@ -0,0 +1,151 @@
+"""Пропускная способность при одновременной отправке оценок экспертами.
+
+Каждый эксперт — отдельный процесс со своим экземпляром приложения,
+который отправляет форму /expert_assessment через test_client. Замер
+выполняется дважды на одинаковых базах: с настройками SQLite по
+умолчанию (journal_mode=DELETE, synchronous=FULL) и с настройками из
+db_config (WAL, synchronous=NORMAL, кэш страниц, mmap, busy_timeout).
+
+Пример:
+    python -m benchmarks.concurrent_writers --experts 8 --submissions 20
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from typing import Dict, Tuple
+
+# Профили настроек: значения передаются приложению через окружение
+PROFILES: Dict[str, Dict[str, str]] = {
+    'baseline': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_CACHE_SIZE_KB': '2000',
+        'SQLITE_MMAP_SIZE': '0',
+        'SQLITE_BUSY_TIMEOUT_MS': '5000',
+    },
+    'tuned': {},
+}
+
+
+def _set_env(db_path: str, profile: str):
+    # Окружение должно быть задано до импорта app
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    os.environ.update(PROFILES[profile])
+
+
+def _seed(db_path: str, profile: str, experts: int, alternatives: int, criteria: int,
+          result: mp.Queue):
+    _set_env(db_path, profile)
+    from app import app, db, init_database, Manager, Request, Expert, Alternative, Criterion, Scale
+
+    init_database()
+    with app.app_context():
+        manager = Manager(username='bench', password_hash='-')
+        numeric = Scale(name='num', type='numeric', values='1;2;3;4;5;6;7;8;9;10')
+        linguistic = Scale(name='ling', type='linguistic', values='плохо;средне;хорошо;отлично')
+        db.session.add_all([manager, numeric, linguistic])
+        db.session.flush()
+        req = Request(name='bench', access_code='00001', manager_id=manager.id)
+        db.session.add(req)
+        db.session.flush()
+        expert_rows = [Expert(name=f'E{i}', request_id=req.id) for i in range(experts)]
+        alt_rows = [Alternative(name=f'A{i}', request_id=req.id) for i in range(alternatives)]
+        crit_rows = [Criterion(name=f'C{i}', request_id=req.id,
+                               scale_id=numeric.id if i % 2 == 0 else linguistic.id)
+                     for i in range(criteria)]
+        db.session.add_all(expert_rows + alt_rows + crit_rows)
+        db.session.commit()
+        result.put((req.id, [e.id for e in expert_rows],
+                    [a.id for a in alt_rows], [(c.id, i % 2 == 0) for i, c in enumerate(crit_rows)]))
+        db.engine.dispose()
+
+
+def _writer(db_path: str, profile: str, request_id: int, expert_id: int,
+            alt_ids: list, crit_ids: list, submissions: int,
+            start, result: mp.Queue):
+    _set_env(db_path, profile)
+    from app import app
+
+    client = app.test_client()
+    words = ['плохо', 'средне', 'хорошо', 'отлично']
+    forms = []
+    for n in range(submissions):
+        forms.append({
+            f'rating_{a}_{c}': str((a + c + n) % 10 + 1) if numeric else words[(a + c + n) % 4]
+            for a in alt_ids for c, numeric in crit_ids
+        })
+    # Прогрев: загрузка шаблонов и кэша шкал вне замера
+    client.get('/')
+
+    start.wait()
+    ok, errors = 0, 0
+    started = time.perf_counter()
+    for form in forms:
+        with client.session_transaction() as sess:
+            sess['expert_id'] = expert_id
+            sess['request_id'] = request_id
+        try:
+            response = client.post('/expert_assessment', data=form)
+        except Exception:
+            errors += 1
+            continue
+        # Успешная запись завершается переходом на страницу благодарности
+        if response.status_code == 302 and 'expert_finish' in response.location:
+            ok += 1
+        else:
+            errors += 1
+    result.put((ok, errors, time.perf_counter() - started))
+
+
+def run_profile(profile: str, experts: int, alternatives: int, criteria: int,
+                submissions: int) -> Tuple[float, int, int, float]:
+    ctx = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        queue = ctx.Queue()
+        seeder = ctx.Process(target=_seed, args=(db_path, profile, experts, alternatives, criteria, queue))
+        seeder.start()
+        request_id, expert_ids, alt_ids, crit_ids = queue.get()
+        seeder.join()
+
+        # Общий старт после того, как все процессы импортировали приложение
+        start = ctx.Barrier(experts + 1)
+        workers = [
+            ctx.Process(target=_writer, args=(db_path, profile, request_id, expert_id,
+                                              alt_ids, crit_ids, submissions, start, queue))
+            for expert_id in expert_ids
+        ]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        started = time.perf_counter()
+        reports = [queue.get() for _ in workers]
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+
+    ok = sum(r[0] for r in reports)
+    errors = sum(r[1] for r in reports)
+    return ok / elapsed, ok, errors, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк одновременной записи оценок")
+    parser.add_argument('--experts', type=int, default=8, help="число процессов-экспертов")
+    parser.add_argument('--submissions', type=int, default=20, help="отправок формы на эксперта")
+    parser.add_argument('--alternatives', type=int, default=20)
+    parser.add_argument('--criteria', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    cells = args.alternatives * args.criteria
+    print(f"[INFO] {args.experts} экспертов x {args.submissions} отправок по {cells} оценок")
+    for profile in PROFILES:
+        rate, ok, errors, elapsed = run_profile(profile, args.experts, args.alternatives,
+                                                args.criteria, args.submissions)
+        print(f"{profile:10s} {rate:8.1f} отправок/с   успешно {ok:5d}   ошибок {errors:4d}   {elapsed:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Время и пиковая память экспорта результатов.
+
+Строит синтетическую задачу (полная матрица альтернативы × критерии ×
+эксперты), считает ее DecisionMaker и сравнивает:
+  legacy-xlsx  — ExcelExporter (три сводных листа через pandas);
+  pandas-csv   — полная матрица оценок через DataFrame.to_csv;
+  xlsx / csv / parquet — StreamingExporter (parquet — при наличии pyarrow).
+
+Память — прирост RSS процесса во время экспорта (опрос /proc/self/statm).
+
+Пример:
+    python -m benchmarks.export_bench --alternatives 10000 --criteria 50 --experts 50
+"""
+import argparse
+import gc
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate_store
+from decision_maker import DecisionMaker
+from excel_exporter import ExcelExporter
+from exporters import StreamingExporter, pa
+from rating_store import RatingStore
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+class PeakRss:
+    #Фоновый опрос RSS: пик относительно значения на входе
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+
+    def __enter__(self):
+        self.base = _rss()
+        self.peak = self.base
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+    @property
+    def delta_mb(self) -> float:
+        return (self.peak - self.base) / 2 ** 20
+
+
+def legacy_ratings_csv(store: RatingStore, path: Path):
+    alt_idx, crit_idx, expert_idx, values = store.columns()
+    frame = pd.DataFrame({
+        'Alternative': np.asarray(store.alternatives, dtype=object)[alt_idx],
+        'Criterion': np.asarray([c['name'] for c in store.criteria], dtype=object)[crit_idx],
+        'Expert': np.asarray(store.experts, dtype=object)[expert_idx],
+        'Value': values,
+    })
+    frame.to_csv(path, index=False)
+
+
+def run_case(title: str, func: Callable[[], Path]):
+    gc.collect()
+    with PeakRss() as memory:
+        started = time.perf_counter()
+        path = func()
+        elapsed = time.perf_counter() - started
+    size = Path(path).stat().st_size / 2 ** 20
+    print(f"{title:14s} {elapsed:9.2f} с   +{memory.delta_mb:8.1f} МБ RSS   файл {size:8.1f} МБ")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк экспорта результатов")
+    parser.add_argument('--alternatives', type=int, default=10000)
+    parser.add_argument('--criteria', type=int, default=50)
+    parser.add_argument('--experts', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--xlsx-ratings', action='store_true',
+                        help="выгружать полную матрицу оценок и в XLSX (медленно)")
+    args = parser.parse_args(argv)
+
+    total = args.alternatives * args.criteria * args.experts
+    print(f"[INFO] Генерация {total} оценок...")
+    store = generate_store(args.alternatives, args.criteria, args.experts, seed=args.seed)
+    started = time.perf_counter()
+    results = DecisionMaker(store).calculate()
+    print(f"[INFO] Расчет: {time.perf_counter() - started:.2f} с")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+
+        def legacy_xlsx():
+            ExcelExporter(results).export(out / 'legacy.xlsx')
+            return out / 'legacy.xlsx'
+
+        def pandas_csv():
+            legacy_ratings_csv(store, out / 'ratings.csv')
+            return out / 'ratings.csv'
+
+        xlsx_store = store if args.xlsx_ratings else None
+        run_case('legacy-xlsx', legacy_xlsx)
+        run_case('pandas-csv', pandas_csv)
+        run_case('xlsx', lambda: StreamingExporter(results, xlsx_store).export(out / 'results.xlsx'))
+        run_case('csv', lambda: StreamingExporter(results, store).export(out / 'results.csv.zip', 'csv'))
+        if pa is not None:
+            run_case('parquet', lambda: StreamingExporter(results, store).export(out / 'results.parquet.zip', 'parquet'))
+        else:
+            print("[INFO] pyarrow не установлен, Parquet пропущен")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Генератор синтетических задач для бенчмарков.
+
+Задача задается размерами (альтернативы, критерии, эксперты), долей
+лингвистических критериев, долей пропущенных оценок и зерном; при
+одинаковых параметрах получается одна и та же задача. Она выдается
+словарем в формате input.json (InputData), готовым RatingStore или
+файлом.
+
+Лингвистические критерии, как и в RatingStore.from_db, имеют шкалу из
+порядковых номеров значений 1..n, а оценка — номер значения.
+
+Пример:
+    python -m benchmarks.generator problem.json --alternatives 500 --criteria 20 --experts 10 --sparsity 0.3
+"""
+import argparse
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data_parser import InputData
+from rating_store import RatingStore
+
+NUMERIC_SCALE = list(range(1, 11))
+LINGUISTIC_SCALE = list(range(1, 6))
+
+# Имена, критерии и столбцы индексов (альтернатива, критерий, эксперт, значение)
+Layout = Tuple[List[str], List[Dict[str, Any]], List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _layout(alternatives: int,
+            criteria: int,
+            experts: int,
+            linguistic_share: float,
+            sparsity: float,
+            seed: int) -> Layout:
+    if min(alternatives, criteria, experts) < 1:
+        raise ValueError("Размеры задачи должны быть положительными")
+    if not 0 <= linguistic_share <= 1:
+        raise ValueError("Доля лингвистических критериев должна быть в [0, 1]")
+    if not 0 <= sparsity < 1:
+        raise ValueError("Доля пропусков должна быть в [0, 1)")
+    rng = np.random.default_rng(seed)
+
+    linguistic = np.zeros(criteria, dtype=bool)
+    linguistic[rng.permutation(criteria)[:round(criteria * linguistic_share)]] = True
+    weights = np.round(rng.dirichlet(np.ones(criteria)), 4)
+    criteria_list = [{
+        'name': f"Criterion {j}",
+        'type': 'linguistic' if linguistic[j] else 'numeric',
+        'weight': float(weights[j]),
+        'scale': list(LINGUISTIC_SCALE if linguistic[j] else NUMERIC_SCALE),
+    } for j in range(criteria)]
+
+    grid = np.indices((alternatives, criteria, experts), dtype=np.int32).reshape(3, -1)
+    if sparsity:
+        grid = grid[:, rng.random(grid.shape[1]) >= sparsity]
+    scale_size = np.where(linguistic, len(LINGUISTIC_SCALE), len(NUMERIC_SCALE))
+    values = rng.integers(1, scale_size[grid[1]] + 1).astype(np.float64)
+    return ([f"Alternative {i}" for i in range(alternatives)], criteria_list,
+            [f"Expert {k}" for k in range(experts)], grid[0], grid[1], grid[2], values)
+
+
+def generate_store(alternatives: int,
+                   criteria: int,
+                   experts: int,
+                   linguistic_share: float = 0.0,
+                   sparsity: float = 0.0,
+                   seed: int = 42) -> RatingStore:
+    #Задача сразу в виде RatingStore, без словарей оценок
+    names, criteria_list, expert_names, alt_idx, crit_idx, expert_idx, values = _layout(
+        alternatives, criteria, experts, linguistic_share, sparsity, seed)
+    return RatingStore(names, criteria_list, expert_names,
+                       alt_idx=array('i', alt_idx.tobytes()),
+                       crit_idx=array('i', crit_idx.tobytes()),
+                       expert_idx=array('i', expert_idx.tobytes()),
+                       values=array('d', values.tobytes()))
+
+
+def generate_problem(alternatives: int,
+                     criteria: int,
+                     experts: int,
+                     linguistic_share: float = 0.0,
+                     sparsity: float = 0.0,
+                     seed: int = 42) -> Dict[str, Any]:
+    #Задача в формате input.json
+    names, criteria_list, expert_names, alt_idx, crit_idx, expert_idx, values = _layout(
+        alternatives, criteria, experts, linguistic_share, sparsity, seed)
+    criteria_names = [c['name'] for c in criteria_list]
+    ratings = [{'alternative': names[a], 'criteria': criteria_names[c], 'expert': expert_names[e], 'value': int(v)}
+               for a, c, e, v in zip(alt_idx.tolist(), crit_idx.tolist(), expert_idx.tolist(), values.tolist())]
+    return {'alternatives': names, 'criteria': criteria_list, 'experts': expert_names, 'ratings': ratings}
+
+
+def generate_input(*args, **kwargs) -> InputData:
+    return InputData(**generate_problem(*args, **kwargs))
+
+
+def write_problem(path: Path, *args, **kwargs) -> Path:
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate_problem(*args, **kwargs), f, ensure_ascii=False)
+    return path
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Генерация синтетической входной задачи")
+    parser.add_argument('output', help="Файл задачи (JSON)")
+    parser.add_argument('--alternatives', type=int, default=100)
+    parser.add_argument('--criteria', type=int, default=10)
+    parser.add_argument('--experts', type=int, default=10)
+    parser.add_argument('--linguistic-share', type=float, default=0.0, help="доля лингвистических критериев")
+    parser.add_argument('--sparsity', type=float, default=0.0, help="доля пропущенных оценок")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    path = write_problem(args.output, args.alternatives, args.criteria, args.experts,
+                         linguistic_share=args.linguistic_share, sparsity=args.sparsity, seed=args.seed)
+    print(f"[INFO] Задача записана в {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Нагрузочный тест сценариев эксперта и менеджера.
+
+Создает базу (по умолчанию временную) с менеджером, запросами,
+экспертами, шкалами, критериями и альтернативами и запускает
+одновременных пользователей:
+  эксперт  — POST /expert (вход по коду), GET /expert_assessment,
+             POST /expert_assessment с полной формой оценок;
+  менеджер — POST /manager_login, затем GET /manager_archive
+             (первая страница, поиск и фильтр по статусу).
+Пользователи — потоки в нескольких процессах (--processes). Запросы идут
+либо через test_client приложения в каждом процессе (--transport client),
+либо по HTTP к локальному WSGI-серверу в отдельном процессе
+(--transport wsgi). По каждому маршруту выводятся p50/p95/p99,
+пропускная способность и доля ошибок; ошибкой считается исключение или
+ответ, отличный от ожидаемого (код и адрес перехода).
+
+Пример:
+    python -m benchmarks.load_test --experts 40 --managers 4 --processes 4 --iterations 5
+    python -m benchmarks.load_test --transport wsgi --output load.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+MANAGER_USERNAME = 'load'
+MANAGER_PASSWORD = 'load-test'
+LINGUISTIC_VALUES = ['плохо', 'средне', 'хорошо', 'отлично']
+NUMERIC_VALUES = [str(v) for v in range(1, 11)]
+TRANSPORTS = ('client', 'wsgi')
+
+
+class Scenario(NamedTuple):
+    # Кто работает в одном потоке: ('expert', имя, код доступа, форма) или ('manager', ...)
+    role: str
+    name: str
+    access_code: str
+    form: Dict[str, str]
+
+
+class Response(NamedTuple):
+    status: int
+    location: str
+
+
+def _set_env(db_path: str):
+    # Окружение должно быть задано до импорта app
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+
+def _seed(db_path: str, args, result: mp.Queue):
+    _set_env(db_path)
+    from werkzeug.security import generate_password_hash
+    from app import app, db, init_database, Manager, Request, Expert, Alternative, Criterion, Scale
+
+    init_database()
+    with app.app_context():
+        manager = Manager(username=MANAGER_USERNAME, password_hash=generate_password_hash(MANAGER_PASSWORD))
+        numeric = Scale(name='load numeric', type='numeric', values=';'.join(NUMERIC_VALUES))
+        linguistic = Scale(name='load linguistic', type='linguistic', values=';'.join(LINGUISTIC_VALUES))
+        db.session.add_all([manager, numeric, linguistic])
+        db.session.flush()
+
+        per_request = -(-args.experts // args.requests)
+        rows = []
+        for r in range(args.requests):
+            entry = Request(name=f'load request {r}', access_code=f'{r + 10000:05d}', manager_id=manager.id)
+            db.session.add(entry)
+            db.session.flush()
+            alternatives = [Alternative(name=f'A{i}', request_id=entry.id) for i in range(args.alternatives)]
+            criteria = [Criterion(name=f'C{j}', request_id=entry.id,
+                                  scale_id=numeric.id if j % 2 == 0 else linguistic.id)
+                        for j in range(args.criteria)]
+            experts = [Expert(name=f'E{k}', request_id=entry.id) for k in range(per_request)]
+            db.session.add_all(alternatives + criteria + experts)
+            db.session.flush()
+            rows.append((entry.access_code, [e.name for e in experts], [a.id for a in alternatives],
+                         [(c.id, j % 2 == 0) for j, c in enumerate(criteria)]))
+        # Пустые запросы, чтобы в архиве было несколько страниц
+        db.session.add_all([Request(name=f'archive {i}', access_code=f'{i + 50000:05d}', manager_id=manager.id)
+                            for i in range(args.archive_requests)])
+        db.session.commit()
+        db.engine.dispose()
+    result.put(rows)
+
+
+def _scenarios(rows: list, args) -> List[Scenario]:
+    rnd = random.Random(args.seed)
+    users = []
+    for n in range(args.experts):
+        access_code, experts, alt_ids, crit_ids = rows[n % len(rows)]
+        form = {f'rating_{a}_{c}': rnd.choice(NUMERIC_VALUES if numeric else LINGUISTIC_VALUES)
+                for a in alt_ids for c, numeric in crit_ids}
+        users.append(Scenario('expert', experts[n // len(rows)], access_code, form))
+    users.extend(Scenario('manager', MANAGER_USERNAME, '', {}) for _ in range(args.managers))
+    rnd.shuffle(users)
+    return users
+
+
+class _TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path: str, params: Optional[Dict[str, str]] = None) -> Response:
+        response = self.client.get(path, query_string=params)
+        return Response(response.status_code, response.location or '')
+
+    def post(self, path: str, data: Dict[str, str]) -> Response:
+        response = self.client.post(path, data=data)
+        return Response(response.status_code, response.location or '')
+
+
+class _HttpTransport:
+    def __init__(self, base_url: str):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def get(self, path: str, params: Optional[Dict[str, str]] = None) -> Response:
+        response = self.session.get(self.base_url + path, params=params, allow_redirects=False)
+        return Response(response.status_code, response.headers.get('Location', ''))
+
+    def post(self, path: str, data: Dict[str, str]) -> Response:
+        response = self.session.post(self.base_url + path, data=data, allow_redirects=False)
+        return Response(response.status_code, response.headers.get('Location', ''))
+
+
+def _expected(response: Response, status: int, target: str = '') -> bool:
+    return response.status == status and target in response.location
+
+
+def _run_user(transport, user: Scenario, iterations: int, think: float, record):
+    # record(маршрут, время, успех) вызывается после каждого обращения
+    def call(route: str, func, check):
+        started = time.perf_counter()
+        try:
+            ok = check(func())
+        except Exception:
+            ok = False
+        record(route, time.perf_counter() - started, ok)
+        if think:
+            time.sleep(think)
+        return ok
+
+    if user.role == 'expert':
+        for _ in range(iterations):
+            if not call('POST /expert',
+                        lambda: transport.post('/expert', {'name': user.name, 'psw': user.access_code}),
+                        lambda r: _expected(r, 302, 'expert_assessment')):
+                continue
+            call('GET /expert_assessment', lambda: transport.get('/expert_assessment'),
+                 lambda r: _expected(r, 200))
+            call('POST /expert_assessment', lambda: transport.post('/expert_assessment', user.form),
+                 lambda r: _expected(r, 302, 'expert_finish'))
+        return
+
+    call('POST /manager_login',
+         lambda: transport.post('/manager_login', {'username': user.name, 'password': MANAGER_PASSWORD}),
+         lambda r: _expected(r, 302, 'manager_menu'))
+    filters = [None, {'q': 'load'}, {'status': 'active'}]
+    for i in range(iterations):
+        params = filters[i % len(filters)]
+        call('GET /manager_archive', lambda: transport.get('/manager_archive', params),
+             lambda r: _expected(r, 200))
+
+
+def _worker(db_path: str, base_url: Optional[str], users: List[Scenario], args,
+            start, result: mp.Queue):
+    _set_env(db_path)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def record(route: str, elapsed: float, ok: bool):
+        with lock:
+            latencies[route].append(elapsed)
+            if not ok:
+                errors[route] += 1
+
+    if base_url is None:
+        from app import app
+        transports = [_TestClientTransport(app) for _ in users]
+        # Прогрев: загрузка шаблонов вне замера
+        app.test_client().get('/expert')
+    else:
+        transports = [_HttpTransport(base_url) for _ in users]
+    threads = [threading.Thread(target=_run_user, args=(transport, user, args.iterations, args.think / 1000, record))
+               for transport, user in zip(transports, users)]
+
+    start.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.put((dict(latencies), dict(errors)))
+
+
+def _serve(db_path: str, result: mp.Queue):
+    _set_env(db_path)
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Журнал каждого обращения искажал бы замер
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    result.put(server.server_port)
+    server.serve_forever()
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> List[Dict[str, Any]]:
+    """Сводка по маршрутам: число обращений, ошибки, пропускная
+    способность за время прогона и перцентили задержки в мс."""
+    rows = []
+    for route in sorted(latencies):
+        values = np.array(latencies[route]) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        count = len(values)
+        rows.append({
+            'route': route,
+            'count': count,
+            'errors': errors.get(route, 0),
+            'error_rate': errors.get(route, 0) / count,
+            'throughput': count / elapsed if elapsed else 0.0,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(values.max()),
+        })
+    return rows
+
+
+def run(args, db_path: str) -> Dict[str, Any]:
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    seeder = ctx.Process(target=_seed, args=(db_path, args, queue))
+    seeder.start()
+    rows = queue.get()
+    seeder.join()
+
+    users = _scenarios(rows, args)
+    server = None
+    base_url = None
+    if args.transport == 'wsgi':
+        server = ctx.Process(target=_serve, args=(db_path, queue), daemon=True)
+        server.start()
+        base_url = f'http://127.0.0.1:{queue.get()}'
+
+    processes = min(args.processes, len(users)) or 1
+    # Общий старт после того, как все процессы импортировали приложение
+    start = ctx.Barrier(processes + 1)
+    workers = [ctx.Process(target=_worker, args=(db_path, base_url, users[i::processes], args, start, queue))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    started = time.perf_counter()
+    reports = [queue.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+    if server is not None:
+        server.terminate()
+        server.join()
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for part_latencies, part_errors in reports:
+        for route, values in part_latencies.items():
+            latencies[route].extend(values)
+        for route, count in part_errors.items():
+            errors[route] += count
+    total = sum(len(v) for v in latencies.values())
+    return {
+        'transport': args.transport,
+        'experts': args.experts,
+        'managers': args.managers,
+        'processes': processes,
+        'iterations': args.iterations,
+        'cells': args.alternatives * args.criteria,
+        'elapsed': elapsed,
+        'throughput': total / elapsed if elapsed else 0.0,
+        'routes': summarize(latencies, errors, elapsed),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сценариев эксперта и менеджера")
+    parser.add_argument('--experts', type=int, default=40, help="одновременных экспертов")
+    parser.add_argument('--managers', type=int, default=4, help="одновременных менеджеров")
+    parser.add_argument('--processes', type=int, default=4, help="процессов с пользователями")
+    parser.add_argument('--iterations', type=int, default=5, help="повторов сценария на пользователя")
+    parser.add_argument('--think', type=float, default=0.0, help="пауза между обращениями, мс")
+    parser.add_argument('--requests', type=int, default=4, help="запросов, по которым распределены эксперты")
+    parser.add_argument('--alternatives', type=int, default=10)
+    parser.add_argument('--criteria', type=int, default=6)
+    parser.add_argument('--archive-requests', type=int, default=100, help="дополнительных запросов в архиве")
+    parser.add_argument('--transport', choices=TRANSPORTS, default='client')
+    parser.add_argument('--database', help="новый файл базы SQLite (по умолчанию временный)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="файл отчета (JSON)")
+    args = parser.parse_args(argv)
+    if args.experts < 0 or args.managers < 0 or args.experts + args.managers == 0:
+        parser.error("нужен хотя бы один пользователь")
+    args.requests = max(1, min(args.requests, args.experts or 1))
+
+    print(f"[INFO] {args.experts} экспертов и {args.managers} менеджеров в {args.processes} процессах, "
+          f"{args.iterations} повторов, транспорт {args.transport}")
+    if args.database:
+        report = run(args, os.path.abspath(args.database))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run(args, os.path.join(tmp, 'load.db'))
+
+    for row in report['routes']:
+        print(f"{row['route']:26s} {row['count']:6d} обращ.  {row['throughput']:8.1f}/с   "
+              f"p50 {row['p50_ms']:8.2f}   p95 {row['p95_ms']:8.2f}   p99 {row['p99_ms']:8.2f} мс   "
+              f"ошибок {row['error_rate']:.1%}")
+    print(f"[INFO] всего {report['throughput']:.1f} обращений/с за {report['elapsed']:.2f} с")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
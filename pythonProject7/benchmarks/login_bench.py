@@ -0,0 +1,113 @@
+"""Нагрузка на вход экспертов: прежний путь через базу против кэша.
+
+Создает временную базу с запросами и экспертами и выполняет POST /expert
+из нескольких потоков: повторные входы настоящих экспертов вперемешку с
+попытками подобрать код (доля --bad-share). Каждый режим запускается в
+отдельном процессе с LOGIN_CACHE=0 или 1.
+
+Пример:
+    python -m benchmarks.login_bench --requests 200 --experts 50 --logins 20000 --threads 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def _seed(db_path: str, requests: int, experts: int):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    from app import app, db, init_database, Manager, Request, Expert
+
+    init_database()
+    with app.app_context():
+        manager = Manager(username='bench', password_hash='-')
+        db.session.add(manager)
+        db.session.flush()
+        for r in range(requests):
+            entry = Request(name=f'request {r}', access_code=f'{r + 10000:05d}', manager_id=manager.id)
+            db.session.add(entry)
+            db.session.flush()
+            db.session.add_all([Expert(name=f'E{k}', request_id=entry.id) for k in range(experts)])
+        db.session.commit()
+        db.engine.dispose()
+
+
+def _run(db_path: str, cache: bool, args, result: mp.Queue):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    os.environ['LOGIN_CACHE'] = '1' if cache else '0'
+    from app import app
+    import login_cache
+
+    rnd = random.Random(args.seed)
+    attempts = []
+    for _ in range(args.logins):
+        if rnd.random() < args.bad_share:
+            # Коды вне диапазона созданных запросов
+            attempts.append((f'E{rnd.randrange(args.experts)}', f'{rnd.randrange(args.requests + 10000, 99999):05d}'))
+        else:
+            attempts.append((f'E{rnd.randrange(args.experts)}', f'{rnd.randrange(args.requests) + 10000:05d}'))
+
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(part):
+        client = app.test_client()
+        local = []
+        for name, code in part:
+            started = time.perf_counter()
+            response = client.post('/expert', data={'name': name, 'psw': code})
+            local.append(time.perf_counter() - started)
+            assert response.status_code == 302
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(attempts[i::args.threads],))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    q = statistics.quantiles(latencies, n=100)
+    stats = login_cache.default_cache.stats
+    lookups = sum(stats.values())
+    hit_rate = (stats['hits'] + stats['negative_hits']) / lookups if lookups else 0.0
+    result.put((len(latencies) / elapsed, q[49] * 1000, q[94] * 1000, hit_rate))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк входа экспертов")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--experts', type=int, default=50, help="экспертов в запросе")
+    parser.add_argument('--logins', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bad-share', type=float, default=0.2, help="доля попыток с неверным кодом")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    ctx = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seeder = ctx.Process(target=_seed, args=(db_path, args.requests, args.experts))
+        seeder.start()
+        seeder.join()
+
+        print(f"[INFO] {args.logins} входов в {args.threads} потоков, неверных кодов {args.bad_share:.0%}")
+        for title, cache in (('без кэша', False), ('с кэшем', True)):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run, args=(db_path, cache, args, queue))
+            process.start()
+            rate, p50, p95, hit_rate = queue.get()
+            process.join()
+            print(f"{title:10s} {rate:9.1f} входов/с   p50 {p50:7.2f} мс   p95 {p95:7.2f} мс   "
+                  f"попаданий в кэш {hit_rate:.0%}")
+
+
+if __name__ == "__main__":
+    main()
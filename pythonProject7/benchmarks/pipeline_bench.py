@@ -0,0 +1,214 @@
+"""Повторяемые замеры конвейера расчета на синтетических задачах.
+
+Для каждого размера из PRESETS генерируется задача (benchmarks.generator)
+и замеряются:
+  parse_input         — разбор input.json в InputData;
+  parse_input_stream  — потоковый разбор в RatingStore;
+  calculate           — DecisionMaker.calculate (векторизованный режим);
+  calculate_reference — эталонный режим (только при числе оценок не
+                        больше REFERENCE_MAX_RATINGS);
+  excel_export        — ExcelExporter.export.
+Каждый случай запускается один раз для прогрева и repeat раз с замером;
+в отчет попадают медиана и минимум. Результаты пишутся в JSON и
+сравниваются с сохраненным базовым прогоном по минимуму (он меньше
+всего зависит от фоновой нагрузки). Если базовый прогон снят на другой
+машине, --calibrate делит времена на время калибровочной задачи.
+Замедление больше чем на tolerance считается регрессией, и процесс
+завершается с кодом 1.
+
+Пример:
+    python -m benchmarks.pipeline_bench --presets small medium --output bench.json
+    python -m benchmarks.pipeline_bench --save-baseline
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.generator import write_problem
+from data_parser import parse_input, parse_input_stream
+from decision_maker import DecisionMaker, ENGINE_REFERENCE
+from excel_exporter import ExcelExporter
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+# Размеры задач: альтернативы, критерии, эксперты, доля лингвистических критериев, доля пропусков
+PRESETS: Dict[str, Dict[str, Any]] = {
+    'small': {'alternatives': 20, 'criteria': 5, 'experts': 5, 'linguistic_share': 0.4, 'sparsity': 0.1},
+    'medium': {'alternatives': 200, 'criteria': 20, 'experts': 20, 'linguistic_share': 0.3, 'sparsity': 0.2},
+    'large': {'alternatives': 2000, 'criteria': 30, 'experts': 30, 'linguistic_share': 0.3, 'sparsity': 0.2},
+}
+DEFAULT_PRESETS = ('small', 'medium')
+# Эталонный режим на словарях слишком медленный для больших задач
+REFERENCE_MAX_RATINGS = 200000
+
+# Случай: имя -> функция, которая по файлу задачи и каталогу возвращает замеряемый вызов
+Case = Callable[[Path, Path], Optional[Callable[[], Any]]]
+
+
+def _parse(path: Path, tmp: Path):
+    return lambda: parse_input(path)
+
+
+def _parse_stream(path: Path, tmp: Path):
+    return lambda: parse_input_stream(path)
+
+
+def _calculate(path: Path, tmp: Path):
+    data = parse_input(path)
+    return lambda: DecisionMaker(data).calculate()
+
+
+def _calculate_reference(path: Path, tmp: Path):
+    data = parse_input(path)
+    if len(data.ratings) > REFERENCE_MAX_RATINGS:
+        return None
+    return lambda: DecisionMaker(data, engine=ENGINE_REFERENCE).calculate()
+
+
+def _excel_export(path: Path, tmp: Path):
+    results = DecisionMaker(parse_input(path)).calculate()
+    return lambda: ExcelExporter(results).export(tmp / 'results.xlsx')
+
+
+CASES: Dict[str, Case] = {
+    'parse_input': _parse,
+    'parse_input_stream': _parse_stream,
+    'calculate': _calculate,
+    'calculate_reference': _calculate_reference,
+    'excel_export': _excel_export,
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    func()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def calibrate(repeat: int = 5) -> float:
+    #Время фиксированной задачи (циклы Python и NumPy): масштаб скорости машины
+    matrix = np.random.default_rng(0).random((300, 300))
+
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        np.sort(matrix @ matrix, axis=1)
+        return total
+
+    return min(measure(workload, repeat))
+
+
+def run(presets: List[str], cases: List[str], repeat: int, seed: int) -> Dict[str, Any]:
+    results = []
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for preset in presets:
+            params = PRESETS[preset]
+            path = write_problem(tmp / f'{preset}.json', seed=seed, **params)
+            ratings = len(parse_input(path).ratings)
+            print(f"[INFO] {preset}: {ratings} оценок, {path.stat().st_size / 2 ** 20:.1f} МБ")
+            for case in cases:
+                func = CASES[case](path, tmp)
+                if func is None:
+                    continue
+                timings = measure(func, repeat)
+                median = statistics.median(timings)
+                print(f"  {case:20s} медиана {median * 1000:10.2f} мс   мин {min(timings) * 1000:10.2f} мс")
+                results.append({
+                    'name': f'{case}/{preset}',
+                    'case': case,
+                    'preset': preset,
+                    'ratings': ratings,
+                    'repeat': repeat,
+                    'median': median,
+                    'min': min(timings),
+                })
+    return {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': seed,
+        'calibration': calibration,
+        'presets': {name: PRESETS[name] for name in presets},
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any],
+            baseline: Dict[str, Any],
+            tolerance: float,
+            calibrated: bool = False) -> List[Dict[str, Any]]:
+    """Отношение минимальных времен к базовому прогону для общих замеров
+    (при calibrated — с поправкой на калибровку).
+
+    Замер помечается как регрессия, если отношение больше 1 + tolerance.
+    """
+    reference = {item['name']: item for item in baseline.get('results', [])}
+    scale = 1.0
+    if calibrated:
+        scale = baseline.get('calibration', 1.0) / report.get('calibration', 1.0)
+    rows = []
+    for item in report['results']:
+        base = reference.get(item['name'])
+        if base is None or not base['min']:
+            continue
+        ratio = item['min'] * scale / base['min']
+        rows.append({'name': item['name'], 'baseline': base['min'], 'min': item['min'],
+                     'ratio': ratio, 'regression': ratio > 1 + tolerance})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Бенчмарк конвейера расчета")
+    parser.add_argument('--presets', nargs='+', choices=list(PRESETS), default=list(DEFAULT_PRESETS))
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="файл отчета (JSON)")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="базовый прогон для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="допустимое замедление")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="поправка на скорость машины при сравнении с базовым прогоном")
+    parser.add_argument('--save-baseline', action='store_true', help="записать прогон как базовый")
+    args = parser.parse_args(argv)
+
+    report = run(args.presets, args.cases, args.repeat, args.seed)
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"[INFO] Базовый прогон записан в {baseline_path}")
+    elif baseline_path.exists():
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare(report, json.load(f), args.tolerance, args.calibrate)
+        for row in report['comparison']:
+            mark = 'РЕГРЕССИЯ' if row['regression'] else ''
+            print(f"{row['name']:32s} {row['baseline'] * 1000:10.2f} -> {row['min'] * 1000:10.2f} мс "
+                  f"({row['ratio']:.2f}x) {mark}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    if any(row['regression'] for row in report.get('comparison', [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Планы и время запросов к оценкам до и после миграций схемы.
+
+Создает временную базу со схемой до миграций, заполняет ее
+сгенерированными оценками, замеряет запросы, применяет migrations.upgrade
+и повторяет замеры.
+
+Пример:
+    python -m benchmarks.schema_bench --requests 20 --experts 20 --alternatives 100 --criteria 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from migrations import upgrade
+
+# Схема в том виде, в котором ее создавала исходная версия моделей
+LEGACY_SCHEMA = [
+    'CREATE TABLE scales (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, type VARCHAR(20) NOT NULL, '
+    '"values" VARCHAR(500) NOT NULL, PRIMARY KEY (id))',
+    'CREATE TABLE requests (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, created_at DATETIME, '
+    'access_code VARCHAR(5) NOT NULL, is_active BOOLEAN, manager_id INTEGER NOT NULL, '
+    'PRIMARY KEY (id), UNIQUE (access_code))',
+    'CREATE TABLE experts (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, contact VARCHAR(100), '
+    'request_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(request_id) REFERENCES requests (id))',
+    'CREATE TABLE criteria (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, is_qualitative BOOLEAN, '
+    'request_id INTEGER NOT NULL, scale_id INTEGER NOT NULL, PRIMARY KEY (id), '
+    'FOREIGN KEY(request_id) REFERENCES requests (id), FOREIGN KEY(scale_id) REFERENCES scales (id))',
+    'CREATE TABLE alternatives (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, '
+    'request_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(request_id) REFERENCES requests (id))',
+    'CREATE TABLE ratings (id INTEGER NOT NULL, value VARCHAR(100) NOT NULL, '
+    'alternative_id INTEGER NOT NULL, criterion_id INTEGER NOT NULL, expert_id INTEGER NOT NULL, '
+    'created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(alternative_id) REFERENCES alternatives (id), '
+    'FOREIGN KEY(criterion_id) REFERENCES criteria (id), FOREIGN KEY(expert_id) REFERENCES experts (id))',
+]
+
+LINGUISTIC_SCALE = ['плохо', 'средне', 'хорошо', 'отлично']
+
+
+def populate(engine: Engine, requests: int, experts: int, alternatives: int, criteria: int, seed: int):
+    rnd = random.Random(seed)
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql("INSERT INTO scales VALUES (1, 'num', 'numeric', '1;2;3;4;5;6;7;8;9;10')")
+        conn.exec_driver_sql("INSERT INTO scales VALUES (2, 'ling', 'linguistic', ?)",
+                             (';'.join(LINGUISTIC_SCALE),))
+        rating_id = 0
+        for r in range(1, requests + 1):
+            conn.exec_driver_sql('INSERT INTO requests VALUES (?, ?, NULL, ?, 1, 1)',
+                                 (r, f'request {r}', f'{r:05d}'))
+            base_e, base_a, base_c = (r - 1) * experts, (r - 1) * alternatives, (r - 1) * criteria
+            conn.exec_driver_sql('INSERT INTO experts VALUES (?, ?, NULL, ?)',
+                                 [(base_e + i + 1, f'E{i}', r) for i in range(experts)])
+            conn.exec_driver_sql('INSERT INTO alternatives VALUES (?, ?, ?)',
+                                 [(base_a + i + 1, f'A{i}', r) for i in range(alternatives)])
+            conn.exec_driver_sql('INSERT INTO criteria VALUES (?, ?, 0, ?, ?)',
+                                 [(base_c + i + 1, f'C{i}', r, 1 + i % 2) for i in range(criteria)])
+            rows = []
+            for e in range(experts):
+                for a in range(alternatives):
+                    for c in range(criteria):
+                        rating_id += 1
+                        value = str(float(rnd.randint(1, 10))) if c % 2 == 0 else rnd.choice(LINGUISTIC_SCALE)
+                        rows.append((rating_id, value, base_a + a + 1, base_c + c + 1, base_e + e + 1))
+            conn.exec_driver_sql('INSERT INTO ratings VALUES (?, ?, ?, ?, ?, NULL)', rows)
+        conn.exec_driver_sql('ANALYZE')
+
+
+LEGACY_MATRIX_SQL = (
+    'SELECT ratings.alternative_id, ratings.criterion_id, ratings.expert_id, ratings.value, scales.type '
+    'FROM ratings JOIN experts ON experts.id = ratings.expert_id '
+    'JOIN criteria ON criteria.id = ratings.criterion_id JOIN scales ON scales.id = criteria.scale_id '
+    'WHERE experts.request_id = ?'
+)
+INDEXED_MATRIX_SQL = (
+    'SELECT alternative_id, criterion_id, expert_id, COALESCE(numeric_value, scale_index + 1) '
+    'FROM ratings WHERE request_id = ? AND COALESCE(numeric_value, scale_index + 1) IS NOT NULL '
+    'ORDER BY request_id, alternative_id, criterion_id, expert_id'
+)
+
+
+def legacy_matrix(conn, request_id: int) -> int:
+    # Прежний путь: join с экспертами и разбор строковых значений
+    rows = conn.exec_driver_sql(LEGACY_MATRIX_SQL, (request_id,)).fetchall()
+    positions = {v: i + 1 for i, v in enumerate(LINGUISTIC_SCALE)}
+    values = [float(v) if t == 'numeric' else positions[v] for _, _, _, v, t in rows]
+    return len(values)
+
+
+def indexed_matrix(conn, request_id: int) -> int:
+    # Тот же запрос, что и в RatingStore.from_db
+    return len(conn.exec_driver_sql(INDEXED_MATRIX_SQL, (request_id,)).fetchall())
+
+
+QUERIES: Dict[str, str] = {
+    'ratings by expert': 'SELECT * FROM ratings WHERE expert_id = ?',
+    'ratings by (criterion, alternative)': 'SELECT * FROM ratings WHERE criterion_id = ? AND alternative_id = ?',
+    'alternatives by request': 'SELECT * FROM alternatives WHERE request_id = ?',
+    'experts by request': 'SELECT * FROM experts WHERE request_id = ?',
+    'criteria by request': 'SELECT * FROM criteria WHERE request_id = ?',
+}
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def query_plan(conn, sql: str, params: tuple) -> str:
+    return ' | '.join(row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', params))
+
+
+def measure(engine: Engine, request_id: int, repeat: int,
+            matrix: Callable, matrix_sql: str) -> List[tuple]:
+    report = []
+    with engine.connect() as conn:
+        params = {
+            'ratings by expert': (request_id,),
+            'ratings by (criterion, alternative)': (request_id, request_id),
+            'alternatives by request': (request_id,),
+            'experts by request': (request_id,),
+            'criteria by request': (request_id,),
+        }
+        for title, sql in QUERIES.items():
+            elapsed = timed(lambda: conn.exec_driver_sql(sql, params[title]).fetchall(), repeat)
+            report.append((title, elapsed, query_plan(conn, sql, params[title])))
+        elapsed = timed(lambda: matrix(conn, request_id), repeat)
+        report.append(('full rating matrix of a request', elapsed,
+                       query_plan(conn, matrix_sql, (request_id,))))
+    return report
+
+
+def print_report(title: str, report: List[tuple]):
+    print(f"\n== {title} ==")
+    for name, elapsed, plan in report:
+        print(f"{name:38s} {elapsed * 1000:10.3f} ms   {plan}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк схемы оценок до и после миграций")
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--experts', type=int, default=20)
+    parser.add_argument('--alternatives', type=int, default=100)
+    parser.add_argument('--criteria', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine('sqlite:///' + os.path.join(tmp, 'bench.db'))
+        total = args.requests * args.experts * args.alternatives * args.criteria
+        print(f"[INFO] Генерация {total} оценок...")
+        populate(engine, args.requests, args.experts, args.alternatives, args.criteria, args.seed)
+        request_id = args.requests // 2 + 1
+
+        before = measure(engine, request_id, args.repeat, legacy_matrix, LEGACY_MATRIX_SQL)
+        started = time.perf_counter()
+        upgrade(engine)
+        print(f"[INFO] Миграции применены за {time.perf_counter() - started:.2f} с")
+        after = measure(engine, request_id, args.repeat, indexed_matrix, INDEXED_MATRIX_SQL)
+        engine.dispose()
+
+    print_report('до миграций', before)
+    print_report('после миграций', after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Задержка и пропускная способность обращений к решателю.
+
+Поднимает локальную заглушку решателя (ThreadingHTTPServer с заданной
+задержкой и долей ответов 503) и сравнивает три режима при
+одновременных отправках:
+  legacy  — requests.post без сессии, таймаута и повторов (как раньше);
+  pooled  — SolverClient с пулом соединений и повторами;
+  jobs    — SolverJobs: время постановки в очередь и время до готовности.
+
+Пример:
+    python -m benchmarks.solver_client_bench --clients 16 --calls 20 --delay 0.02
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+import requests
+
+from solver_client import JOB_DONE, JOB_FAILED, SolverClient, SolverJobs
+
+
+def make_stub(delay: float, failure_rate: float, seed: int) -> ThreadingHTTPServer:
+    rnd = random.Random(seed)
+    lock = threading.Lock()
+
+    class StubSolver(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Без этого keep-alive ответы ждут delayed ACK (~40 мс)
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                fail = rnd.random() < failure_rate
+            time.sleep(delay)
+            if fail:
+                body, status = b'{"error": "busy"}', 503
+            else:
+                body = json.dumps([{'alternative': a, 'score': 1.0}
+                                   for a in data.get('alternatives', [])]).encode('utf-8')
+                status = 200
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSolver)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_concurrent(call: Callable[[], None], clients: int, calls: int):
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client_loop():
+        for _ in range(calls):
+            started = time.perf_counter()
+            try:
+                call()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client_loop)
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def report(title: str, latencies: List[float], errors: int, elapsed: float):
+    if latencies:
+        q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+        p50, p95 = q[49] * 1000, q[94] * 1000
+    else:
+        p50 = p95 = float('nan')
+    print(f"{title:8s} {len(latencies) / elapsed:9.1f} вызовов/с   p50 {p50:8.2f} мс   "
+          f"p95 {p95:8.2f} мс   ошибок {errors}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк клиента решателя на локальной заглушке")
+    parser.add_argument('--clients', type=int, default=16, help="одновременных отправителей")
+    parser.add_argument('--calls', type=int, default=20, help="вызовов на отправителя")
+    parser.add_argument('--delay', type=float, default=0.02, help="время ответа заглушки, с")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="доля ответов 503")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    server = make_stub(args.delay, args.failure_rate, args.seed)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/make-decision"
+    payload = {'alternatives': [f'A{i}' for i in range(10)]}
+    print(f"[INFO] Заглушка решателя: {url}")
+
+    def legacy():
+        response = requests.post(url, json=payload)
+        response.raise_for_status()
+        response.json()
+
+    report('legacy', *run_concurrent(legacy, args.clients, args.calls))
+
+    client = SolverClient(url, retries=3, backoff=0.01, pool_size=args.clients)
+    report('pooled', *run_concurrent(lambda: client.solve(payload), args.clients, args.calls))
+
+    # Фоновый режим: маршрут платит только за постановку в очередь
+    jobs = SolverJobs(client, workers=args.clients)
+    total = args.clients * args.calls
+    started = time.perf_counter()
+    enqueue = []
+    job_ids = []
+    for _ in range(total):
+        t = time.perf_counter()
+        job_ids.append(jobs.submit(payload))
+        enqueue.append(time.perf_counter() - t)
+    failed = 0
+    for job_id in job_ids:
+        while jobs.status(job_id)['state'] not in (JOB_DONE, JOB_FAILED):
+            time.sleep(0.001)
+        failed += jobs.status(job_id)['state'] == JOB_FAILED
+    elapsed = time.perf_counter() - started
+    report('jobs', enqueue, failed, elapsed)
+    print(f"[INFO] jobs: все {total} заданий завершены за {elapsed:.2f} с "
+          f"({total / elapsed:.1f} заданий/с)")
+
+    jobs.shutdown()
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
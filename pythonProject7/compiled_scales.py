@@ -0,0 +1,252 @@
+"""Скомпилированные шкалы: значение шкалы -> нормализованная оценка.
+
+Шкала разбирается один раз и превращается в массивы:
+  points — значение каждой позиции шкалы (для числовой шкалы — само
+           число, для лингвистической — число из метки или порядковый
+           номер 1..n, в таком виде оценки хранятся в RatingStore);
+  scores — нормализованная оценка позиции: points / points[-1], как в
+           прежнем делении на последнее значение шкалы, или центр тяжести
+           треугольного нечеткого числа, если оно задано.
+Нечеткое число пишется в метке лингвистической шкалы в скобках:
+'хорошо(0.5, 0.75, 1)' (в Scale.values — 'плохо(0,0,0.5);хорошо(0.5,0.75,1)'),
+или отдельным полем fuzzy критерия InputData. Тройки (l, m, u) делятся на
+наибольшее u шкалы.
+
+ScaleTable собирает скомпилированные шкалы критериев задачи в одну
+таблицу поиска, и оценки всех лингвистических критериев нормализуются
+одной выборкой NumPy по индексам вместо разбора и деления по одной.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NUMERIC = 'numeric'
+LINGUISTIC = 'linguistic'
+
+# Лингвистические критерии с целыми значениями из диапазона не шире этого
+# получают плотную таблицу (значение - минимум -> оценка)
+MAX_DENSE_SPAN = 4096
+
+_FUZZY_LABEL = re.compile(r'^(.*?)\s*\(\s*([^,()]+?)\s*,\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)\s*$')
+
+Triangle = Tuple[float, float, float]
+
+
+def split_label(text: str) -> Tuple[str, Optional[Triangle]]:
+    #Метка и нечеткое число из записи 'метка(l, m, u)'
+    match = _FUZZY_LABEL.match(text)
+    if match is None:
+        return text.strip(), None
+    try:
+        triangle = tuple(float(part) for part in match.group(2, 3, 4))
+    except ValueError:
+        raise ValueError(f"Нечеткое число в значении '{text}' должно состоять из трех чисел")
+    return match.group(1).strip(), triangle
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CompiledScale:
+    def __init__(self, scale_type: str, labels: List[str], points: np.ndarray,
+                 fuzzy: Optional[np.ndarray] = None):
+        self.type = scale_type
+        self.labels = labels
+        self.points = points
+        # Нечеткие числа, деленные на наибольшее u шкалы
+        self.fuzzy = fuzzy
+        if fuzzy is not None:
+            self.scores = fuzzy.mean(axis=1)
+        elif points[-1]:
+            self.scores = points / points[-1]
+        else:
+            raise ValueError("Последнее значение шкалы не может быть нулем")
+        # Оценка нижнего значения шкалы (для стоимостных критериев)
+        self.floor = float(self.scores.min() if fuzzy is not None else self.scores[0])
+        self.index: Dict[str, int] = {label: i for i, label in enumerate(labels)}
+        self._positions = {float(p): i for i, p in enumerate(points.tolist())}
+        # Плотная таблица оценок (значение - low -> оценка) для
+        # лингвистической шкалы с целыми значениями, иначе None
+        self.low = float(points.min())
+        self.dense = None
+        if scale_type == LINGUISTIC and (points == np.round(points)).all() \
+                and points.max() - self.low < MAX_DENSE_SPAN:
+            self.dense = np.full(int(points.max() - self.low) + 1, np.nan)
+            self.dense[(points - self.low).astype(np.int64)] = self.scores
+
+    @property
+    def is_linguistic(self) -> bool:
+        return self.type == LINGUISTIC
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def position(self, value: Any) -> int:
+        """Позиция значения: метка лингвистической шкалы или значение
+        шкалы (для лингвистической без чисел в метках — номер 1..n)."""
+        if isinstance(value, str) and value in self.index:
+            return self.index[value]
+        number = _as_number(value)
+        if number is not None and number in self._positions:
+            return self._positions[number]
+        raise ValueError(f"Значение {value!r} отсутствует в шкале")
+
+    def point(self, value: Any) -> float:
+        #Значение в том виде, в котором оно хранится в RatingStore
+        if self.is_linguistic:
+            return float(self.points[self.position(value)])
+        number = _as_number(value)
+        if number is None:
+            raise ValueError(f"Значение {value!r} должно быть числом")
+        return number
+
+    def score(self, value: Any) -> float:
+        #Нормализованная оценка одного значения
+        if self.is_linguistic:
+            return float(self.scores[self.position(value)])
+        return self.point(value) / float(self.points[-1])
+
+
+@lru_cache(maxsize=1024)
+def _compile(scale_type: str,
+             values: Tuple[Any, ...],
+             fuzzy: Optional[Tuple[Triangle, ...]],
+             ordinal: bool) -> CompiledScale:
+    if not values:
+        raise ValueError("Шкала не может быть пустой")
+    if scale_type != LINGUISTIC:
+        numbers = [_as_number(v) for v in values]
+        if any(n is None for n in numbers):
+            raise ValueError("Числовая шкала должна состоять из чисел")
+        return CompiledScale(NUMERIC, [str(v) for v in values], np.array(numbers, dtype=float))
+
+    labels, triangles = [], []
+    for value in values:
+        label, triangle = split_label(value) if isinstance(value, str) else (str(value), None)
+        labels.append(label)
+        triangles.append(triangle)
+    if len(set(labels)) != len(labels):
+        raise ValueError("Значения лингвистической шкалы должны быть различными")
+    if fuzzy is not None:
+        if len(fuzzy) != len(values):
+            raise ValueError("Число нечетких чисел не совпадает с числом значений шкалы")
+        triangles = list(fuzzy)
+    elif any(t is not None for t in triangles) and not all(t is not None for t in triangles):
+        raise ValueError("Нечеткие числа должны быть заданы для всех значений шкалы или ни для одного")
+
+    # Числа в метках сохраняют прежний смысл значения шкалы; иначе — номер 1..n
+    numbers = [_as_number(label) for label in labels]
+    if not ordinal and all(n is not None for n in numbers) and len(set(numbers)) == len(numbers):
+        points = np.array(numbers, dtype=float)
+    else:
+        points = np.arange(1, len(values) + 1, dtype=float)
+
+    matrix = None
+    if triangles[0] is not None:
+        matrix = np.array(triangles, dtype=float)
+        if matrix.shape != (len(values), 3) or (np.diff(matrix, axis=1) < 0).any():
+            raise ValueError("Нечеткое число задается тройкой l <= m <= u")
+        top = matrix[:, 2].max()
+        if top <= 0:
+            raise ValueError("Верхняя граница нечетких чисел шкалы должна быть положительной")
+        matrix = matrix / top
+    return CompiledScale(LINGUISTIC, labels, points, matrix)
+
+
+def compile_scale(scale_type: str,
+                  values: Sequence[Any],
+                  fuzzy: Optional[Sequence[Sequence[float]]] = None,
+                  ordinal: bool = False) -> CompiledScale:
+    """Скомпилированная шкала (кэшируется по типу, значениям и нечетким
+    числам); ошибки в описании шкалы дают ValueError. При ordinal
+    значениями лингвистической шкалы всегда будут номера 1..n, даже если
+    метки — числа (так хранятся оценки из базы)."""
+    key = tuple(tuple(float(x) for x in t) for t in fuzzy) if fuzzy is not None else None
+    return _compile(LINGUISTIC if scale_type == LINGUISTIC else NUMERIC, tuple(values), key, ordinal)
+
+
+def compile_criterion(criterion: Dict[str, Any]) -> CompiledScale:
+    """Шкала критерия в формате DecisionMaker. Если у критерия есть
+    labels (критерии из базы), scale — номера 1..n для этих меток.
+    Шкала из строк, не являющихся числами, считается лингвистической
+    при любом type."""
+    fuzzy = criterion.get('fuzzy')
+    labels = criterion.get('labels')
+    if labels is not None:
+        return compile_scale(LINGUISTIC, labels, fuzzy, ordinal=True)
+    scale = criterion['scale']
+    scale_type = criterion.get('type')
+    if scale_type != LINGUISTIC and any(isinstance(v, str) and _as_number(v) is None for v in scale):
+        scale_type = LINGUISTIC
+    return compile_scale(scale_type, scale, fuzzy)
+
+
+class ScaleTable:
+    """Шкалы критериев задачи в одной таблице поиска.
+
+    Для лингвистических критериев с целыми значениями (в том числе
+    номерами 1..n) оценки лежат подряд в lookup, и оценка значения v
+    критерия j — lookup[offsets[j] + v]. Остальные лингвистические
+    критерии нормализуются поиском по значениям шкалы, числовые —
+    делением на последнее значение шкалы.
+    """
+
+    def __init__(self, criteria: Sequence[Dict[str, Any]]):
+        self.scales = [compile_criterion(c) for c in criteria]
+        count = len(self.scales)
+        self.scale_max = np.ones(count)
+        self.floor = np.array([s.floor for s in self.scales], dtype=float)
+        self.dense = np.zeros(count, dtype=bool)
+        self.offsets = np.zeros(count, dtype=np.int64)
+        self.low = np.zeros(count)
+        self.span = np.zeros(count)
+        self.sparse: List[int] = []
+        parts, size = [], 0
+        for j, scale in enumerate(self.scales):
+            if not scale.is_linguistic:
+                self.scale_max[j] = scale.points[-1]
+            elif scale.dense is not None:
+                self.dense[j] = True
+                self.offsets[j] = size - int(scale.low)
+                self.low[j] = scale.low
+                self.span[j] = len(scale.dense)
+                parts.append(scale.dense)
+                size += len(scale.dense)
+            else:
+                self.sparse.append(j)
+        self.lookup = np.concatenate(parts) if parts else np.zeros(0)
+
+    def normalize(self, crit_idx: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Нормализованные оценки по столбцам (критерий, значение)."""
+        crit_idx = np.asarray(crit_idx)
+        values = np.asarray(values, dtype=float)
+        normalized = values / self.scale_max[crit_idx]
+        if self.dense.any():
+            selected = self.dense[crit_idx]
+            if selected.any():
+                crit = crit_idx[selected]
+                raw = values[selected]
+                relative = raw - self.low[crit]
+                valid = (relative >= 0) & (relative < self.span[crit]) & (relative == np.floor(relative))
+                if not valid.all():
+                    raise ValueError(f"Значение {raw[~valid][0]!r} отсутствует в шкале критерия")
+                scores = self.lookup[self.offsets[crit] + raw.astype(np.int64)]
+                if np.isnan(scores).any():
+                    raise ValueError(f"Значение {raw[np.isnan(scores)][0]!r} отсутствует в шкале критерия")
+                normalized[selected] = scores
+        for j in self.sparse:
+            selected = crit_idx == j
+            if selected.any():
+                scale = self.scales[j]
+                normalized[selected] = [scale.score(v) for v in values[selected].tolist()]
+        return normalized
@@ -1,19 +1,39 @@
+from array import array
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from pydantic import BaseModel, ValidationError
 import json
+import re
+import numpy as np
+from compiled_scales import compile_criterion
+from rating_store import RatingStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Размер порции чтения файла при потоковом разборе (символов)
+STREAM_CHUNK_SIZE = 1 << 20
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
 
 class Criterion(BaseModel):
     name: str
     type: str
     weight: float
     scale: list
+    # Направление критерия: больше — лучше (benefit) или меньше — лучше (cost)
+    direction: Optional[Literal['benefit', 'cost']] = None
+    # Треугольные нечеткие числа (l, m, u) значений лингвистической шкалы
+    fuzzy: Optional[List[List[float]]] = None
 
 class InputData(BaseModel):
     alternatives: List[str]
     criteria: List[Dict[str, Any]]
     experts: List[str]
     ratings: List[Dict[str, Any]]
+    # Необязательная компетентность экспертов для весов competence
+    expert_competence: Optional[Dict[str, float]] = None
 
 def parse_input(json_path: Path) -> InputData:
     try:
@@ -22,4 +42,208 @@ def parse_input(json_path: Path) -> InputData:
         return InputData(**data)
     except ValidationError as e:
         print(f"Ошибка валидации: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+class _JsonStream:
+    #Последовательное чтение JSON-значений из файла порциями фиксированного размера
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.chunks_read = 0
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Отбрасываем уже разобранную часть буфера
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.chunks_read += 1
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Неожиданный конец JSON-файла")
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Ожидался один из символов {chars!r}, получен {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Число на границе порции могло быть прочитано не полностью
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _index_table(names: List[str], title: str) -> Dict[str, int]:
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        raise ValueError(f"Поле {title} должно быть списком строк")
+    table = {}
+    for name in names:
+        table.setdefault(name, len(table))
+    return table
+
+
+def parse_input_stream(json_path: Path, chunk_size: int = STREAM_CHUNK_SIZE) -> RatingStore:
+    """Потоковый разбор входного файла без построения InputData.
+
+    Оценки читаются по одной и сразу складываются в массивы индексов,
+    поэтому память на разбор ограничена размером порции chunk_size.
+    Каждая оценка проверяется по объявленным альтернативам, критериям
+    и экспертам; ошибки сообщаются через ValueError. Метки лингвистических
+    шкал переводятся в значения шкалы после чтения критериев.
+    """
+    header = {}
+    tables = {}
+    columns = {
+        'alternative': array('i'),
+        'criteria': array('i'),
+        'expert': array('i'),
+    }
+    values = array('d')
+    # Номера оценок с метками вместо чисел и сами метки
+    labelled: Dict[int, str] = {}
+    # Если оценки идут раньше объявлений, имена собираются во временные
+    # таблицы и сопоставляются с объявленными после чтения файла
+    pending = {key: {} for key in columns}
+    field_titles = {'alternative': 'alternatives', 'criteria': 'criteria', 'expert': 'experts'}
+
+    def add_rating(record: Any, number: int):
+        if not isinstance(record, dict):
+            raise ValueError(f"Оценка #{number} должна быть объектом")
+        for key, column in columns.items():
+            name = record.get(key)
+            if not isinstance(name, str):
+                raise ValueError(f"Оценка #{number}: отсутствует поле {key}")
+            table = tables.get(key)
+            if table is not None:
+                if name not in table:
+                    raise ValueError(f"Оценка #{number}: {key} '{name}' не объявлен в {field_titles[key]}")
+                column.append(table[name])
+            else:
+                column.append(pending[key].setdefault(name, len(pending[key])))
+        value = record.get('value')
+        if isinstance(value, str):
+            labelled[len(values)] = value
+            value = 0.0
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Оценка #{number}: значение должно быть числом или меткой шкалы")
+        values.append(value)
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            stream.expect('}')
+        else:
+            while True:
+                key = stream.value()
+                stream.expect(':')
+                if key == 'ratings':
+                    stream.expect('[')
+                    if stream.peek() == ']':
+                        stream.expect(']')
+                    else:
+                        while True:
+                            add_rating(stream.value(), len(values) + 1)
+                            if stream.expect(',]') == ']':
+                                break
+                else:
+                    header[key] = stream.value()
+                    if key == 'alternatives':
+                        tables['alternative'] = _index_table(header[key], key)
+                    elif key == 'experts':
+                        tables['expert'] = _index_table(header[key], key)
+                    elif key == 'expert_competence':
+                        competence = header[key]
+                        if not isinstance(competence, dict) or not all(
+                                isinstance(v, (int, float)) and not isinstance(v, bool)
+                                for v in competence.values()):
+                            raise ValueError("Поле expert_competence должно сопоставлять экспертам числа")
+                    elif key == 'criteria':
+                        try:
+                            criteria = [Criterion(**c).model_dump() for c in header[key]]
+                        except (TypeError, ValidationError) as e:
+                            print(f"Ошибка валидации: {e}")
+                            raise
+                        header[key] = criteria
+                        tables['criteria'] = _index_table([c['name'] for c in criteria], key)
+                if stream.expect(',}') == '}':
+                    break
+
+    for key in ('alternatives', 'criteria', 'experts'):
+        if key not in header:
+            raise ValueError(f"Отсутствует обязательное поле {key}")
+
+    for key, column in columns.items():
+        names = pending[key]
+        if not names:
+            continue
+        table = tables[key]
+        missing = [name for name in names if name not in table]
+        if missing:
+            raise ValueError(f"{key} '{missing[0]}' не объявлен в {field_titles[key]}")
+        remap = np.array([table[name] for name in names], dtype=np.int32)
+        remapped = remap[np.frombuffer(column, dtype=np.int32)]
+        columns[key] = array('i', remapped.tobytes())
+
+    if labelled:
+        scales = [compile_criterion(c) for c in header['criteria']]
+        crit_column = columns['criteria']
+        for position, label in labelled.items():
+            try:
+                values[position] = scales[crit_column[position]].point(label)
+            except ValueError as e:
+                raise ValueError(f"Оценка #{position + 1}: {e}")
+
+    stats = {
+        'ratings': len(values),
+        'chunks_read': stream.chunks_read,
+        'chunk_size': chunk_size,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+    return RatingStore(
+        alternatives=list(tables['alternative']),
+        criteria=header['criteria'],
+        experts=list(tables['expert']),
+        alt_idx=columns['alternative'],
+        crit_idx=columns['criteria'],
+        expert_idx=columns['expert'],
+        values=values,
+        stats=stats,
+        expert_competence=header.get('expert_competence'),
+    )
@@ -0,0 +1,86 @@
+"""Настройки подключения к базе: PRAGMA SQLite и пул соединений.
+
+Все параметры задаются через app.config, а значения по умолчанию
+берутся из переменных окружения с теми же именами.
+"""
+import os
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE_KB': 64 * 1024,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_BUSY_TIMEOUT_MS': 10000,
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 20,
+    'DB_POOL_TIMEOUT': 30,
+}
+
+
+def configure_database(app, default_uri: str):
+    #Заполнение app.config настройками базы из окружения
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', default_uri)
+    for key, default in DEFAULTS.items():
+        raw = os.environ.get(key)
+        if raw is None:
+            app.config.setdefault(key, default)
+        else:
+            app.config[key] = type(default)(raw)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def _is_sqlite_file(uri: str) -> bool:
+    return uri.startswith('sqlite') and ':memory:' not in uri and uri.rstrip('/') != 'sqlite:'
+
+
+def engine_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {}
+    if uri.startswith('sqlite'):
+        # Ожидание блокировки на уровне драйвера, в секундах
+        options['connect_args'] = {
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+            'check_same_thread': False,
+        }
+        if not _is_sqlite_file(uri):
+            return options
+    options.update({
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    })
+    return options
+
+
+def install_sqlite_pragmas(engine: Engine, config: Dict[str, Any]):
+    """PRAGMA для каждого нового соединения SQLite.
+
+    WAL позволяет читателям не ждать писателя, synchronous=NORMAL в WAL
+    сохраняет целостность и убирает fsync на каждом коммите, а
+    busy_timeout заставляет писателей ждать блокировку вместо ошибки
+    'database is locked'.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        # Отрицательное значение cache_size задает размер в килобайтах
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -1,63 +1,234 @@
 import numpy as np
+from aggregation import (AGGREGATION_MEAN, EXPERT_WEIGHTINGS, OPERATORS, WEIGHTING_UNIFORM,
+                         aggregate, weighting_vector)
+from compiled_scales import ScaleTable, compile_criterion
 from data_parser import InputData
-from typing import Dict
+from metrics import stage
+from mcdm import (COST, METHOD_WEIGHTED_SUM, METHODS, DecisionMatrix, apply_method, criterion_direction,
+                  round_half_up)
+from ranking import ranked
+from rating_store import RatingStore
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+# Режимы расчета: векторизованный (по умолчанию) и эталонный на словарях
+ENGINE_VECTORIZED = 'vectorized'
+ENGINE_REFERENCE = 'reference'
+ENGINES = (ENGINE_VECTORIZED, ENGINE_REFERENCE)
 
 
 class DecisionMaker:
-    def __init__(self, data: InputData):
+    def __init__(self,
+                 data: Union[InputData, RatingStore],
+                 engine: str = ENGINE_VECTORIZED,
+                 aggregation: str = AGGREGATION_MEAN,
+                 expert_weighting: str = WEIGHTING_UNIFORM,
+                 aggregation_options: Optional[Dict[str, Any]] = None,
+                 method: str = METHOD_WEIGHTED_SUM,
+                 method_options: Optional[Dict[str, Any]] = None,
+                 top_k: Optional[int] = None):
+        """aggregation и expert_weighting — имена из aggregation.OPERATORS и
+        aggregation.EXPERT_WEIGHTINGS; aggregation_options передаются оператору.
+        method — метод из mcdm.METHODS, method_options — его параметры.
+        top_k — в ranking попадают только лучшие top_k альтернатив (частичная
+        сортировка); final_scores остаются полными."""
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный режим расчета: {engine}")
+        if aggregation not in OPERATORS:
+            raise ValueError(f"Неизвестный оператор агрегации: {aggregation}")
+        if expert_weighting not in EXPERT_WEIGHTINGS:
+            raise ValueError(f"Неизвестная схема весов экспертов: {expert_weighting}")
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод: {method}")
+        if engine == ENGINE_REFERENCE and aggregation != AGGREGATION_MEAN:
+            raise ValueError("Эталонный режим поддерживает только агрегацию mean")
+        if engine == ENGINE_REFERENCE and method != METHOD_WEIGHTED_SUM:
+            raise ValueError("Эталонный режим поддерживает только метод weighted_sum")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k должен быть положительным")
         self.data = data
+        self.engine = engine
+        self.aggregation = aggregation
+        self.expert_weighting = expert_weighting
+        self.aggregation_options = aggregation_options or {}
+        self.method = method
+        self.method_options = method_options or {}
+        self.top_k = top_k
         self.results = {}
+        # Матрица решений и веса экспертов строятся один раз на все методы
+        self._matrix = None
+        self._criteria_scores = None
 
     def calculate(self) -> Dict[str, any]:
-        # 1. Нормализация оценок
-        normalized = self._normalize_ratings()
+        if self.engine == ENGINE_REFERENCE:
+            final_scores, expert_weights, aggregated = self._calculate_reference()
+            criteria_weights = {c['name']: float(c['weight']) for c in self.data.criteria}
+            self.results = self._build_results(final_scores, expert_weights, criteria_weights,
+                                               aggregated, self.method, {}, self.top_k)
+        else:
+            self.results = self._method_results(self.method, self.method_options)
+        return self.results
 
-        # 2. Автоматический расчет равных весов для экспертов
-        expert_weights = self._calculate_expert_weights()
+    def calculate_methods(self,
+                          methods: Iterable[str],
+                          options: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Результаты нескольких методов по одной задаче.
 
-        # 3. Расчет агрегированных оценок с учетом весов экспертов
-        aggregated = self._aggregate_ratings(normalized, expert_weights)
+        Нормализация и агрегация выполняются один раз, каждый метод —
+        отдельный проход по готовой матрице. options — параметры по
+        именам методов.
+        """
+        if self.engine == ENGINE_REFERENCE:
+            raise ValueError("Сравнение методов доступно только в векторизованном режиме")
+        options = options or {}
+        return {name: self._method_results(name, options.get(name)) for name in methods}
 
-        # 4. Расчет итоговых оценок с весами критериев
-        final_scores = self._calculate_final_scores(aggregated)
+    def sensitivity(self, **kwargs) -> Dict[str, Any]:
+        """Анализ чувствительности рейтинга выбранного метода к весам
+        критериев (sensitivity.analyze) по уже построенной матрице."""
+        if self.engine == ENGINE_REFERENCE:
+            raise ValueError("Анализ чувствительности доступен только в векторизованном режиме")
+        from sensitivity import analyze
+
+        matrix, _ = self._decision_matrix()
+        return analyze(matrix, method=self.method, method_options=self.method_options, **kwargs)
 
-        # 5. Сортировка результатов
-        sorted_scores = sorted(
-            final_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+    @staticmethod
+    def _build_results(final_scores: Dict[str, float],
+                       expert_weights: Dict[str, float],
+                       criteria_weights: Dict[str, float],
+                       aggregated: Dict[str, Dict[str, float]],
+                       method: str,
+                       details: Dict[str, Any],
+                       top_k: Optional[int] = None) -> Dict[str, Any]:
+        # 5. Сортировка результатов (при top_k — частичная)
+        sorted_scores = ranked(list(final_scores), list(final_scores.values()), top_k)
 
-        self.results = {
+        results = {
             'expert_weights': expert_weights,
-            'criteria_weights': {c['name']: c['weight'] for c in self.data.criteria},
+            'criteria_weights': criteria_weights,
             'final_scores': final_scores,
-            'ranking': sorted_scores
+            'criteria_scores': aggregated,
+            'ranking': sorted_scores,
+            'method': method,
         }
-        return self.results
+        if details:
+            results['method_details'] = details
+        return results
+
+    def _method_results(self, method: str, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        matrix, expert_weights = self._decision_matrix()
+        with stage('final_scores'):
+            scores, weights, details = apply_method(method, matrix, options)
+            alternatives = matrix.alternatives
+            final_scores = {alt: float(score) for alt, score in zip(alternatives, scores)}
+            criteria_weights = {name: float(w) for name, w in zip(matrix.criteria, weights)}
+        if self._criteria_scores is None:
+            # Агрегированные оценки по критериям, у которых есть хотя бы одна
+            # оценка; одинаковы для всех методов
+            self._criteria_scores = {
+                alt: {crit: value for crit, value, rated in zip(matrix.criteria, row, rated_row) if rated}
+                for alt, row, rated_row in zip(alternatives, matrix.values.tolist(), matrix.rated.tolist())
+            }
+        criteria_scores = self._criteria_scores
+        # Покомпонентные подробности метода — по именам альтернатив
+        details = {key: dict(zip(alternatives, value.tolist())) if isinstance(value, np.ndarray) else value
+                   for key, value in details.items()}
+        return self._build_results(final_scores, dict(expert_weights), criteria_weights,
+                                   criteria_scores, method, details, self.top_k)
+
+    def _calculate_reference(self) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, Dict[str, float]]]:
+        # 1. Нормализация оценок
+        with stage('normalize'):
+            normalized = self._normalize_ratings()
+
+        with stage('aggregate'):
+            # 2. Автоматический расчет равных весов для экспертов
+            expert_weights = self._calculate_expert_weights()
+
+            # 3. Расчет агрегированных оценок с учетом весов экспертов
+            aggregated = self._aggregate_ratings(normalized, expert_weights)
+
+        # 4. Расчет итоговых оценок с весами критериев
+        with stage('final_scores'):
+            final_scores = self._calculate_final_scores(aggregated)
+        return final_scores, expert_weights, aggregated
+
+    def _decision_matrix(self) -> Tuple[DecisionMatrix, Dict[str, float]]:
+        """Нормализация и агрегация, как в эталонном режиме, но на тензоре
+        (альтернативы × критерии × эксперты)"""
+        if self._matrix is None:
+            self._matrix = self._build_matrix()
+        return self._matrix
+
+    def _build_matrix(self) -> Tuple[DecisionMatrix, Dict[str, float]]:
+        with stage('normalize'):
+            # Оценки раскладываются по столбцам индексов один раз
+            store = self.data if isinstance(self.data, RatingStore) else RatingStore.from_input(self.data)
+            alternatives = store.alternatives
+            experts = store.experts
+            alt_idx, crit_idx, expert_idx, raw = store.columns()
+            shape = (len(alternatives), len(store.criteria), len(experts))
+
+            # 1. Нормализация по скомпилированным шкалам: деление на последнее
+            # значение числовой шкалы, выборка из таблицы для лингвистической
+            table = ScaleTable(store.criteria)
+            scores = table.normalize(crit_idx, raw)
+            normalized, mask = self._build_tensor(shape, alt_idx, crit_idx, expert_idx, scores)
+
+        with stage('aggregate'):
+            expert_weights = self._calculate_expert_weights()
+            expert_vector = np.array([expert_weights[e] for e in experts], dtype=float)
+
+            # 2-3. Свертка по оси экспертов выбранным оператором
+            aggregated = round_half_up(aggregate(self.aggregation, normalized, mask, expert_vector,
+                                                 self.aggregation_options), 4)
+
+        # В матрицу попадают только альтернативы, по которым есть оценки,
+        # в порядке первого появления (как в эталонном режиме)
+        rated, first_seen = np.unique(alt_idx, return_index=True)
+        order = rated[np.argsort(first_seen, kind='stable')]
+        matrix = DecisionMatrix([alternatives[i] for i in order], store.criteria,
+                                aggregated[order], mask.any(axis=2)[order], table.floor)
+        # 4. Взвешивание критериев — в методе (mcdm.METHODS)
+        return matrix, expert_weights
+
+    @staticmethod
+    def _build_tensor(shape: Tuple[int, int, int],
+                      alt_idx: np.ndarray,
+                      crit_idx: np.ndarray,
+                      expert_idx: np.ndarray,
+                      raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        #Плотный тензор оценок и маска заполненных ячеек
+        values = np.zeros(shape, dtype=float)
+        mask = np.zeros(shape, dtype=bool)
+        # Повторная оценка той же ячейки перезаписывает предыдущую
+        values[alt_idx, crit_idx, expert_idx] = raw
+        mask[alt_idx, crit_idx, expert_idx] = True
+        return values, mask
 
     def _calculate_expert_weights(self) -> Dict[str, float]:
-        #Равномерное распределение весов между экспертами
-        num_experts = len(self.data.experts)
-        return {expert: 1.0 / num_experts for expert in self.data.experts}
+        #Веса экспертов по выбранной схеме (по умолчанию равные)
+        experts = list(self.data.experts)
+        competence = getattr(self.data, 'expert_competence', None)
+        weights = weighting_vector(self.expert_weighting, experts, competence)
+        return {expert: float(w) for expert, w in zip(experts, weights)}
 
     def _normalize_ratings(self) -> Dict[str, Dict[str, Dict[str, float]]]:
         #Нормализация оценок для каждого эксперта
         normalized = {}
+        scales = {c['name']: compile_criterion(c) for c in self.data.criteria}
         for rating in self.data.ratings:
             alt = rating['alternative']
             crit = rating['criteria']
             expert = rating['expert']
             value = rating['value']
 
-            max_val = next(c['scale'][-1] for c in self.data.criteria if c['name'] == crit)
-
             if alt not in normalized:
                 normalized[alt] = {}
             if crit not in normalized[alt]:
                 normalized[alt][crit] = {}
 
-            normalized[alt][crit][expert] = value / max_val
+            normalized[alt][crit][expert] = scales[crit].score(value)
         return normalized
 
     def _aggregate_ratings(self,
@@ -73,7 +244,7 @@ class DecisionMaker:
                     value * expert_weights[expert]
                     for expert, value in expert_values.items()
                 )
-                aggregated[alt][crit] = round(aggregated_score, 4)
+                aggregated[alt][crit] = float(round_half_up(aggregated_score, 4))
         return aggregated
 
     def _calculate_final_scores(self,
@@ -81,11 +252,42 @@ class DecisionMaker:
         """Расчет финальных оценок с учетом весов критериев"""
         scores = {}
         crit_weights = {c['name']: c['weight'] for c in self.data.criteria}
+        # Оценки стоимостных критериев отражаются на шкале: меньше — лучше
+        cost_scale_min = {c['name']: compile_criterion(c).floor for c in self.data.criteria
+                          if criterion_direction(c) == COST}
 
         for alt, crit_values in aggregated.items():
             total = sum(
-                value * crit_weights[crit]
+                (1.0 + cost_scale_min[crit] - value if crit in cost_scale_min else value) * crit_weights[crit]
                 for crit, value in crit_values.items()
             )
-            scores[alt] = round(total, 2)
-            return scores
\ No newline at end of file
+            scores[alt] = float(round_half_up(total, 2))
+        return scores
+
+
+def decision_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры DecisionMaker из конфигурации приложения (AGGREGATION,
+    AGGREGATION_OPTIONS, EXPERT_WEIGHTING, METHOD, METHOD_OPTIONS);
+    значения по умолчанию опускаются."""
+    options = {}
+    name = config.get('AGGREGATION', AGGREGATION_MEAN)
+    weighting = config.get('EXPERT_WEIGHTING', WEIGHTING_UNIFORM)
+    method = config.get('METHOD', METHOD_WEIGHTED_SUM)
+    if name not in OPERATORS:
+        raise ValueError(f"Неизвестный оператор агрегации: {name}. Доступны: {', '.join(OPERATORS)}")
+    if weighting not in EXPERT_WEIGHTINGS:
+        raise ValueError(f"Неизвестная схема весов экспертов: {weighting}. "
+                         f"Доступны: {', '.join(EXPERT_WEIGHTINGS)}")
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод: {method}. Доступны: {', '.join(METHODS)}")
+    if name != AGGREGATION_MEAN:
+        options['aggregation'] = name
+    if config.get('AGGREGATION_OPTIONS'):
+        options['aggregation_options'] = dict(config['AGGREGATION_OPTIONS'])
+    if weighting != WEIGHTING_UNIFORM:
+        options['expert_weighting'] = weighting
+    if method != METHOD_WEIGHTED_SUM:
+        options['method'] = method
+    if config.get('METHOD_OPTIONS'):
+        options['method_options'] = dict(config['METHOD_OPTIONS'])
+    return options
@@ -1,14 +1,26 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pathlib import Path
+import logging
 import pandas as pd
 
+from metrics import EXPORT_LATENCY
+from ranking import top_ranking
+
+logger = logging.getLogger(__name__)
+
 
 class ExcelExporter:
-    def __init__(self, results: Dict[str, Any]):
+    def __init__(self, results: Dict[str, Any], top: Optional[int] = None):
+        #top — выгрузить только первые top мест рейтинга
         self.results = results
+        self.top = top
 
     def export(self, output_path: Path):
-        print(f"[DEBUG] Начало экспорта в {output_path}")
+        with EXPORT_LATENCY.time(format='excel'):
+            self._export(output_path)
+
+    def _export(self, output_path: Path):
+        logger.debug(f"Начало экспорта в {output_path}")
         try:
             # Проверка обязательных ключей
             required_keys = ['criteria_weights', 'expert_weights', 'ranking']
@@ -38,7 +50,7 @@ class ExcelExporter:
                         "Alternative": alt,
                         "Final Score": score
                     }
-                    for idx, (alt, score) in enumerate(self.results['ranking'])
+                    for idx, (alt, score) in enumerate(top_ranking(self.results, self.top))
                 ]
 
                 pd.DataFrame(ranking_data).to_excel(
@@ -50,5 +62,5 @@ class ExcelExporter:
                 )
 
         except Exception as e:
-            print(f"[ERROR] Ошибка экспорта: {str(e)}")
+            logger.error(f"Ошибка экспорта: {str(e)}")
             raise
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""Фоновая подготовка выгрузок результатов запроса.
+
+Файл выгрузки строится StreamingExporter в пуле потоков и сохраняется
+в каталоге выгрузок под именем, включающим id запроса,
+Request.ratings_version и число мест рейтинга (если выгружаются только
+лучшие). Пока оценки не менялись, повторное скачивание
+отдает уже готовый файл; после новой записи оценок версия растет и
+файл строится заново, а устаревшие версии удаляются.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import result_cache
+from exporters import StreamingExporter, pa
+from rating_store import RatingStore
+from solver_client import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+
+logger = logging.getLogger(__name__)
+
+# Расширение файла для каждого формата StreamingExporter
+EXTENSIONS = {
+    'xlsx': 'xlsx',
+    'csv': 'csv.zip',
+    'parquet': 'parquet.zip',
+}
+MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'application/zip',
+    'parquet': 'application/zip',
+}
+
+# Ключ выгрузки: (request_id, ratings_version, формат, число мест или None — все)
+ExportKey = Tuple[int, int, str, Optional[int]]
+
+
+def available_formats() -> Tuple[str, ...]:
+    return tuple(fmt for fmt in EXTENSIONS if fmt != 'parquet' or pa is not None)
+
+
+class ExportJobs:
+    def __init__(self, export_dir: str, workers: int = 2):
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._jobs: Dict[ExportKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def artifact_path(self, key: ExportKey) -> Path:
+        request_id, version, fmt, top = key
+        suffix = f"_top{top}" if top else ''
+        return self.export_dir / f"request_{request_id}_v{version}{suffix}.{EXTENSIONS[fmt]}"
+
+    def ready(self, key: ExportKey) -> Optional[Path]:
+        path = self.artifact_path(key)
+        return path if path.exists() else None
+
+    def start(self, key: ExportKey, retry: bool = False) -> Dict[str, Any]:
+        """Запуск построения выгрузки, если она еще не готова и не строится.
+
+        Возвращает состояние задания; повторные вызовы с тем же ключом не
+        создают новых заданий. Неудавшееся задание остается в состоянии
+        failed с текстом ошибки и перезапускается только при retry=True.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and (job['state'] != JOB_FAILED or not retry):
+                return dict(job)
+            if self.ready(key):
+                return {'state': JOB_DONE, 'error': None}
+            job = self._jobs[key] = {'state': JOB_PENDING, 'error': None}
+        self._executor.submit(self._build, key)
+        return dict(job)
+
+    def status(self, key: ExportKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return dict(job) if job is not None else None
+
+    def _set(self, key: ExportKey, **fields):
+        with self._lock:
+            self._jobs[key].update(fields)
+
+    def _build(self, key: ExportKey):
+        from app import app
+
+        request_id, version, fmt, top = key
+        self._set(key, state=JOB_RUNNING)
+        path = self.artifact_path(key)
+        partial_path = path.with_name(path.name + '.part')
+        try:
+            with app.app_context():
+                store = RatingStore.from_db(request_id)
+            if not len(store):
+                raise ValueError(f"У запроса {request_id} нет оценок")
+            # Лучшие top мест выбираются частичной сортировкой
+            options = {'top_k': top} if top else {}
+            results = result_cache.cached_calculate(store, request_id=request_id, **options)
+            StreamingExporter(results, store, top=top).export(partial_path, fmt)
+            # Готовый файл появляется под итоговым именем атомарно
+            os.replace(partial_path, path)
+        except Exception as e:
+            partial_path.unlink(missing_ok=True)
+            logger.error(f"Ошибка выгрузки запроса {request_id}: {str(e)}")
+            self._set(key, state=JOB_FAILED, error=str(e))
+            return
+        self._remove_stale(key)
+        with self._lock:
+            # Готовый файл сам служит признаком завершения
+            self._jobs.pop(key, None)
+
+    def _remove_stale(self, key: ExportKey):
+        #Удаление выгрузок того же запроса и формата с прежними версиями
+        request_id, version, fmt, _ = key
+        current = f"request_{request_id}_v{version}"
+        pattern = f"request_{request_id}_v*.{EXTENSIONS[fmt]}"
+        for path in self.export_dir.glob(pattern):
+            # Выгрузки текущей версии с другим числом мест остаются
+            if not path.name.startswith((current + '.', current + '_')):
+                path.unlink(missing_ok=True)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+default_jobs: Optional[ExportJobs] = None
+
+
+def configure(export_dir: str, workers: int = 2) -> ExportJobs:
+    global default_jobs
+    if default_jobs is not None:
+        default_jobs.shutdown(wait=False)
+    default_jobs = ExportJobs(export_dir, workers)
+    return default_jobs
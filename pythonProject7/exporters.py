@@ -0,0 +1,187 @@
+"""Экспорт результатов в XLSX, CSV и Parquet с постоянным расходом памяти.
+
+В отличие от ExcelExporter (три сводных листа через pandas) здесь
+выгружаются также агрегированные оценки по критериям и, если передан
+RatingStore, полная матрица оценок. Строки формируются блоками из
+столбцов RatingStore и сразу записываются:
+  xlsx    — openpyxl в режиме write_only; оценки делятся на листы по
+            лимиту строк Excel;
+  csv     — ZIP-архив с CSV-файлом на каждую таблицу;
+  parquet — ZIP-архив с Parquet-файлом на каждую таблицу (нужен pyarrow).
+"""
+import csv
+import io
+import logging
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from openpyxl import Workbook
+
+from metrics import EXPORT_LATENCY
+from ranking import top_ranking
+from rating_store import RatingStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet необязателен
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+# Строк оценок в одном блоке при формировании таблиц
+CHUNK_ROWS = 65536
+# Лимит строк листа Excel (с учетом строки заголовка)
+XLSX_MAX_ROWS = 1048576 - 1
+
+# Таблица: имя, заголовок и генератор блоков строк (списки кортежей)
+Table = Tuple[str, List[str], Iterator[List[tuple]]]
+
+# Типы столбцов Parquet по таблицам; столбцы сверх перечисленных (оценки по
+# критериям) — float64. Тип не выводится из данных: иначе столбец, пустой
+# в первом блоке, получил бы тип null, а целые веса — int64
+PARQUET_TYPES = {
+    'criteria_weights': ('string', 'float64'),
+    'expert_weights': ('string', 'float64'),
+    'ranking': ('int64', 'string', 'float64'),
+    'criteria_scores': ('string',),
+    'ratings': ('string', 'string', 'string', 'float64'),
+}
+
+
+def _parquet_schema(name: str, header: List[str]):
+    types = PARQUET_TYPES[name]
+    return pa.schema([(column, pa.type_for_alias(types[i] if i < len(types) else 'float64'))
+                      for i, column in enumerate(header)])
+
+
+def _chunks(rows: List[tuple]) -> Iterator[List[tuple]]:
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield rows[start:start + CHUNK_ROWS]
+
+
+class StreamingExporter:
+    def __init__(self, results: Dict[str, Any], store: Optional[RatingStore] = None,
+                 top: Optional[int] = None):
+        """top — в рейтинг и таблицу оценок по критериям попадают только
+        первые top мест."""
+        self.results = results
+        self.store = store
+        self.top = top
+
+    def tables(self) -> List[Table]:
+        #Таблицы экспорта в порядке записи
+        results = self.results
+        ranking = top_ranking(results, self.top)
+        tables = [
+            ('criteria_weights', ['Criterion', 'Weight'],
+             _chunks(list(results['criteria_weights'].items()))),
+            ('expert_weights', ['Expert', 'Weight'],
+             _chunks(list(results['expert_weights'].items()))),
+            ('ranking', ['Rank', 'Alternative', 'Final Score'],
+             _chunks([(i + 1, alt, score) for i, (alt, score) in enumerate(ranking)])),
+        ]
+        criteria = list(results['criteria_weights'])
+        if results.get('criteria_scores'):
+            tables.append(('criteria_scores', ['Alternative'] + criteria,
+                           self._criteria_score_rows(criteria, ranking)))
+        if self.store is not None:
+            tables.append(('ratings', ['Alternative', 'Criterion', 'Expert', 'Value'], self._rating_rows()))
+        return tables
+
+    def _criteria_score_rows(self, criteria: List[str], ranking: List[tuple]) -> Iterator[List[tuple]]:
+        # Широкая таблица: альтернатива × критерии, в порядке рейтинга
+        scores = self.results['criteria_scores']
+        block = []
+        for alt, _ in ranking:
+            row = scores.get(alt, {})
+            block.append((alt,) + tuple(row.get(c) for c in criteria))
+            if len(block) == CHUNK_ROWS:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    def _rating_rows(self) -> Iterator[List[tuple]]:
+        # Имена подставляются по индексам блоком, без словаря на каждую оценку
+        store = self.store
+        alternatives = np.asarray(store.alternatives, dtype=object)
+        criteria = np.asarray([c['name'] for c in store.criteria], dtype=object)
+        experts = np.asarray(store.experts, dtype=object)
+        alt_idx, crit_idx, expert_idx, values = store.columns()
+        for start in range(0, len(values), CHUNK_ROWS):
+            end = start + CHUNK_ROWS
+            yield list(zip(alternatives[alt_idx[start:end]].tolist(),
+                           criteria[crit_idx[start:end]].tolist(),
+                           experts[expert_idx[start:end]].tolist(),
+                           values[start:end].tolist()))
+
+    def export(self, output_path: Path, fmt: Optional[str] = None) -> Path:
+        output_path = Path(output_path)
+        fmt = fmt or output_path.suffix.lstrip('.').lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат экспорта: {fmt}. Доступны: {', '.join(EXPORT_FORMATS)}")
+        logger.info(f"Экспорт ({fmt}) в {output_path}")
+        with EXPORT_LATENCY.time(format=fmt):
+            if fmt == 'xlsx':
+                self._export_xlsx(output_path)
+            elif fmt == 'csv':
+                self._export_csv(output_path)
+            else:
+                self._export_parquet(output_path)
+        return output_path
+
+    def _export_xlsx(self, output_path: Path):
+        workbook = Workbook(write_only=True)
+        for name, header, blocks in self.tables():
+            part, written, sheet = 1, 0, None
+            for block in blocks:
+                for row in block:
+                    if sheet is None or written == XLSX_MAX_ROWS:
+                        # Продолжение таблицы на следующем листе
+                        title = name if part == 1 else f"{name}_{part}"
+                        sheet = workbook.create_sheet(title[:31])
+                        sheet.append(header)
+                        part, written = part + 1, 0
+                    sheet.append(row)
+                    written += 1
+            if sheet is None:
+                workbook.create_sheet(name[:31]).append(header)
+        workbook.save(output_path)
+
+    def _export_csv(self, output_path: Path):
+        # Быстрое сжатие: узкое место — запись строк, а не размер архива
+        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            for name, header, blocks in self.tables():
+                with archive.open(f"{name}.csv", 'w', force_zip64=True) as member:
+                    text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                    writer = csv.writer(text)
+                    writer.writerow(header)
+                    for block in blocks:
+                        writer.writerows(block)
+                    text.flush()
+                    text.detach()
+
+    def _export_parquet(self, output_path: Path):
+        if pa is None:
+            raise RuntimeError("Для экспорта в Parquet установите pyarrow")
+        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_STORED) as archive, \
+                tempfile.TemporaryDirectory(dir=output_path.parent) as tmp:
+            for name, header, blocks in self.tables():
+                # ParquetWriter нужен файл с позиционированием, поэтому таблица
+                # сначала пишется во временный файл, а затем копируется в архив
+                part_path = Path(tmp) / f"{name}.parquet"
+                schema = _parquet_schema(name, header)
+                with pq.ParquetWriter(part_path, schema) as writer:
+                    for block in blocks:
+                        # Каждый блок — отдельная группа строк файла
+                        columns = [pa.array(col, type=field.type) for col, field in zip(zip(*block), schema)]
+                        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                archive.write(part_path, f"{name}.parquet")
+                part_path.unlink()
@@ -0,0 +1,333 @@
+"""Инкрементальный пересчет итоговых оценок запроса.
+
+Для каждого запроса хранится состояние: взвешенные суммы нормализованных
+оценок и число оценок по каждой паре (альтернатива, критерий), а также
+итоговые оценки альтернатив. Оценки одного эксперта учитываются за
+O(альтернативы × критерии его отправки), а рейтинг строится сортировкой
+уже готовых итоговых оценок без полного пересчета.
+
+Состояние воспроизводит только расчет DecisionMaker по умолчанию
+(среднее, равные веса экспертов, взвешенная сумма); при других
+параметрах (decision_options) оно не используется — см. applicable.
+Состояние строится при первой отправке оценок или первом запросе
+результата и перестраивается, если у запроса изменился состав
+альтернатив, критериев или экспертов.
+"""
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+
+from compiled_scales import ScaleTable
+from decision_maker import DecisionMaker
+from mcdm import METHOD_WEIGHTED_SUM, round_half_up
+from ranking import rank_order
+from rating_store import RatingStore, request_criteria, unique_names
+
+# Ячейка матрицы оценок: (alternative_id, criterion_id)
+Cell = Tuple[int, int]
+
+
+class StaleScoreState(Exception):
+    """Состояние в базе успело измениться с момента загрузки"""
+
+
+def applicable(options: Dict[str, Any]) -> bool:
+    #Состояние применимо только при параметрах DecisionMaker по умолчанию
+    return not options
+
+
+class IncrementalScore:
+    def __init__(self,
+                 request_id: int,
+                 alternatives: List[Tuple[int, str]],
+                 criteria: List[Tuple[int, str]],
+                 experts: List[Tuple[int, str]],
+                 sums: Optional[np.ndarray] = None,
+                 counts: Optional[np.ndarray] = None,
+                 scores: Optional[np.ndarray] = None,
+                 version: int = 0,
+                 ratings_version: int = -1):
+        """version — номер записи состояния (оптимистическая блокировка),
+        ratings_version — Request.ratings_version, до которой учтены оценки."""
+        self.request_id = request_id
+        self.alternatives = alternatives
+        self.criteria = criteria
+        self.experts = experts
+        self.version = version
+        self.ratings_version = ratings_version
+
+        shape = (len(alternatives), len(criteria))
+        self.sums = sums if sums is not None else np.zeros(shape)
+        self.counts = counts if counts is not None else np.zeros(shape, dtype=np.int64)
+        self.scores = scores if scores is not None else np.zeros(len(alternatives))
+
+        self.alt_pos = {row_id: i for i, (row_id, _) in enumerate(alternatives)}
+        self.crit_pos = {row_id: i for i, (row_id, _) in enumerate(criteria)}
+
+        _, crit_dicts, self.converters = request_criteria(request_id)
+        self.crit_weights = np.array([c['weight'] for c in crit_dicts], dtype=float)
+        # Нормализация значений шкал по номеру критерия (compiled_scales.py)
+        self.scales = ScaleTable(crit_dicts)
+        # Имена не повторяются, как в RatingStore: результаты адресуются по ним
+        unique_names((name for _, name in alternatives), 'альтернативы')
+        unique_names((name for _, name in criteria), 'критерии')
+        # Веса экспертов равные, а агрегация — среднее, как в DecisionMaker по умолчанию
+        expert_names = unique_names((name for _, name in experts), 'эксперты')
+        self.expert_weights = {name: 1.0 / len(expert_names) for name in expert_names}
+        self.expert_weight = 1.0 / len(expert_names) if expert_names else 0.0
+
+    @classmethod
+    def build(cls, request_id: int) -> 'IncrementalScore':
+        #Полное построение состояния по всем оценкам запроса
+        from app import db, Alternative, Criterion, Expert, Rating, Request
+
+        # Версия читается до оценок: запись, успевшая между чтениями, даст
+        # состояние с лишними оценками и устаревшей версией, и оно будет
+        # перестроено, а не наоборот
+        ratings_version = db.session.query(Request.ratings_version) \
+            .filter(Request.id == request_id).scalar()
+        alternatives = db.session.query(Alternative.id, Alternative.name) \
+            .filter(Alternative.request_id == request_id).order_by(Alternative.id).all()
+        criteria = db.session.query(Criterion.id, Criterion.name) \
+            .filter(Criterion.request_id == request_id).order_by(Criterion.id).all()
+        experts = db.session.query(Expert.id, Expert.name) \
+            .filter(Expert.request_id == request_id).order_by(Expert.id).all()
+        state = cls(request_id,
+                    [tuple(row) for row in alternatives],
+                    [tuple(row) for row in criteria],
+                    [tuple(row) for row in experts],
+                    ratings_version=ratings_version)
+
+        rows = db.session.query(Rating.alternative_id, Rating.criterion_id,
+                                Rating.expert_id, Rating.value) \
+            .join(Expert, Rating.expert_id == Expert.id) \
+            .filter(Expert.request_id == request_id) \
+            .order_by(Rating.id)
+        # Повторная оценка той же ячейки экспертом заменяет предыдущую
+        latest = {}
+        for alt_id, crit_id, expert_id, value in rows:
+            latest[(alt_id, crit_id, expert_id)] = value
+        by_expert = {}
+        for (alt_id, crit_id, expert_id), value in latest.items():
+            by_expert.setdefault(expert_id, {})[(alt_id, crit_id)] = value
+        for submitted in by_expert.values():
+            state._accumulate(submitted, {})
+        state._rescore(np.arange(len(state.alternatives)))
+        return state
+
+    @classmethod
+    def load(cls, request_id: int) -> Optional['IncrementalScore']:
+        """Сохраненное состояние или None. Состояние, построенное для
+        другого состава запроса (счетчики Request) или другой версии оценок
+        (Request.ratings_version), удаляется."""
+        from app import db, Request, ScoreState
+
+        row = db.session.query(ScoreState, Request.ratings_version, Request.alternatives_count,
+                               Request.criteria_count, Request.experts_count) \
+            .join(Request, Request.id == ScoreState.request_id) \
+            .filter(ScoreState.request_id == request_id).first()
+        if row is None:
+            return None
+        row, ratings_version, *counts = row
+        meta = json.loads(row.meta)
+        if ratings_version != row.ratings_version \
+                or counts != [len(meta['alternatives']), len(meta['criteria']), len(meta['experts'])]:
+            drop_score_state(request_id)
+            return None
+        arrays = np.load(io.BytesIO(row.payload))
+        return cls(request_id,
+                   [tuple(item) for item in meta['alternatives']],
+                   [tuple(item) for item in meta['criteria']],
+                   [tuple(item) for item in meta['experts']],
+                   sums=arrays['sums'],
+                   counts=arrays['counts'],
+                   scores=arrays['scores'],
+                   version=row.version,
+                   ratings_version=row.ratings_version)
+
+    def save(self):
+        """Сохранение с оптимистической блокировкой по номеру версии.
+
+        Если состояние в базе изменилось после загрузки, выбрасывается
+        StaleScoreState.
+        """
+        from app import db, ScoreState
+
+        buf = io.BytesIO()
+        np.savez(buf, sums=self.sums, counts=self.counts, scores=self.scores)
+        fields = {
+            'ratings_version': self.ratings_version,
+            'payload': buf.getvalue(),
+            'meta': json.dumps({
+                'alternatives': self.alternatives,
+                'criteria': self.criteria,
+                'experts': self.experts,
+            }, ensure_ascii=False),
+        }
+        if self.version == 0:
+            db.session.add(ScoreState(request_id=self.request_id, version=1, **fields))
+        else:
+            updated = ScoreState.query \
+                .filter_by(request_id=self.request_id, version=self.version) \
+                .update(dict(fields, version=self.version + 1, updated_at=datetime.utcnow()))
+            if not updated:
+                db.session.rollback()
+                raise StaleScoreState(f"Состояние запроса {self.request_id} устарело")
+        db.session.commit()
+        self.version += 1
+
+    def apply_submission(self, submitted: Dict[Cell, str], previous: Dict[Cell, str]):
+        """Учет оценок одного эксперта.
+
+        submitted — новые значения по ячейкам, previous — значения того же
+        эксперта, которые были в базе до отправки (они заменяются).
+        """
+        touched = self._accumulate(submitted, previous)
+        self._rescore(touched)
+
+    def _accumulate(self, submitted: Dict[Cell, str], previous: Dict[Cell, str]) -> np.ndarray:
+        count = len(submitted)
+        alt = np.empty(count, dtype=np.intp)
+        crit = np.empty(count, dtype=np.intp)
+        new = np.empty(count)
+        old_values = np.empty(count)
+        added = np.empty(count, dtype=np.int64)
+        for i, ((alt_id, crit_id), value) in enumerate(submitted.items()):
+            convert = self.converters[crit_id]
+            alt[i] = self.alt_pos[alt_id]
+            crit[i] = self.crit_pos[crit_id]
+            new[i] = convert(value)
+            old = previous.get((alt_id, crit_id))
+            old_values[i] = convert(old) if old is not None else new[i]
+            added[i] = 0 if old is not None else 1
+
+        # Прежняя оценка вычитается, если она была
+        delta = self.scales.normalize(crit, new) - self.scales.normalize(crit, old_values) * (1 - added)
+        np.add.at(self.sums, (alt, crit), delta * self.expert_weight)
+        np.add.at(self.counts, (alt, crit), added)
+        return np.unique(alt)
+
+    def _rescore(self, rows: np.ndarray):
+        #Пересчет итоговых оценок только для затронутых альтернатив
+        aggregated = round_half_up(self.sums[rows], 4)
+        self.scores[rows] = round_half_up(aggregated @ self.crit_weights, 2)
+
+    def _rated(self) -> np.ndarray:
+        #Строки альтернатив, по которым есть хотя бы одна оценка
+        return np.flatnonzero(self.counts.sum(axis=1) > 0)
+
+    def _rated_order(self) -> np.ndarray:
+        #Оцененные альтернативы по убыванию оценки
+        rated = self._rated()
+        return rated[rank_order(self.scores[rated])]
+
+    def ranking(self) -> List[Tuple[str, float]]:
+        #Рейтинг альтернатив, по которым есть хотя бы одна оценка
+        return [(self.alternatives[i][1], float(self.scores[i])) for i in self._rated_order()]
+
+    def results(self) -> Dict[str, Any]:
+        #Результат в том же формате, что и DecisionMaker.calculate
+        rated = self._rated()
+        ranking = self.ranking()
+        aggregated = round_half_up(self.sums, 4)
+        criteria_scores = {
+            self.alternatives[i][1]: {self.criteria[j][1]: float(aggregated[i, j])
+                                      for j in np.flatnonzero(self.counts[i] > 0)}
+            for i in rated
+        }
+        return {
+            'expert_weights': dict(self.expert_weights),
+            'criteria_weights': {name: float(w) for (_, name), w in zip(self.criteria, self.crit_weights)},
+            'final_scores': {self.alternatives[i][1]: float(self.scores[i]) for i in rated},
+            'criteria_scores': criteria_scores,
+            'ranking': ranking,
+            'method': METHOD_WEIGHTED_SUM,
+        }
+
+    def check_consistency(self, tolerance: float = 0.01) -> List[str]:
+        """Сверка с полным пересчетом DecisionMaker.
+
+        Возвращает альтернативы, итоговые оценки которых расходятся больше
+        чем на tolerance (одна единица округления итоговой оценки);
+        пустой список означает, что состояние согласовано.
+        """
+        expected = DecisionMaker(RatingStore.from_db(self.request_id)).calculate()['final_scores']
+        actual = dict(self.ranking())
+        mismatches = []
+        for name in sorted(set(expected) | set(actual)):
+            if name not in expected or name not in actual \
+                    or abs(expected[name] - actual[name]) > tolerance + 1e-9:
+                mismatches.append(name)
+        return mismatches
+
+
+def expert_previous_values(expert_id: int) -> Dict[Cell, str]:
+    #Текущие оценки эксперта по ячейкам (последняя запись побеждает)
+    from app import db, Rating
+
+    rows = db.session.query(Rating.alternative_id, Rating.criterion_id, Rating.value) \
+        .filter(Rating.expert_id == expert_id).order_by(Rating.id)
+    return {(alt_id, crit_id): value for alt_id, crit_id, value in rows}
+
+
+def drop_score_state(request_id: int):
+    #Удаление состояния: при следующем запросе рейтинга оно будет построено заново
+    from app import db, ScoreState
+
+    ScoreState.query.filter_by(request_id=request_id).delete()
+    db.session.commit()
+
+
+def record_submission(state: IncrementalScore,
+                      submitted: Dict[Cell, str],
+                      previous: Dict[Cell, str],
+                      ratings_version: int):
+    """Учет отправки эксперта в загруженном до записи оценок состоянии.
+
+    ratings_version — версия оценок после записи (store_ratings). Если
+    между загрузкой состояния и записью оценки менялись еще чем-то
+    (версия выросла не на один) или состояние изменилось конкурентно, оно
+    сбрасывается и будет построено заново при следующем запросе рейтинга.
+    """
+    if not submitted:
+        # Пустая отправка версию оценок не меняет
+        return
+    if ratings_version != state.ratings_version + 1:
+        drop_score_state(state.request_id)
+        return
+    state.apply_submission(submitted, previous)
+    state.ratings_version = ratings_version
+    try:
+        state.save()
+    except StaleScoreState:
+        drop_score_state(state.request_id)
+
+
+def build_score_state(request_id: int) -> IncrementalScore:
+    """Построение и сохранение состояния по всем оценкам запроса.
+
+    Если состояние параллельно построил другой процесс, неизвестно, чье
+    построение видело больше оценок, поэтому оба сбрасываются: следующее
+    обращение построит состояние заново.
+    """
+    from app import db
+
+    state = IncrementalScore.build(request_id)
+    try:
+        state.save()
+    except IntegrityError:
+        db.session.rollback()
+        drop_score_state(request_id)
+    return state
+
+
+def request_results(request_id: int) -> Dict[str, Any]:
+    #Результат запроса из сохраненного состояния (с построением при отсутствии)
+    state = IncrementalScore.load(request_id)
+    if state is None:
+        state = build_score_state(request_id)
+    return state.results()
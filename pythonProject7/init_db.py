@@ -1,4 +1,6 @@
-from app import app, db
+import logging
 
-with app.app_context():
-    db.create_all()
\ No newline at end of file
+from app import init_database
+
+logging.basicConfig(level=logging.INFO)
+init_database()
@@ -0,0 +1,125 @@
+"""Кэш входа эксперта: (код доступа, имя) -> (request_id, expert_id).
+
+Повторный вход того же эксперта и попытки с неверным кодом не
+обращаются к базе. Записи живут ttl секунд; отрицательные результаты
+(неверный код или неизвестное имя) — negative_ttl, чтобы только что
+созданный в другом процессе запрос или эксперт стал доступен быстро.
+В этом процессе записи сбрасываются после коммита изменений Request и
+Expert (см. app.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# (request_id, expert_id); None — не найден
+LoginResult = Tuple[Optional[int], Optional[int]]
+
+DEFAULT_TTL = 300.0
+DEFAULT_NEGATIVE_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class LoginCache:
+    def __init__(self,
+                 ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # (код, имя) -> (request_id, expert_id, истекает)
+        self._logins: 'OrderedDict[Tuple[str, str], Tuple[int, Optional[int], float]]' = OrderedDict()
+        # неверный код -> истекает
+        self._bad_codes: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    def get(self, access_code: str, name: str) -> Optional[LoginResult]:
+        #Результат из кэша или None, если его нужно искать в базе
+        now = time.monotonic()
+        with self._lock:
+            expires = self._bad_codes.get(access_code)
+            if expires is not None:
+                if expires > now:
+                    self.stats['negative_hits'] += 1
+                    return None, None
+                del self._bad_codes[access_code]
+            entry = self._logins.get((access_code, name))
+            if entry is not None:
+                if entry[2] > now:
+                    self.stats['hits'] += 1
+                    return entry[0], entry[1]
+                del self._logins[(access_code, name)]
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, access_code: str, name: str, result: LoginResult):
+        request_id, expert_id = result
+        now = time.monotonic()
+        with self._lock:
+            if request_id is None:
+                self._bad_codes[access_code] = now + self.negative_ttl
+                self._trim(self._bad_codes)
+                return
+            ttl = self.ttl if expert_id is not None else self.negative_ttl
+            self._logins[(access_code, name)] = (request_id, expert_id, now + ttl)
+            self._trim(self._logins)
+
+    def _trim(self, entries: OrderedDict):
+        # Вытесняются самые старые записи
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def invalidate_code(self, access_code: str):
+        #Код стал действительным или поменялся владелец
+        with self._lock:
+            self._bad_codes.pop(access_code, None)
+            for key in [key for key in self._logins if key[0] == access_code]:
+                del self._logins[key]
+
+    def invalidate_request(self, request_id: int):
+        #Изменились эксперты запроса
+        with self._lock:
+            for key in [key for key, entry in self._logins.items() if entry[0] == request_id]:
+                del self._logins[key]
+
+    def clear(self):
+        with self._lock:
+            self._logins.clear()
+            self._bad_codes.clear()
+
+    def resolve(self, access_code: str, name: str) -> LoginResult:
+        """(request_id, expert_id) для входа эксперта.
+
+        При промахе выполняются те же два запроса, что и раньше, а
+        результат, включая отрицательный, запоминается.
+        """
+        cached = self.get(access_code, name)
+        if cached is not None:
+            return cached
+        result = lookup(access_code, name)
+        self.put(access_code, name, result)
+        return result
+
+
+def lookup(access_code: str, name: str) -> LoginResult:
+    #Поиск в базе без кэша
+    from app import Request, Expert
+
+    request_entry = Request.query.filter_by(access_code=access_code).first()
+    if not request_entry:
+        return None, None
+    expert = Expert.query.filter_by(name=name, request_id=request_entry.id).first()
+    return request_entry.id, expert.id if expert else None
+
+
+default_cache = LoginCache()
+
+
+def configure(ttl: float = DEFAULT_TTL,
+              negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+              max_entries: int = DEFAULT_MAX_ENTRIES) -> LoginCache:
+    global default_cache
+    default_cache = LoginCache(ttl, negative_ttl, max_entries)
+    return default_cache
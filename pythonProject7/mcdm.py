@@ -0,0 +1,202 @@
+"""Методы многокритериального выбора на общей матрице решений.
+
+DecisionMatrix — агрегированные нормализованные оценки (альтернативы ×
+критерии) после свертки по экспертам; DecisionMaker строит ее один раз,
+а каждый метод делает по ней один дешевый проход:
+  weighted_sum — взвешенная сумма (исходный метод DecisionMaker);
+  topsis       — относительная близость к идеальному решению после
+                 векторной нормализации столбцов;
+  vikor        — компромиссный ранг Q (v — вес стратегии большинства);
+                 итоговая оценка 1 - Q, чтобы больше всегда было лучше;
+  ahp          — веса критериев из матрицы парных сравнений
+                 (главный собственный вектор и отношение согласованности),
+                 приоритеты альтернатив — распределительный режим.
+
+Направление критерия задается полем direction ('benefit' по умолчанию
+или 'cost'); значения 'cost'/'benefit' в поле type тоже учитываются.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from compiled_scales import compile_criterion
+
+BENEFIT = 'benefit'
+COST = 'cost'
+METHOD_WEIGHTED_SUM = 'weighted_sum'
+
+# Метод: (матрица, параметры) -> (итоговые оценки, использованные веса критериев, подробности)
+Method = Callable[..., Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]
+
+METHODS: Dict[str, Method] = {}
+
+# Случайный индекс согласованности Саати для n = 1..15
+RANDOM_INDEX = (0.0, 0.0, 0.58, 0.90, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49, 1.51, 1.48, 1.56, 1.57, 1.59)
+# Допустимое отношение согласованности матрицы парных сравнений
+MAX_CONSISTENCY_RATIO = 0.1
+# Допуск на погрешность суммирования при округлении (в единицах последнего
+# разряда): векторизованный и эталонный расчеты складывают в разном
+# порядке и могут разойтись в последнем бите около середины
+_ROUND_EPS = 1e-6
+
+
+def register_method(name: str):
+    def decorator(func: Method) -> Method:
+        METHODS[name] = func
+        return func
+    return decorator
+
+
+def round_half_up(values, digits: int):
+    """Округление половины от нуля, общее для всех режимов расчета.
+
+    np.round и встроенный round округляют половину к четному и зависят от
+    двоичного представления (round(0.325, 2) == 0.33, np.round — 0.32);
+    здесь значения в пределах _ROUND_EPS от середины округляются вверх по
+    модулю. Принимает число или массив, возвращает того же вида.
+    """
+    factor = 10.0 ** digits
+    scaled = np.abs(values) * factor
+    return np.copysign(np.floor(scaled + 0.5 + _ROUND_EPS) / factor, values)
+
+
+def criterion_direction(criterion: Dict[str, Any]) -> str:
+    direction = criterion.get('direction') or criterion.get('type')
+    return COST if direction == COST else BENEFIT
+
+
+class DecisionMatrix:
+    def __init__(self,
+                 alternatives: List[str],
+                 criteria: List[Dict[str, Any]],
+                 values: np.ndarray,
+                 rated: np.ndarray,
+                 scale_min: Optional[np.ndarray] = None):
+        """values — агрегированные оценки, деленные на максимум шкалы;
+        rated — маска ячеек, по которым есть хотя бы одна оценка;
+        scale_min — оценки нижних значений шкал, если уже посчитаны
+        (ScaleTable.floor)."""
+        self.alternatives = alternatives
+        self.criteria = [c['name'] for c in criteria]
+        self.values = values
+        self.rated = rated
+        self.weights = np.array([c['weight'] for c in criteria], dtype=float)
+        self.cost = np.array([criterion_direction(c) == COST for c in criteria], dtype=bool)
+        # Минимум шкалы в тех же единицах, что и values
+        if scale_min is None:
+            scale_min = np.array([compile_criterion(c).floor for c in criteria], dtype=float)
+        self.scale_min = scale_min
+        self._oriented = None
+
+    @property
+    def oriented(self) -> np.ndarray:
+        """Матрица, где по всем критериям больше — лучше: оценки
+        стоимостных критериев отражаются на шкале (min ↔ max)."""
+        if self._oriented is None:
+            if self.cost.any():
+                flipped = np.where(self.rated, 1.0 + self.scale_min - self.values, 0.0)
+                self._oriented = np.where(self.cost, flipped, self.values)
+            else:
+                self._oriented = self.values
+        return self._oriented
+
+    def normalized_weights(self) -> np.ndarray:
+        total = self.weights.sum()
+        return self.weights / total if total else self.weights
+
+
+def _scaled(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=float),
+                     where=denominator != 0)
+
+
+def _ideal(matrix: DecisionMatrix, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Лучшие и худшие значения критериев только по оцененным ячейкам:
+    неоцененные хранятся нулями и у стоимостных критериев выглядели бы
+    лучшими. У критерия без оценок оба значения — 0."""
+    rated = matrix.rated
+    low = values.min(axis=0, where=rated, initial=np.inf)
+    high = values.max(axis=0, where=rated, initial=-np.inf)
+    has_ratings = rated.any(axis=0)
+    low = np.where(has_ratings, low, 0.0)
+    high = np.where(has_ratings, high, 0.0)
+    return np.where(matrix.cost, low, high), np.where(matrix.cost, high, low)
+
+
+@register_method(METHOD_WEIGHTED_SUM)
+def weighted_sum(matrix: DecisionMatrix) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    return round_half_up(matrix.oriented @ matrix.weights, 2), matrix.weights, {}
+
+
+@register_method('topsis')
+def topsis(matrix: DecisionMatrix) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    weights = matrix.normalized_weights()
+    weighted = _scaled(matrix.values, np.sqrt((matrix.values ** 2).sum(axis=0))) * weights
+    best, worst = _ideal(matrix, weighted)
+    # Неоцененная ячейка не дает преимущества, как и во взвешенной сумме
+    weighted = np.where(matrix.rated, weighted, worst)
+    to_best = np.sqrt(((weighted - best) ** 2).sum(axis=1))
+    to_worst = np.sqrt(((weighted - worst) ** 2).sum(axis=1))
+    closeness = _scaled(to_worst, to_best + to_worst)
+    details = {'distance_to_ideal': round_half_up(to_best, 4),
+               'distance_to_anti_ideal': round_half_up(to_worst, 4)}
+    return round_half_up(closeness, 4), matrix.weights, details
+
+
+@register_method('vikor')
+def vikor(matrix: DecisionMatrix, v: float = 0.5) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    if not 0 <= v <= 1:
+        raise ValueError("Параметр v метода VIKOR должен быть в [0, 1]")
+    best, worst = _ideal(matrix, matrix.values)
+    values = np.where(matrix.rated, matrix.values, worst)
+    # Отставание от лучшего значения в долях размаха критерия (для обоих направлений)
+    regret = _scaled(best - values, best - worst) * matrix.normalized_weights()
+    group = regret.sum(axis=1)
+    individual = regret.max(axis=1)
+    q = v * _scaled(group - group.min(), np.ptp(group)) \
+        + (1 - v) * _scaled(individual - individual.min(), np.ptp(individual))
+    details = {'S': round_half_up(group, 4), 'R': round_half_up(individual, 4), 'Q': round_half_up(q, 4)}
+    return round_half_up(1.0 - q, 4), matrix.weights, details
+
+
+def ahp_priorities(comparisons: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Веса по матрице парных сравнений: главный собственный вектор и
+    отношение согласованности CR (0 для n <= 2)."""
+    comparisons = np.asarray(comparisons, dtype=float)
+    n = comparisons.shape[0]
+    if comparisons.shape != (n, n) or (comparisons <= 0).any():
+        raise ValueError("Матрица парных сравнений должна быть квадратной с положительными элементами")
+    eigenvalues, eigenvectors = np.linalg.eig(comparisons)
+    principal = np.argmax(eigenvalues.real)
+    vector = np.abs(eigenvectors[:, principal].real)
+    lambda_max = eigenvalues[principal].real
+    if n <= 2:
+        return vector / vector.sum(), 0.0
+    random_index = RANDOM_INDEX[min(n, len(RANDOM_INDEX)) - 1]
+    return vector / vector.sum(), float((lambda_max - n) / (n - 1) / random_index)
+
+
+@register_method('ahp')
+def ahp(matrix: DecisionMatrix, comparisons: Optional[List[List[float]]] = None
+        ) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """comparisons — матрица парных сравнений критериев в порядке
+    criteria; без нее используются заданные веса критериев."""
+    if comparisons is not None:
+        if len(comparisons) != len(matrix.criteria):
+            raise ValueError("Размер матрицы парных сравнений не совпадает с числом критериев")
+        weights, ratio = ahp_priorities(comparisons)
+    else:
+        weights, ratio = matrix.normalized_weights(), 0.0
+    # Приоритеты альтернатив по критерию в сумме дают 1
+    oriented = matrix.oriented
+    priorities = _scaled(oriented, oriented.sum(axis=0))
+    details = {'consistency_ratio': round(ratio, 4), 'consistent': ratio <= MAX_CONSISTENCY_RATIO}
+    return round_half_up(priorities @ weights, 4), weights, details
+
+
+def apply_method(name: str,
+                 matrix: DecisionMatrix,
+                 options: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    if name not in METHODS:
+        raise ValueError(f"Неизвестный метод: {name}. Доступны: {', '.join(METHODS)}")
+    return METHODS[name](matrix, **(options or {}))
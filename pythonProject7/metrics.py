@@ -0,0 +1,290 @@
+"""Инструментирование: гистограммы задержек, SQL по запросам и профилировщик.
+
+Метрики хранятся в памяти процесса (при нескольких процессах сервера
+у каждого свои) и выдаются в текстовом формате Prometheus на /metrics:
+  http_request_duration_seconds   — время обработки по маршруту, методу и коду;
+  http_request_sql_queries        — число SQL-запросов на один HTTP-запрос;
+  http_request_sql_seconds        — суммарное время SQL на один HTTP-запрос;
+  sql_query_duration_seconds      — время отдельных SQL-запросов по типу оператора;
+  decision_stage_duration_seconds — этапы DecisionMaker (normalize, aggregate,
+                                    final_scores);
+  export_duration_seconds         — выгрузки по формату.
+Запрос дольше SLOW_REQUEST_MS пишется в журнал вместе с числом и временем
+SQL. Доля запросов PROFILE_RATE профилируется выборочным профилировщиком:
+стеки обрабатывающего потока снимаются раз в PROFILE_INTERVAL_MS и пишутся
+в PROFILE_DIR в свернутом виде (строка «кадр;кадр;... число», формат
+flamegraph.pl и speedscope). При PROFILE_RATE=0 профилировщик не
+запускается.
+"""
+import bisect
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счетчики корзин (последняя — +Inf), сумма]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            labels = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                bucket_labels = ','.join(labels + ['le="%s"' % le])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        #Гистограмма по имени (создается при первом обращении)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help, labels, buckets)
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+default_registry = Registry()
+
+REQUEST_LATENCY = default_registry.histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route', 'status'))
+REQUEST_QUERIES = default_registry.histogram(
+    'http_request_sql_queries', 'Число SQL-запросов на HTTP-запрос', ('route',), COUNT_BUCKETS)
+REQUEST_SQL_TIME = default_registry.histogram(
+    'http_request_sql_seconds', 'Суммарное время SQL на HTTP-запрос', ('route',))
+SQL_LATENCY = default_registry.histogram(
+    'sql_query_duration_seconds', 'Время выполнения SQL-запроса', ('statement',))
+DECISION_STAGE = default_registry.histogram(
+    'decision_stage_duration_seconds', 'Время этапа расчета DecisionMaker', ('stage',))
+EXPORT_LATENCY = default_registry.histogram(
+    'export_duration_seconds', 'Время выгрузки результатов', ('format',))
+
+
+class RequestStats:
+    # Счетчики текущего HTTP-запроса
+    __slots__ = ('started', 'queries', 'sql_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar('request_stats', default=None)
+
+
+def stage(name: str):
+    #Замер этапа расчета: with stage('normalize'): ...
+    return DECISION_STAGE.time(stage=name)
+
+
+def _statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[:1]
+    return keyword[0].upper() if keyword else 'OTHER'
+
+
+def install_sql_timing(engine):
+    """Время каждого SQL-запроса движка: в общую гистограмму и в
+    счетчики текущего HTTP-запроса, если он есть."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finish_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        elapsed = time.perf_counter() - started
+        SQL_LATENCY.observe(elapsed, statement=_statement_type(statement))
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def drop_query(context):
+        # Запрос с ошибкой не доходит до after_cursor_execute
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class SamplingProfiler:
+    """Выборочный профилировщик одного потока: отдельный поток раз в
+    interval секунд снимает стек потока thread_id и считает одинаковые
+    стеки."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self) -> 'SamplingProfiler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def install(app, engine):
+    """Хуки Flask для замеров запросов, SQL, медленных запросов и
+    профилировщика; настройки — METRICS_ENABLED, SLOW_REQUEST_MS,
+    PROFILE_RATE, PROFILE_INTERVAL_MS и PROFILE_DIR в app.config."""
+    from flask import g, request
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    install_sql_timing(engine)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_stats = RequestStats()
+        g.request_stats_token = _current.set(g.request_stats)
+        rate = app.config.get('PROFILE_RATE', 0.0)
+        if rate and random.random() < rate:
+            g.profiler = SamplingProfiler(threading.get_ident(),
+                                          app.config.get('PROFILE_INTERVAL_MS', 5) / 1000).start()
+
+    @app.after_request
+    def finish_request_metrics(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_LATENCY.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        REQUEST_QUERIES.observe(stats.queries, route=route)
+        REQUEST_SQL_TIME.observe(stats.sql_seconds, route=route)
+        _current.reset(g.pop('request_stats_token'))
+
+        slow_ms = app.config.get('SLOW_REQUEST_MS', 0)
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            app.logger.warning(f"Медленный запрос {request.method} {request.full_path.rstrip('?')}: "
+                               f"{elapsed * 1000:.1f} мс, SQL {stats.queries} запр. "
+                               f"{stats.sql_seconds * 1000:.1f} мс, код {response.status_code}")
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            _write_profile(app, request.method, route, elapsed, profiler)
+        return response
+
+    @app.teardown_request
+    def cleanup_request_metrics(exc):
+        # Запрос, прерванный исключением до after_request
+        token = g.pop('request_stats_token', None)
+        if token is not None:
+            _current.reset(token)
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+
+
+def _write_profile(app, method: str, route: str, elapsed: float, profiler: SamplingProfiler):
+    directory = app.config.get('PROFILE_DIR')
+    if not directory or not profiler.stacks:
+        return
+    os.makedirs(directory, exist_ok=True)
+    slug = route.strip('/').replace('/', '_').replace('<', '').replace('>', '').replace(':', '-') or 'index'
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{int(elapsed * 1000)}ms.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(profiler.collapsed())
+    app.logger.info(f"Профиль запроса записан в {path}")
+
+
+def render() -> str:
+    return default_registry.render()
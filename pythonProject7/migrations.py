@@ -0,0 +1,166 @@
+"""Миграции схемы SQLite.
+
+Номер примененной миграции хранится в PRAGMA user_version. Каждая
+миграция идемпотентна, поэтому ее можно применять и к базе, созданной
+через db.create_all() по уже обновленным моделям.
+
+Миграции применяются явно (init_db.py, flask --app app init-db, запуск
+app.py), а не при импорте приложения. Запуск:
+    python migrations.py
+"""
+import logging
+from typing import Callable, List, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    if column not in _columns(conn, table):
+        conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+
+
+def _rating_numeric_columns(conn: Connection):
+    """request_id, numeric_value и scale_index у оценок с заполнением
+    по уже сохраненным строковым значениям."""
+    _add_column(conn, 'ratings', 'request_id', 'INTEGER REFERENCES requests (id)')
+    _add_column(conn, 'ratings', 'numeric_value', 'FLOAT')
+    _add_column(conn, 'ratings', 'scale_index', 'SMALLINT')
+
+    conn.exec_driver_sql(
+        'UPDATE ratings SET request_id = '
+        '(SELECT experts.request_id FROM experts WHERE experts.id = ratings.expert_id) '
+        'WHERE request_id IS NULL'
+    )
+    rows = conn.exec_driver_sql(
+        'SELECT ratings.id, ratings.value, scales.type, scales."values" FROM ratings '
+        'JOIN criteria ON criteria.id = ratings.criterion_id '
+        'JOIN scales ON scales.id = criteria.scale_id '
+        'WHERE ratings.numeric_value IS NULL AND ratings.scale_index IS NULL'
+    ).fetchall()
+    numeric, linguistic = [], []
+    for rating_id, value, scale_type, raw_scale in rows:
+        if scale_type == 'numeric':
+            try:
+                numeric.append((float(value), rating_id))
+            except ValueError:
+                continue
+        else:
+            positions = {v: i for i, v in enumerate(raw_scale.split(';'))}
+            if value in positions:
+                linguistic.append((positions[value], rating_id))
+    if numeric:
+        conn.exec_driver_sql('UPDATE ratings SET numeric_value = ? WHERE id = ?', numeric)
+    if linguistic:
+        conn.exec_driver_sql('UPDATE ratings SET scale_index = ? WHERE id = ?', linguistic)
+
+
+def _hot_path_indexes(conn: Connection):
+    #Индексы под выборки оценок по эксперту, по ячейке и по запросу
+    statements = [
+        'CREATE INDEX IF NOT EXISTS ix_ratings_expert_id ON ratings (expert_id)',
+        'CREATE INDEX IF NOT EXISTS ix_ratings_criterion_alternative '
+        'ON ratings (criterion_id, alternative_id)',
+        'CREATE INDEX IF NOT EXISTS ix_ratings_request_matrix ON ratings '
+        '(request_id, alternative_id, criterion_id, expert_id, numeric_value, scale_index)',
+        'CREATE INDEX IF NOT EXISTS ix_experts_request_id ON experts (request_id)',
+        'CREATE INDEX IF NOT EXISTS ix_alternatives_request_id ON alternatives (request_id)',
+        'CREATE INDEX IF NOT EXISTS ix_criteria_request_id ON criteria (request_id)',
+    ]
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql('ANALYZE')
+
+
+def _request_ratings_version(conn: Connection):
+    #Счетчик изменений оценок запроса: ключ кэша выгрузок
+    _add_column(conn, 'requests', 'ratings_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+# Счетчики участников запроса поддерживаются триггерами: критерии и
+# альтернативы создаются через bulk_save_objects, минуя события ORM
+_COUNTER_TABLES = [
+    ('experts', 'experts_count'),
+    ('alternatives', 'alternatives_count'),
+    ('criteria', 'criteria_count'),
+]
+
+
+def _request_progress_counters(conn: Connection):
+    """Денормализованные счетчики прогресса запроса для архива менеджера.
+
+    ratings_count и experts_submitted обновляет rating_ingest.store_ratings
+    в той же транзакции, что и запись оценок.
+    """
+    for table, column in _COUNTER_TABLES:
+        _add_column(conn, 'requests', column, 'INTEGER NOT NULL DEFAULT 0')
+        conn.exec_driver_sql(
+            f'UPDATE requests SET {column} = '
+            f'(SELECT count(*) FROM {table} WHERE {table}.request_id = requests.id)'
+        )
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table} '
+            f'BEGIN UPDATE requests SET {column} = {column} + 1 WHERE id = NEW.request_id; END'
+        )
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table} '
+            f'BEGIN UPDATE requests SET {column} = {column} - 1 WHERE id = OLD.request_id; END'
+        )
+    _add_column(conn, 'requests', 'ratings_count', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(conn, 'requests', 'experts_submitted', 'INTEGER NOT NULL DEFAULT 0')
+    conn.exec_driver_sql(
+        'UPDATE requests SET '
+        'ratings_count = (SELECT count(*) FROM ratings WHERE ratings.request_id = requests.id), '
+        'experts_submitted = (SELECT count(DISTINCT expert_id) FROM ratings '
+        'WHERE ratings.request_id = requests.id)'
+    )
+    # Keyset-пагинация архива: запросы менеджера по убыванию (created_at, id)
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_requests_manager_created '
+                         'ON requests (manager_id, created_at, id)')
+
+
+def _score_state_ratings_version(conn: Connection):
+    """Версия оценок запроса, по которой построено состояние пересчета.
+    У прежних состояний она неизвестна (-1), и они строятся заново."""
+    _add_column(conn, 'score_states', 'ratings_version', 'INTEGER NOT NULL DEFAULT -1')
+
+
+# Порядок важен: номер миграции = позиция в списке + 1
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ('rating numeric columns', _rating_numeric_columns),
+    ('hot path indexes', _hot_path_indexes),
+    ('request ratings version', _request_ratings_version),
+    ('request progress counters', _request_progress_counters),
+    ('score state ratings version', _score_state_ratings_version),
+]
+
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def upgrade(engine: Engine) -> int:
+    #Применение всех еще не примененных миграций; возвращает новую версию
+    version = current_version(engine)
+    for number, (title, migration) in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        logger.info(f"Миграция {number}: {title}")
+        with engine.begin() as conn:
+            migration(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    from app import init_database
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Версия схемы: {init_database()}")
@@ -0,0 +1,81 @@
+"""Рейтинг альтернатив: выбор лучших k и постраничный просмотр.
+
+Порядок везде один и тот же: по убыванию оценки, при равных оценках —
+в исходном порядке альтернатив (как у устойчивой сортировки sorted(...,
+reverse=True), которой рейтинг строился раньше). Лучшие k выбираются
+частичной сортировкой (argpartition) за O(n + k log k); полный рейтинг
+сортируется один раз и сохраняется в этом порядке (result_store), а
+страницы берутся срезами сохраненного порядка.
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class Page(NamedTuple):
+    number: int  # номер страницы с 1
+    size: int
+    total: int  # всего альтернатив
+    start: int  # позиция первой строки страницы в рейтинге (с 0)
+    end: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.size))
+
+    @property
+    def has_previous(self) -> bool:
+        return self.number > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self.end < self.total
+
+
+def rank_order(scores: Sequence[float], k: Optional[int] = None) -> np.ndarray:
+    """Индексы альтернатив в порядке рейтинга; при k — только лучшие k.
+
+    Без k выполняется устойчивая сортировка. С k сначала argpartition
+    отбирает кандидатов, затем из альтернатив с пограничной оценкой
+    берутся первые по исходному порядку, и сортируются только k строк.
+    """
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    negated = -scores
+    # k-е по величине значение: все, что лучше, входит целиком
+    threshold = np.partition(negated, k - 1)[k - 1]
+    better = np.flatnonzero(negated < threshold)
+    ties = np.flatnonzero(negated == threshold)[:k - len(better)]
+    chosen = np.concatenate([better, ties])
+    # Устойчивая сортировка по возрастанию индекса сохраняет исходный порядок равных
+    chosen.sort()
+    return chosen[np.argsort(negated[chosen], kind='stable')]
+
+
+def ranked(names: Sequence[str], scores: Sequence[float], k: Optional[int] = None) -> List[Tuple[str, float]]:
+    #Пары (альтернатива, оценка) в порядке рейтинга
+    scores = np.asarray(scores, dtype=float)
+    order = rank_order(scores, k)
+    return list(zip([names[i] for i in order.tolist()], scores[order].tolist()))
+
+
+def paginate(total: int, number: int, size: int) -> Page:
+    """Границы страницы; номер вне диапазона приводится к ближайшей
+    существующей странице."""
+    if size < 1:
+        raise ValueError("Размер страницы должен быть положительным")
+    pages = max(1, -(-total // size))
+    number = min(max(1, number), pages)
+    start = (number - 1) * size
+    return Page(number, size, total, start, min(total, start + size))
+
+
+def top_ranking(results: dict, k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Лучшие k строк рейтинга результата DecisionMaker. Рейтинг в
+    результате уже упорядочен, поэтому это срез без сортировки."""
+    ranking = results['ranking']
+    return list(ranking if k is None else ranking[:k])
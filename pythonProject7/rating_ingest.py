@@ -0,0 +1,125 @@
+"""Массовая запись оценок эксперта одной транзакцией."""
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, exists, insert, tuple_, update
+
+import result_cache
+from scale_cache import ParsedScale, parsed_scale
+
+# Ячейка матрицы оценок: (alternative_id, criterion_id)
+Cell = Tuple[int, int]
+
+# Ячеек в одном DELETE: не упираемся в лимит параметров SQLite
+DELETE_BATCH = 400
+
+
+def collect_submission(form: Mapping[str, str],
+                       alternatives: list,
+                       criterias: list) -> Tuple[Dict[Cell, str], Optional[str]]:
+    """Разбор и проверка формы оценивания за один проход.
+
+    Возвращает значения по ячейкам в том виде, в котором они хранятся
+    в Rating.value, и текст первой ошибки (или None).
+    """
+    numeric_cells, numeric_raw = [], []
+    bounds_min, bounds_max = [], []
+    submitted = {}
+    for crit in criterias:
+        scale = parsed_scale(crit.scale)
+        for alt in alternatives:
+            value = form.get(f"rating_{alt.id}_{crit.id}")
+            if not value:
+                continue
+            if scale.type == 'numeric':
+                numeric_cells.append((alt.id, crit.id))
+                numeric_raw.append(value)
+                bounds_min.append(scale.min_val)
+                bounds_max.append(scale.max_val)
+            elif value in scale.index:
+                submitted[(alt.id, crit.id)] = value
+            else:
+                return {}, f'Недопустимое значение для {crit.name}'
+
+    if numeric_cells:
+        try:
+            numbers = np.array(numeric_raw, dtype=float)
+        except ValueError:
+            return {}, 'Оценка должна быть числом'
+        low = np.array(bounds_min)
+        high = np.array(bounds_max)
+        # Проверка границ шкал сразу для всех числовых ячеек
+        outside = np.flatnonzero(~((low <= numbers) & (numbers <= high)))
+        if outside.size:
+            i = outside[0]
+            crit = next(c for c in criterias if c.id == numeric_cells[i][1])
+            return {}, f'Значение для {crit.name} должно быть между {bounds_min[i]} и {bounds_max[i]}'
+        submitted.update(zip(numeric_cells, map(str, numbers.tolist())))
+    return submitted, None
+
+
+def store_ratings(request_id: int,
+                  expert_id: int,
+                  submitted: Dict[Cell, str],
+                  scales: Dict[int, ParsedScale],
+                  upsert: bool = True) -> int:
+    """Запись оценок эксперта одной транзакцией через executemany.
+
+    scales — разобранные шкалы по id критерия: по ним заполняются
+    numeric_value (числовая шкала) или scale_index (лингвистическая).
+    В режиме upsert прежние оценки эксперта по тем же ячейкам удаляются,
+    поэтому повторная отправка формы не создает дубликатов.
+
+    Возвращает Request.ratings_version после записи (прочитанную в той же
+    транзакции) — по ней сверяется состояние инкрементального пересчета.
+    """
+    from app import db, Rating, Request
+
+    cells: List[Cell] = list(submitted)
+    try:
+        # Эксперт впервые сдает оценки — растет счетчик сдавших в запросе
+        first_submission = bool(cells) and not db.session.query(
+            exists().where(Rating.expert_id == expert_id)).scalar()
+        deleted = 0
+        if upsert:
+            for start in range(0, len(cells), DELETE_BATCH):
+                batch = cells[start:start + DELETE_BATCH]
+                deleted += db.session.execute(
+                    delete(Rating)
+                    .where(Rating.expert_id == expert_id)
+                    .where(tuple_(Rating.alternative_id, Rating.criterion_id).in_(batch))
+                ).rowcount
+        if cells:
+            now = datetime.utcnow()
+            db.session.execute(insert(Rating), [
+                {
+                    'value': value,
+                    'alternative_id': alt_id,
+                    'criterion_id': crit_id,
+                    'expert_id': expert_id,
+                    'created_at': now,
+                    'request_id': request_id,
+                    'numeric_value': float(value) if scales[crit_id].type == 'numeric' else None,
+                    'scale_index': scales[crit_id].index.get(value) if scales[crit_id].type != 'numeric' else None,
+                }
+                for (alt_id, crit_id), value in submitted.items()
+            ])
+            # Новая версия оценок делает устаревшими готовые выгрузки;
+            # счетчики архива меняются на разницу вставленных и удаленных строк
+            db.session.execute(
+                update(Request)
+                .where(Request.id == request_id)
+                .values(ratings_version=Request.ratings_version + 1,
+                        ratings_count=Request.ratings_count + len(cells) - deleted,
+                        experts_submitted=Request.experts_submitted + int(first_submission))
+            )
+        ratings_version = db.session.query(Request.ratings_version) \
+            .filter(Request.id == request_id).scalar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    # Core-запросы не проходят через события ORM, поэтому кэш сбрасываем явно
+    result_cache.invalidate_request(request_id)
+    return ratings_version
@@ -0,0 +1,217 @@
+"""Компактное хранилище оценок: таблицы имен и параллельные столбцы индексов."""
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def unique_names(names: Iterable[str], kind: str) -> List[str]:
+    """Интернированные имена; повтор имени — ValueError. Оценки и
+    результаты адресуются по именам, и два объекта с одним именем
+    слились бы в одну строку матрицы."""
+    result = [sys.intern(name) for name in names]
+    if len(set(result)) < len(result):
+        repeated = [name for name, count in Counter(result).items() if count > 1]
+        raise ValueError(f"Повторяющиеся имена ({kind}): {', '.join(repeated)}")
+    return result
+
+
+class RatingStore:
+    """Оценки задачи в виде столбцов array вместо списка словарей.
+
+    Имена альтернатив, критериев и экспертов хранятся один раз
+    (интернированными строками), а каждая оценка занимает 20 байт:
+    три индекса int32 и значение float64. Хранилище можно передавать
+    в DecisionMaker вместо InputData.
+    """
+
+    def __init__(self,
+                 alternatives: List[str],
+                 criteria: List[Dict[str, Any]],
+                 experts: List[str],
+                 alt_idx: Optional[array] = None,
+                 crit_idx: Optional[array] = None,
+                 expert_idx: Optional[array] = None,
+                 values: Optional[array] = None,
+                 stats: Optional[Dict[str, Any]] = None,
+                 expert_competence: Optional[Dict[str, float]] = None):
+        self.alternatives = unique_names(alternatives, 'альтернативы')
+        self.criteria = [dict(c, name=name)
+                         for c, name in zip(criteria, unique_names((c['name'] for c in criteria), 'критерии'))]
+        self.experts = unique_names(experts, 'эксперты')
+        self.alt_idx = alt_idx if alt_idx is not None else array('i')
+        self.crit_idx = crit_idx if crit_idx is not None else array('i')
+        self.expert_idx = expert_idx if expert_idx is not None else array('i')
+        self.values = values if values is not None else array('d')
+        self.stats = stats or {}
+        # Компетентность экспертов по именам (для весов competence), если известна
+        self.expert_competence = dict(expert_competence) if expert_competence else None
+
+        self.alt_index = {name: i for i, name in enumerate(self.alternatives)}
+        self.crit_index = {c['name']: i for i, c in enumerate(self.criteria)}
+        self.expert_index = {name: i for i, name in enumerate(self.experts)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        #Объем памяти, занятый столбцами оценок
+        return sum(column.itemsize * len(column)
+                   for column in (self.alt_idx, self.crit_idx, self.expert_idx, self.values))
+
+    def append(self, alternative: str, criterion: str, expert: str, value: float):
+        #Добавление оценки по именам; неизвестные имена дают KeyError
+        self.alt_idx.append(self.alt_index[alternative])
+        self.crit_idx.append(self.crit_index[criterion])
+        self.expert_idx.append(self.expert_index[expert])
+        self.values.append(value)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        #Представление столбцов как массивов NumPy без копирования
+        return (np.frombuffer(self.alt_idx, dtype=np.int32),
+                np.frombuffer(self.crit_idx, dtype=np.int32),
+                np.frombuffer(self.expert_idx, dtype=np.int32),
+                np.frombuffer(self.values, dtype=np.float64))
+
+    @property
+    def ratings(self) -> Iterator[Dict[str, Any]]:
+        # Ленивое восстановление словарей для эталонного режима расчета
+        criteria = [c['name'] for c in self.criteria]
+        for a, c, e, v in zip(self.alt_idx, self.crit_idx, self.expert_idx, self.values):
+            yield {
+                'alternative': self.alternatives[a],
+                'criteria': criteria[c],
+                'expert': self.experts[e],
+                'value': v,
+            }
+
+    def to_input(self) -> Dict[str, Any]:
+        #Задача в формате input.json (для внешнего решателя)
+        data = {
+            'alternatives': list(self.alternatives),
+            'criteria': [dict(c) for c in self.criteria],
+            'experts': list(self.experts),
+            'ratings': list(self.ratings),
+        }
+        if self.expert_competence:
+            data['expert_competence'] = dict(self.expert_competence)
+        return data
+
+    @classmethod
+    def from_input(cls, data) -> 'RatingStore':
+        #Построение из InputData (или любого объекта с теми же полями)
+        from compiled_scales import compile_criterion
+
+        store = cls(data.alternatives, data.criteria, data.experts,
+                    expert_competence=getattr(data, 'expert_competence', None))
+        # Шкалы компилируются только для критериев, где встретились метки
+        criteria = {c['name']: c for c in store.criteria}
+        scales = {}
+        for rating in data.ratings:
+            # Альтернативы без объявления допускаются, как и в DecisionMaker
+            if rating['alternative'] not in store.alt_index:
+                name = sys.intern(rating['alternative'])
+                store.alt_index[name] = len(store.alternatives)
+                store.alternatives.append(name)
+            value = rating['value']
+            if isinstance(value, str):
+                # Метка лингвистической шкалы хранится значением шкалы
+                criterion = rating['criteria']
+                if criterion not in scales:
+                    scales[criterion] = compile_criterion(criteria[criterion])
+                value = scales[criterion].point(value)
+            store.append(rating['alternative'], rating['criteria'],
+                         rating['expert'], value)
+        return store
+
+    @classmethod
+    def from_json(cls, json_path: Path, **kwargs) -> 'RatingStore':
+        #Построение из входного JSON-файла потоковым разбором
+        from data_parser import parse_input_stream
+        return parse_input_stream(json_path, **kwargs)
+
+    @classmethod
+    def from_db(cls, request_id: int) -> 'RatingStore':
+        """Построение из таблиц Request/Criterion/Rating.
+
+        В базе у критериев нет весов, поэтому они считаются равными.
+        Значения лингвистических шкал переводятся в порядковый номер
+        значения (1..n), а шкалой становится 1..n. Компетентность
+        экспертов берется из числа в Expert.contact.
+        """
+        from aggregation import parse_competence
+        from app import db, Alternative, Expert, Rating
+
+        alternatives = db.session.query(Alternative.id, Alternative.name) \
+            .filter(Alternative.request_id == request_id).order_by(Alternative.id).all()
+        experts = db.session.query(Expert.id, Expert.name, Expert.contact) \
+            .filter(Expert.request_id == request_id).order_by(Expert.id).all()
+        criteria_rows, criteria, _ = request_criteria(request_id)
+
+        competence = {}
+        for _, name, contact in experts:
+            value = parse_competence(contact)
+            if value is not None:
+                competence.setdefault(name, value)
+        store = cls([name for _, name in alternatives], criteria, [name for _, name, _ in experts],
+                    expert_competence=competence)
+        # Сопоставление первичных ключей (упорядоченных по id) с позициями в таблицах имен
+        alt_ids = np.array([row_id for row_id, _ in alternatives], dtype=np.int64)
+        alt_pos = np.array([store.alt_index[name] for _, name in alternatives], dtype=np.int32)
+        crit_ids = np.array([row[0] for row in criteria_rows], dtype=np.int64)
+        expert_ids = np.array([row_id for row_id, _, _ in experts], dtype=np.int64)
+        expert_pos = np.array([store.expert_index[name] for _, name, _ in experts], dtype=np.int32)
+
+        # Одно сканирование покрывающего индекса ix_ratings_request_matrix без
+        # разбора строк; позиция лингвистического значения хранится с нуля, а шкала 1..n
+        score = db.func.coalesce(Rating.numeric_value, Rating.scale_index + 1)
+        rows = db.session.query(Rating.alternative_id, Rating.criterion_id, Rating.expert_id, score) \
+            .filter(Rating.request_id == request_id, score.isnot(None)) \
+            .order_by(Rating.request_id, Rating.alternative_id, Rating.criterion_id, Rating.expert_id) \
+            .all()
+        if rows:
+            matrix = np.array(rows, dtype=np.float64)
+            ids = matrix[:, :3].astype(np.int64)
+            store.alt_idx = array('i', alt_pos[np.searchsorted(alt_ids, ids[:, 0])].tobytes())
+            store.crit_idx = array('i', np.searchsorted(crit_ids, ids[:, 1]).astype(np.int32).tobytes())
+            store.expert_idx = array('i', expert_pos[np.searchsorted(expert_ids, ids[:, 2])].tobytes())
+            store.values = array('d', matrix[:, 3].tobytes())
+        return store
+
+
+def request_criteria(request_id: int) -> Tuple[list, List[Dict[str, Any]], Dict[int, Callable[[str], float]]]:
+    """Критерии запроса в формате DecisionMaker.
+
+    Возвращает строки (id, name, тип шкалы, значения), словари критериев
+    и функции перевода сохраненного строкового значения оценки в число
+    для каждого id критерия. У лингвистических критериев шкала — номера
+    1..n, а метки и нечеткие числа передаются в полях labels и fuzzy.
+    """
+    from app import db, Criterion, Scale
+    from compiled_scales import compile_scale
+
+    criteria_rows = db.session.query(Criterion.id, Criterion.name, Scale.type, Scale.values) \
+        .join(Scale, Criterion.scale_id == Scale.id) \
+        .filter(Criterion.request_id == request_id).order_by(Criterion.id).all()
+
+    criteria = []
+    converters = {}
+    for crit_id, name, scale_type, raw_scale in criteria_rows:
+        compiled = compile_scale(scale_type, raw_scale.split(';'), ordinal=True)
+        criterion = {'name': name, 'type': scale_type, 'weight': 1.0,
+                     'scale': list(range(1, len(compiled) + 1)) if compiled.is_linguistic
+                     else compiled.points.tolist()}
+        if compiled.is_linguistic:
+            positions = {label: i + 1 for i, label in enumerate(compiled.labels)}
+            converters[crit_id] = positions.__getitem__
+            criterion['labels'] = compiled.labels
+            if compiled.fuzzy is not None:
+                criterion['fuzzy'] = compiled.fuzzy.tolist()
+        else:
+            converters[crit_id] = float
+        criteria.append(criterion)
+    return criteria_rows, criteria, converters
@@ -0,0 +1,211 @@
+"""Кэш результатов DecisionMaker по хэшу содержимого задачи.
+
+Два уровня: LRU в памяти процесса с вытеснением по суммарному размеру
+и необязательный уровень на диске (SQLite), который переживает
+перезапуск. Записи, построенные для запроса (Request), удаляются при
+появлении у него новых оценок. Поскольку ключ зависит от содержимого,
+устаревшая запись не может быть выдана для измененной задачи: сброс
+лишь освобождает место.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Union
+
+from data_parser import InputData
+from decision_maker import DecisionMaker, ENGINE_VECTORIZED
+from mcdm import COST, criterion_direction
+from rating_store import RatingStore
+
+# Размер кэша в памяти по умолчанию (байт сериализованных результатов)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _criterion_key(criterion: Dict[str, Any]) -> Dict[str, Any]:
+    key = {'name': criterion['name'], 'weight': criterion['weight'], 'scale': criterion['scale']}
+    # Направление входит в ключ, только если критерий стоимостной
+    if criterion_direction(criterion) == COST:
+        key['direction'] = COST
+    # Метки и нечеткие числа меняют нормализацию лингвистических оценок
+    for field in ('labels', 'fuzzy'):
+        if criterion.get(field) is not None:
+            key[field] = criterion[field]
+    return key
+
+
+def problem_key(data: Union[InputData, RatingStore],
+                engine: str = ENGINE_VECTORIZED,
+                options: Optional[Dict[str, Any]] = None) -> str:
+    """Стабильный хэш задачи: альтернативы, критерии (веса и шкалы),
+    эксперты, оценки и параметры DecisionMaker (options). InputData и
+    RatingStore с одинаковым содержимым дают один и тот же ключ."""
+    store = data if isinstance(data, RatingStore) else RatingStore.from_input(data)
+    problem = {
+        'engine': engine,
+        'alternatives': store.alternatives,
+        'criteria': [_criterion_key(c) for c in store.criteria],
+        'experts': store.experts,
+    }
+    # Без параметров и компетентности ключ совпадает с прежним
+    if options:
+        problem['options'] = options
+    if store.expert_competence:
+        problem['expert_competence'] = store.expert_competence
+    header = json.dumps(problem, ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(header.encode('utf-8'))
+    for column in (store.alt_idx, store.crit_idx, store.expert_idx, store.values):
+        digest.update(column.tobytes())
+    return digest.hexdigest()
+
+
+def _decode(payload: str) -> Dict[str, Any]:
+    results = json.loads(payload)
+    # JSON не различает кортежи и списки: восстанавливаем формат DecisionMaker
+    results['ranking'] = [tuple(item) for item in results['ranking']]
+    return results
+
+
+class ResultCache:
+    def __init__(self,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 disk_path: Optional[str] = None,
+                 decision_options: Optional[Dict[str, Any]] = None):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        # Параметры DecisionMaker по умолчанию (оператор агрегации, веса экспертов)
+        self.decision_options = dict(decision_options or {})
+        self._entries = OrderedDict()  # ключ -> (сериализованный результат, request_id)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                             'key TEXT PRIMARY KEY, request_id INTEGER, '
+                             'payload TEXT NOT NULL, created_at TEXT NOT NULL)')
+                conn.execute('CREATE INDEX IF NOT EXISTS ix_results_request_id ON results (request_id)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return _decode(entry[0])
+
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute('SELECT payload, request_id FROM results WHERE key = ?',
+                                   (key,)).fetchone()
+            if row is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    self._put_memory(key, row[0], row[1])
+                return _decode(row[0])
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, results: Dict[str, Any], request_id: Optional[int] = None):
+        payload = json.dumps(results, ensure_ascii=False)
+        with self._lock:
+            self._put_memory(key, payload, request_id)
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO results (key, request_id, payload, created_at) '
+                             'VALUES (?, ?, ?, ?)',
+                             (key, request_id, payload, datetime.utcnow().isoformat()))
+
+    def _put_memory(self, key: str, payload: str, request_id: Optional[int]):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+        self._entries[key] = (payload, request_id)
+        self._size += size
+        # Вытеснение давно не использованных записей до укладывания в лимит
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def invalidate_request(self, request_id: int):
+        #Удаление всех результатов, посчитанных для запроса
+        with self._lock:
+            stale = [key for key, (_, owner) in self._entries.items() if owner == request_id]
+            for key in stale:
+                self._size -= len(self._entries.pop(key)[0])
+            self.stats['invalidations'] += len(stale)
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM results WHERE request_id = ?', (request_id,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM results')
+
+    def calculate(self,
+                  data: Union[InputData, RatingStore],
+                  request_id: Optional[int] = None,
+                  engine: str = ENGINE_VECTORIZED,
+                  **options) -> Dict[str, Any]:
+        """DecisionMaker.calculate с мемоизацией; options дополняют
+        decision_options и передаются в DecisionMaker."""
+        store = data if isinstance(data, RatingStore) else RatingStore.from_input(data)
+        options = dict(self.decision_options, **options)
+        key = problem_key(store, engine, options)
+        results = self.get(key)
+        if results is None:
+            results = DecisionMaker(store, engine=engine, **options).calculate()
+            self.put(key, results, request_id)
+        return results
+
+
+# Общий кэш процесса; параметры задаются через configure()
+default_cache = ResultCache()
+
+
+def configure(max_bytes: int = DEFAULT_MAX_BYTES,
+              disk_path: Optional[str] = None,
+              decision_options: Optional[Dict[str, Any]] = None) -> ResultCache:
+    global default_cache
+    default_cache = ResultCache(max_bytes=max_bytes, disk_path=disk_path, decision_options=decision_options)
+    return default_cache
+
+
+def cached_calculate(data: Union[InputData, RatingStore],
+                     request_id: Optional[int] = None,
+                     engine: str = ENGINE_VECTORIZED,
+                     **options) -> Dict[str, Any]:
+    return default_cache.calculate(data, request_id=request_id, engine=engine, **options)
+
+
+def invalidate_request(request_id: int):
+    default_cache.invalidate_request(request_id)
@@ -0,0 +1,182 @@
+"""Хранение результатов расчета по запросам (Request).
+
+Результат хранится в таблице request_results в компактном виде: JSON
+по столбцам (имена и оценки альтернатив в порядке рейтинга, матрица
+агрегированных оценок по критериям, веса), сжатый zlib. ETag — хэш
+этого представления, поэтому одинаковые результаты дают один ETag.
+
+Разобранные результаты кэшируются в памяти по ETag. Просмотр результата
+стоит одного чтения ETag по первичному ключу: при совпадении с
+If-None-Match ответ 304, иначе данные берутся из кэша или один раз
+читаются из базы.
+
+Альтернативы хранятся в порядке рейтинга, поэтому сохраненный результат
+служит отсортированным индексом: load_page отдает страницу рейтинга
+срезом столбцов, не собирая словари по всем альтернативам.
+"""
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from ranking import paginate
+
+# Сколько разобранных результатов держать в памяти
+MAX_CACHED_RESULTS = 256
+
+_cache: 'OrderedDict[str, _Entry]' = OrderedDict()
+_lock = threading.Lock()
+
+
+class _Entry:
+    # Столбцы из базы и собранный по ним полный результат (при первом запросе)
+    __slots__ = ('columns', 'results')
+
+    def __init__(self, columns: Dict[str, Any]):
+        self.columns = columns
+        self.results: Optional[Dict[str, Any]] = None
+
+
+def encode_results(results: Dict[str, Any]) -> bytes:
+    #Результат DecisionMaker -> сжатый JSON по столбцам
+    ranking = results['ranking']
+    criteria = list(results.get('criteria_weights', {}))
+    criteria_scores = results.get('criteria_scores', {})
+    payload = {
+        'alternatives': [name for name, _ in ranking],
+        'scores': [score for _, score in ranking],
+        'criteria': criteria,
+        # null — по критерию у альтернативы нет ни одной оценки
+        'criteria_scores': [[criteria_scores.get(name, {}).get(c) for c in criteria]
+                            for name, _ in ranking],
+        'criteria_weights': [results['criteria_weights'][c] for c in criteria],
+        'expert_weights': results.get('expert_weights', {}),
+        'method': results.get('method'),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(raw.encode('utf-8'), 6)
+
+
+def _decode_columns(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def decode_results(payload: bytes) -> Dict[str, Any]:
+    return _results_from_columns(_decode_columns(payload))
+
+
+def _results_from_columns(data: Dict[str, Any]) -> Dict[str, Any]:
+    ranking = list(zip(data['alternatives'], data['scores']))
+    criteria = data['criteria']
+    return {
+        'expert_weights': data['expert_weights'],
+        'criteria_weights': dict(zip(criteria, data['criteria_weights'])),
+        'final_scores': dict(ranking),
+        'criteria_scores': {
+            name: {c: v for c, v in zip(criteria, row) if v is not None}
+            for name, row in zip(data['alternatives'], data['criteria_scores'])
+        },
+        'ranking': ranking,
+        'method': data.get('method'),
+    }
+
+
+def _remember(etag: str, columns: Dict[str, Any]) -> _Entry:
+    entry = _Entry(columns)
+    with _lock:
+        _cache[etag] = entry
+        _cache.move_to_end(etag)
+        while len(_cache) > MAX_CACHED_RESULTS:
+            _cache.popitem(last=False)
+    return entry
+
+
+def save_result(request_id: int, results: Dict[str, Any]) -> str:
+    #Сохранение (замена) результата запроса; возвращает новый ETag
+    from app import db, RequestResult
+
+    payload = encode_results(results)
+    etag = hashlib.sha256(payload).hexdigest()[:32]
+    db.session.merge(RequestResult(request_id=request_id, etag=etag, payload=payload,
+                                   computed_at=datetime.utcnow()))
+    db.session.commit()
+    _remember(etag, _decode_columns(payload))
+    return etag
+
+
+def current_etag(request_id: int) -> Optional[str]:
+    from app import db, RequestResult
+
+    return db.session.query(RequestResult.etag).filter(RequestResult.request_id == request_id).scalar()
+
+
+def load_result(request_id: int, etag: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """ETag и результат запроса или None, если результат не рассчитан.
+
+    Если ETag уже прочитан вызывающим, его можно передать, чтобы не
+    читать его повторно.
+    """
+    found = _load_entry(request_id, etag)
+    if found is None:
+        return None
+    etag, entry = found
+    if entry.results is None:
+        entry.results = _results_from_columns(entry.columns)
+    return etag, entry.results
+
+
+def load_page(request_id: int,
+              number: int,
+              size: int,
+              etag: Optional[str] = None,
+              top: Optional[int] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """ETag и страница рейтинга (ranking.Page, строки рейтинга,
+    критерии и оценки по критериям только для альтернатив страницы)
+    или None, если результат не рассчитан. top — страницы только по
+    первым top местам."""
+    found = _load_entry(request_id, etag)
+    if found is None:
+        return None
+    etag, entry = found
+    data = entry.columns
+    total = len(data['alternatives'])
+    page = paginate(total if top is None else min(top, total), number, size)
+    names = data['alternatives'][page.start:page.end]
+    criteria = data['criteria']
+    return etag, {
+        'page': page,
+        'ranking': list(zip(names, data['scores'][page.start:page.end])),
+        'criteria': criteria,
+        'criteria_scores': {
+            name: {c: v for c, v in zip(criteria, row) if v is not None}
+            for name, row in zip(names, data['criteria_scores'][page.start:page.end])
+        },
+        'method': data.get('method'),
+    }
+
+
+def _load_entry(request_id: int, etag: Optional[str] = None) -> Optional[Tuple[str, _Entry]]:
+    from app import db, RequestResult
+
+    etag = etag or current_etag(request_id)
+    if etag is None:
+        return None
+    with _lock:
+        entry = _cache.get(etag)
+        if entry is not None:
+            _cache.move_to_end(etag)
+            return etag, entry
+
+    row = db.session.query(RequestResult.etag, RequestResult.payload) \
+        .filter(RequestResult.request_id == request_id).first()
+    if row is None:
+        return None
+    return row.etag, _remember(row.etag, _decode_columns(row.payload))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
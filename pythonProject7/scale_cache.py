@@ -0,0 +1,58 @@
+"""Кэш разобранных шкал (Scale.values хранится строкой через ';')."""
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from compiled_scales import CompiledScale, compile_scale
+
+
+class ParsedScale(NamedTuple):
+    type: str
+    values: List[str]
+    min_val: Optional[float]
+    max_val: Optional[float]
+    index: Dict[str, int]  # значение шкалы -> позиция
+    compiled: CompiledScale  # оценки позиций (compiled_scales.py)
+
+
+# scale.id -> ((type, values), ParsedScale)
+_cache: Dict[int, Tuple[Tuple[str, str], ParsedScale]] = {}
+_lock = threading.Lock()
+
+
+def _parse(scale_type: str, raw_values: str) -> ParsedScale:
+    values = raw_values.split(';')
+    # Лингвистические значения хранятся с номерами 1..n, как scale_index + 1
+    compiled = compile_scale(scale_type, values, ordinal=True)
+    if scale_type == 'numeric':
+        min_val, max_val = float(compiled.points.min()), float(compiled.points.max())
+    else:
+        # Нечеткие числа из записи 'метка(l, m, u)' в форму не попадают
+        values = compiled.labels
+        min_val = max_val = None
+    return ParsedScale(scale_type, values, min_val, max_val,
+                       {v: i for i, v in enumerate(values)}, compiled)
+
+
+def parsed_scale(scale) -> ParsedScale:
+    """Разобранная шкала из кэша процесса.
+
+    Запись проверяется по типу и строке значений, поэтому шкала,
+    измененная в другом процессе, будет разобрана заново.
+    """
+    signature = (scale.type, scale.values)
+    entry = _cache.get(scale.id)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    parsed = _parse(scale.type, scale.values)
+    with _lock:
+        _cache[scale.id] = (signature, parsed)
+    return parsed
+
+
+def invalidate(scale_id: Optional[int] = None):
+    #Сброс одной шкалы или всего кэша
+    with _lock:
+        if scale_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(scale_id, None)
@@ -0,0 +1,288 @@
+"""Анализ чувствительности рейтинга к весам критериев методом Монте-Карло.
+
+Векторы весов выбираются случайно:
+  dirichlet — из распределения Дирихле: равномерно по симплексу или, при
+              заданной concentration, вокруг исходных весов;
+  perturb   — исходные веса, каждый из которых умножен на случайный
+              множитель из [1 - spread, 1 + spread].
+Все векторы пачки оцениваются одним матричным произведением по готовой
+матрице решений (mcdm.DecisionMatrix) без повторной агрегации. По
+распределению мест считаются вероятность смены места, вероятность
+первого места, интервал мест и вероятность перестановки соседних по
+исходному рейтингу альтернатив.
+
+Пачки выборок имеют фиксированный размер и собственные зерна, поэтому
+результат не зависит от числа процессов (workers).
+
+Пример запуска:
+    python sensitivity.py input.json --samples 100000 --sampling perturb --spread 0.3 --workers 4
+"""
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mcdm import DecisionMatrix, METHOD_WEIGHTED_SUM, ahp_priorities
+
+SAMPLING_DIRICHLET = 'dirichlet'
+SAMPLING_PERTURB = 'perturb'
+SAMPLINGS = (SAMPLING_DIRICHLET, SAMPLING_PERTURB)
+
+# Выборок в одной пачке (единица работы процесса и зерна генератора)
+CHUNK_SAMPLES = 10000
+# Шаг разведения равных оценок по исходному рейтингу (см. _ranks)
+TIE_STEP = 1e-12
+# Ограничение на число элементов промежуточного тензора VIKOR (выборки × альтернативы × критерии)
+MAX_BLOCK_ELEMENTS = 1 << 22
+
+
+def sample_weights(base: np.ndarray,
+                   count: int,
+                   rng: np.random.Generator,
+                   sampling: str = SAMPLING_DIRICHLET,
+                   spread: float = 0.2,
+                   concentration: Optional[float] = None) -> np.ndarray:
+    #Матрица (count × критерии) весов с суммой 1 в каждой строке
+    if sampling == SAMPLING_DIRICHLET:
+        if concentration is None:
+            alpha = np.ones(len(base))
+        else:
+            # Малая добавка: нулевой вес недопустим как параметр Дирихле
+            alpha = base / base.sum() * concentration + 1e-6
+        return rng.dirichlet(alpha, size=count)
+    if sampling == SAMPLING_PERTURB:
+        weights = base * rng.uniform(1.0 - spread, 1.0 + spread, size=(count, len(base)))
+        return weights / weights.sum(axis=1, keepdims=True)
+    raise ValueError(f"Неизвестный способ выборки: {sampling}. Доступны: {', '.join(SAMPLINGS)}")
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator != 0)
+
+
+class _Scorer:
+    """Оценки альтернатив для пачки векторов весов выбранным методом.
+
+    Все, что не зависит от весов, считается один раз в конструкторе.
+    """
+
+    def __init__(self, matrix: DecisionMatrix, method: str, options: Optional[Dict[str, Any]] = None):
+        self.method = method
+        values = matrix.values
+        if method == METHOD_WEIGHTED_SUM:
+            self.linear = matrix.oriented
+        elif method == 'ahp':
+            oriented = matrix.oriented
+            self.linear = _safe_divide(oriented, oriented.sum(axis=0))
+        elif method == 'topsis':
+            # Веса положительны, поэтому идеал взвешенной матрицы — взвешенный идеал
+            normalized = _safe_divide(values, np.sqrt((values ** 2).sum(axis=0)))
+            best = np.where(matrix.cost, normalized.min(axis=0), normalized.max(axis=0))
+            worst = np.where(matrix.cost, normalized.max(axis=0), normalized.min(axis=0))
+            self.to_best = (normalized - best) ** 2
+            self.to_worst = (normalized - worst) ** 2
+        elif method == 'vikor':
+            best = np.where(matrix.cost, values.min(axis=0), values.max(axis=0))
+            worst = np.where(matrix.cost, values.max(axis=0), values.min(axis=0))
+            self.gap = _safe_divide(best - values, best - worst)
+            self.v = (options or {}).get('v', 0.5)
+        else:
+            raise ValueError(f"Метод {method} не поддерживает пакетный анализ чувствительности")
+
+    def reorder(self, columns: np.ndarray):
+        #Перестановка альтернатив: оценки сразу выдаются в порядке columns
+        for name in ('linear', 'to_best', 'to_worst', 'gap'):
+            if hasattr(self, name):
+                setattr(self, name, getattr(self, name)[columns])
+
+    def __call__(self, weights: np.ndarray) -> np.ndarray:
+        #(выборки × критерии) -> (выборки × альтернативы), больше — лучше
+        if self.method in (METHOD_WEIGHTED_SUM, 'ahp'):
+            return weights @ self.linear.T
+        if self.method == 'topsis':
+            # d² = Σ w²·(r - идеал)² — линейно по квадратам весов
+            squared = weights ** 2
+            to_best = np.sqrt(squared @ self.to_best.T)
+            to_worst = np.sqrt(squared @ self.to_worst.T)
+            return _safe_divide(to_worst, to_best + to_worst)
+        # VIKOR: max по критериям требует блока (выборки × альтернативы × критерии)
+        alternatives, criteria = self.gap.shape
+        step = max(1, MAX_BLOCK_ELEMENTS // max(1, alternatives * criteria))
+        scores = np.empty((len(weights), alternatives))
+        for start in range(0, len(weights), step):
+            block = weights[start:start + step]
+            group = block @ self.gap.T
+            individual = (block[:, np.newaxis, :] * self.gap[np.newaxis, :, :]).max(axis=2)
+            q = self.v * _safe_divide(group - group.min(axis=1, keepdims=True), np.ptp(group, axis=1, keepdims=True)) \
+                + (1 - self.v) * _safe_divide(individual - individual.min(axis=1, keepdims=True),
+                                              np.ptp(individual, axis=1, keepdims=True))
+            scores[start:start + len(block)] = 1.0 - q
+        return scores
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """Места (с нуля) по убыванию оценки; при равенстве выше альтернатива,
+    стоящая левее, т.е. выше в исходном рейтинге.
+
+    Вместо устойчивой сортировки (в несколько раз медленнее) к ключу
+    добавляется сдвиг TIE_STEP на номер столбца: оценки, отличающиеся
+    меньше чем на TIE_STEP × число альтернатив, считаются равными.
+    """
+    keys = np.arange(scores.shape[1]) * TIE_STEP - scores
+    order = np.argsort(keys, axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[1])[np.newaxis, :], axis=1)
+    return ranks
+
+
+def _simulate_chunk(scorer: _Scorer,
+                    base: np.ndarray,
+                    count: int,
+                    seed: np.random.SeedSequence,
+                    sampling: str,
+                    spread: float,
+                    concentration: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Гистограмма мест (альтернативы × места) и число перестановок
+    соседних пар для одной пачки; выполняется и в дочернем процессе."""
+    rng = np.random.default_rng(seed)
+    weights = sample_weights(base, count, rng, sampling, spread, concentration)
+    # Оценки уже упорядочены по исходному рейтингу (_Scorer.reorder)
+    ranks = _ranks(scorer(weights))
+    size = ranks.shape[1]
+    swaps = (ranks[:, 1:] < ranks[:, :-1]).sum(axis=0)
+    # Номер ячейки гистограммы: альтернатива × size + место
+    ranks += np.arange(0, size * size, size)
+    histogram = np.bincount(ranks.ravel(), minlength=size * size).reshape(size, size)
+    return histogram, swaps
+
+
+def _rank_quantile(cumulative: np.ndarray, share: float) -> np.ndarray:
+    #Место (с единицы), на котором накопленная доля выборок достигает share
+    return np.argmax(cumulative >= share - 1e-12, axis=1) + 1
+
+
+def analyze(matrix: DecisionMatrix,
+            method: str = METHOD_WEIGHTED_SUM,
+            method_options: Optional[Dict[str, Any]] = None,
+            samples: int = 10000,
+            sampling: str = SAMPLING_DIRICHLET,
+            spread: float = 0.2,
+            concentration: Optional[float] = None,
+            interval: float = 0.9,
+            seed: Optional[int] = None,
+            workers: Optional[int] = None,
+            chunk_samples: int = CHUNK_SAMPLES) -> Dict[str, Any]:
+    """Распределение мест альтернатив при случайных весах критериев.
+
+    workers > 1 — пачки считаются в пуле процессов. interval — доля
+    выборок, покрываемая интервалом мест (по умолчанию 5-95%).
+    """
+    if samples < 1:
+        raise ValueError("Число выборок должно быть положительным")
+    if sampling not in SAMPLINGS:
+        raise ValueError(f"Неизвестный способ выборки: {sampling}. Доступны: {', '.join(SAMPLINGS)}")
+    if not 0 <= spread < 1:
+        raise ValueError("Разброс весов должен быть в [0, 1)")
+    if not 0 < interval <= 1:
+        raise ValueError("Уровень интервала должен быть в (0, 1]")
+    alternatives = matrix.alternatives
+    if not alternatives:
+        raise ValueError("Нет альтернатив с оценками")
+
+    comparisons = (method_options or {}).get('comparisons')
+    if method == 'ahp' and comparisons is not None:
+        base, _ = ahp_priorities(comparisons)
+    else:
+        base = matrix.normalized_weights()
+    scorer = _Scorer(matrix, method, method_options)
+    base_scores = scorer(base[np.newaxis, :])[0]
+    # Исходный рейтинг по неокругленным оценкам
+    columns = np.argsort(-base_scores, kind='stable')
+    scorer.reorder(columns)
+
+    counts = [min(chunk_samples, samples - start) for start in range(0, samples, chunk_samples)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    args = (sampling, spread, concentration)
+    if workers and workers > 1 and len(counts) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_simulate_chunk, *zip(*[
+                (scorer, base, count, chunk_seed) + args
+                for count, chunk_seed in zip(counts, seeds)])))
+    else:
+        parts = [_simulate_chunk(scorer, base, count, chunk_seed, *args)
+                 for count, chunk_seed in zip(counts, seeds)]
+    histogram = sum(part[0] for part in parts)
+    swaps = sum(part[1] for part in parts)
+
+    size = len(columns)
+    positions = np.arange(1, size + 1)
+    shares = histogram / samples
+    cumulative = np.cumsum(shares, axis=1)
+    tail = (1.0 - interval) / 2
+    low = _rank_quantile(cumulative, tail if tail > 0 else 1e-12)
+    high = _rank_quantile(cumulative, 1.0 - tail)
+    occupied = histogram > 0
+    report = []
+    for k, alt_pos in enumerate(columns):
+        report.append({
+            'alternative': alternatives[alt_pos],
+            'base_rank': k + 1,
+            'base_score': round(float(base_scores[alt_pos]), 4),
+            'mean_rank': round(float(shares[k] @ positions), 4),
+            'p_rank_change': round(float(1.0 - shares[k, k]), 4),
+            'p_top': round(float(shares[k, 0]), 4),
+            'rank_interval': [int(low[k]), int(high[k])],
+            'rank_range': [int(np.argmax(occupied[k])) + 1, int(size - np.argmax(occupied[k][::-1]))],
+        })
+    reversals = [{
+        'higher': alternatives[columns[k]],
+        'lower': alternatives[columns[k + 1]],
+        'probability': round(float(swaps[k] / samples), 4),
+    } for k in range(size - 1)]
+    return {
+        'method': method,
+        'samples': samples,
+        'sampling': sampling,
+        'spread': spread if sampling == SAMPLING_PERTURB else None,
+        'concentration': concentration if sampling == SAMPLING_DIRICHLET else None,
+        'interval': interval,
+        'seed': seed,
+        'base_weights': dict(zip(matrix.criteria, np.round(base, 4).tolist())),
+        'alternatives': report,
+        'reversals': reversals,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    from data_parser import parse_input
+    from decision_maker import DecisionMaker
+
+    parser = argparse.ArgumentParser(description="Чувствительность рейтинга к весам критериев")
+    parser.add_argument('input', help="Входной JSON-файл")
+    parser.add_argument('--method', default=METHOD_WEIGHTED_SUM)
+    parser.add_argument('--samples', type=int, default=10000)
+    parser.add_argument('--sampling', choices=SAMPLINGS, default=SAMPLING_DIRICHLET)
+    parser.add_argument('--spread', type=float, default=0.2, help="разброс весов для perturb")
+    parser.add_argument('--concentration', type=float, default=None,
+                        help="концентрация Дирихле вокруг исходных весов (без нее — равномерно)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None, help="Число процессов")
+    parser.add_argument('--output', default='sensitivity.json', help="Файл отчета")
+    args = parser.parse_args(argv)
+
+    maker = DecisionMaker(parse_input(Path(args.input)), method=args.method)
+    report = maker.sensitivity(samples=args.samples, sampling=args.sampling, spread=args.spread,
+                               concentration=args.concentration, seed=args.seed, workers=args.workers)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    for item in report['alternatives']:
+        print(f"[INFO] {item['base_rank']}. {item['alternative']}: смена места {item['p_rank_change']:.1%}, "
+              f"места {item['rank_interval'][0]}-{item['rank_interval'][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Бэкенды решателя для /send_decision.
+
+inprocess — расчет DecisionMaker в процессе приложения: задача строится
+прямо из таблиц Request/Rating (RatingStore.from_db), без файлов и
+сетевого обращения; при параметрах расчета по умолчанию рейтинг берется
+из инкрементального состояния запроса (incremental_scoring.py).
+
+http — прежний внешний решатель: через SolverClient ему отправляется
+decision_input.json или, для запроса, задача из тех же таблиц в
+формате input.json (RatingStore.to_input).
+
+Оба бэкенда принимают id запроса (или None для задачи из
+decision_input.json) и возвращают полный результат в формате
+DecisionMaker.calculate: сохраняется весь рейтинг, а число мест
+ограничивается только при просмотре и выгрузке. Ответ внешнего решателя (список
+{'alternative': ..., 'score': ...}) приводится к тому же формату.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from data_parser import parse_input
+import incremental_scoring
+from rating_store import RatingStore
+import result_cache
+from solver_client import SolverClient, SolverError, SolverJobs
+
+DEFAULT_INPUT_PATH = "decision_input.json"
+
+
+def ranking_items(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    #Рейтинг в формате ответа внешнего решателя
+    return [{'alternative': name, 'score': score} for name, score in results['ranking']]
+
+
+def results_from_items(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Внешний решатель возвращает только рейтинг
+    ranking = [(item['alternative'], item['score']) for item in items]
+    return {
+        'expert_weights': {},
+        'criteria_weights': {},
+        'final_scores': dict(ranking),
+        'criteria_scores': {},
+        'ranking': ranking,
+    }
+
+
+class SolverBackend:
+    name = ''
+
+    def solve(self, request_id: Optional[int] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class HttpSolverBackend(SolverBackend):
+    name = 'http'
+
+    def __init__(self, client: SolverClient, input_path: str = DEFAULT_INPUT_PATH):
+        self.client = client
+        self.input_path = input_path
+
+    def solve(self, request_id: Optional[int] = None) -> Dict[str, Any]:
+        if request_id is None:
+            with open(self.input_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            from app import app
+
+            # Решателю отправляются оценки именно этого запроса
+            with app.app_context():
+                store = RatingStore.from_db(request_id)
+            if not len(store):
+                raise SolverError(f"У запроса {request_id} нет оценок")
+            data = store.to_input()
+        try:
+            return results_from_items(self.client.solve(data))
+        except (KeyError, TypeError) as e:
+            raise SolverError(f"Неожиданный ответ решателя: {e}") from e
+
+
+class InProcessSolverBackend(SolverBackend):
+    name = 'inprocess'
+
+    def __init__(self, input_path: str = DEFAULT_INPUT_PATH):
+        self.input_path = input_path
+
+    def solve(self, request_id: Optional[int] = None) -> Dict[str, Any]:
+        try:
+            if request_id is None:
+                results = result_cache.cached_calculate(parse_input(Path(self.input_path)))
+            else:
+                from app import app, score_state_enabled
+
+                # Бэкенд вызывается и из фоновых потоков, где нет контекста приложения
+                with app.app_context():
+                    if score_state_enabled():
+                        results = incremental_scoring.request_results(request_id)
+                        if not results['ranking']:
+                            raise SolverError(f"У запроса {request_id} нет оценок")
+                        return results
+                    store = RatingStore.from_db(request_id)
+                if not len(store):
+                    raise SolverError(f"У запроса {request_id} нет оценок")
+                results = result_cache.cached_calculate(store, request_id=request_id)
+        except SolverError:
+            raise
+        except Exception as e:
+            raise SolverError(str(e)) from e
+        return results
+
+
+BACKENDS = {
+    HttpSolverBackend.name: HttpSolverBackend,
+    InProcessSolverBackend.name: InProcessSolverBackend,
+}
+
+default_backend: SolverBackend = InProcessSolverBackend()
+default_jobs = SolverJobs(default_backend)
+
+
+def make_backend(name: str, client: Optional[SolverClient] = None,
+                 input_path: str = DEFAULT_INPUT_PATH) -> SolverBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд решателя: {name}. Доступны: {', '.join(BACKENDS)}")
+    if name == HttpSolverBackend.name:
+        return HttpSolverBackend(client or SolverClient(), input_path)
+    return InProcessSolverBackend(input_path)
+
+
+def configure(name: str = InProcessSolverBackend.name,
+              client: Optional[SolverClient] = None,
+              workers: int = 4) -> SolverBackend:
+    global default_backend, default_jobs
+    default_jobs.shutdown(wait=False)
+    default_backend = make_backend(name, client)
+    default_jobs = SolverJobs(default_backend, workers)
+    return default_backend
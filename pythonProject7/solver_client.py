@@ -0,0 +1,151 @@
+"""Клиент внешнего решателя с пулом соединений и фоновыми заданиями.
+
+SolverClient держит одну requests.Session с пулом keep-alive соединений,
+таймаутами на подключение и чтение и повторами с экспоненциальной
+задержкой. SolverJobs выполняет обращения к решателю в пуле потоков:
+маршрут ставит задание в очередь и сразу отвечает, а состояние
+задания затем опрашивается по его id.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_URL = "http://127.0.0.1:1234/api/v1/make-decision"
+
+# Состояния фонового задания
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Сколько завершенных заданий хранится для опроса
+MAX_FINISHED_JOBS = 1000
+
+
+class SolverError(Exception):
+    """Решатель недоступен или вернул ошибку."""
+
+
+class SolverClient:
+    def __init__(self,
+                 url: str = DEFAULT_URL,
+                 connect_timeout: float = 3.0,
+                 read_timeout: float = 60.0,
+                 retries: int = 3,
+                 backoff: float = 0.5,
+                 pool_size: int = 10):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        # Повторы при обрыве соединения и ответах 502/503/504;
+        # задержка между попытками: backoff * 2 ** (номер попытки - 1)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'POST'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def solve(self, data: Dict[str, Any]) -> Any:
+        #Отправка задачи решателю и разбор ответа
+        try:
+            response = self.session.post(self.url, json=data, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise SolverError(str(e)) from e
+
+    def close(self):
+        self.session.close()
+
+
+class SolverJobs:
+    """Очередь заданий решателю, выполняемых в пуле потоков.
+
+    solver — любой объект с методом solve(payload): SolverClient или
+    бэкенд из solver_backends. on_done вызывается в рабочем потоке с
+    результатом решателя; его исключение переводит задание в состояние
+    failed.
+    """
+
+    def __init__(self, solver, workers: int = 4):
+        self.solver = solver
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='solver')
+        self._jobs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, payload: Any,
+               on_done: Optional[Callable[[Any], None]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'state': JOB_PENDING,
+                'payload': payload,
+                'result': None,
+                'error': None,
+                'submitted_at': time.time(),
+                'finished_at': None,
+            }
+            self._trim()
+        self._executor.submit(self._run, job_id, payload, on_done)
+        return job_id
+
+    def _run(self, job_id: str, payload: Any, on_done):
+        self._update(job_id, state=JOB_RUNNING)
+        try:
+            result = self.solver.solve(payload)
+            if on_done is not None:
+                on_done(result)
+        except Exception as e:
+            self._update(job_id, state=JOB_FAILED, error=str(e), finished_at=time.time())
+            return
+        self._update(job_id, state=JOB_DONE, result=result, finished_at=time.time())
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _trim(self):
+        # Удаляются самые старые завершенные задания сверх лимита
+        finished = [k for k, job in self._jobs.items() if job['state'] in (JOB_DONE, JOB_FAILED)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+default_client = SolverClient()
+
+
+def configure(url: str = DEFAULT_URL,
+              connect_timeout: float = 3.0,
+              read_timeout: float = 60.0,
+              retries: int = 3,
+              backoff: float = 0.5,
+              pool_size: int = 10) -> SolverClient:
+    global default_client
+    default_client.close()
+    default_client = SolverClient(url, connect_timeout, read_timeout, retries, backoff, pool_size)
+    return default_client
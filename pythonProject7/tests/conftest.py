@@ -0,0 +1,70 @@
+"""Общие фикстуры: приложение на временной базе и каталогах.
+
+Переменные окружения задаются до импорта app, потому что настройки
+читаются при импорте модуля.
+"""
+import os
+import tempfile
+
+import pytest
+
+TMP_DIR = tempfile.mkdtemp(prefix='kursach-tests-')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(TMP_DIR, 'test.db'))
+os.environ.setdefault('EXPORT_DIR', os.path.join(TMP_DIR, 'exports'))
+os.environ.setdefault('PROFILE_DIR', os.path.join(TMP_DIR, 'profiles'))
+os.environ.setdefault('METRICS_ENABLED', '0')
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    from app import app, init_database
+    app.config['TESTING'] = True
+    with app.app_context():
+        init_database()
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def make_request(flask_app):
+    """Фабрика запросов в тестовой базе: менеджер, числовая шкала 1..5,
+    эксперты, критерии и альтернативы с заданными именами."""
+    from app import Alternative, Criterion, Expert, Manager, Request, Scale, db
+
+    def make(alternatives=('A', 'B', 'C'), criteria=('K1', 'K2'), experts=('E1',), values='1;2;3;4;5'):
+        with flask_app.app_context():
+            number = Request.query.count() + 1
+            manager = Manager(username=f'manager{number}', password_hash='-')
+            scale = Scale(name=f'scale{number}', type='numeric', values=values)
+            req = Request(name=f'Запрос {number}', access_code=f'{10000 + number}', manager=manager)
+            req.experts = [Expert(name=name) for name in experts]
+            req.alternatives = [Alternative(name=name) for name in alternatives]
+            req.criteria = [Criterion(name=name, scale=scale) for name in criteria]
+            db.session.add(req)
+            db.session.commit()
+            return {
+                'id': req.id,
+                'manager_id': manager.id,
+                'access_code': req.access_code,
+                'experts': {e.name: e.id for e in req.experts},
+                'alternatives': {a.name: a.id for a in req.alternatives},
+                'criteria': {c.name: c.id for c in req.criteria},
+            }
+    return make
+
+
+@pytest.fixture
+def submit_ratings(client):
+    """Вход эксперта по коду доступа и отправка формы оценивания;
+    values — {(альтернатива, критерий): значение}."""
+    def submit(req, expert, values):
+        client.post('/expert', data={'name': expert, 'psw': req['access_code']})
+        form = {f"rating_{req['alternatives'][alt]}_{req['criteria'][crit]}": str(value)
+                for (alt, crit), value in values.items()}
+        response = client.post('/expert_assessment', data=form)
+        assert response.headers['Location'].endswith('/expert_finish')
+    return submit
@@ -0,0 +1,43 @@
+"""Повторяющиеся имена альтернатив, критериев и экспертов отвергаются,
+а не сливаются в одну строку матрицы."""
+import pytest
+
+import incremental_scoring
+import solver_backends
+from rating_store import RatingStore
+from solver_client import SolverError
+
+CRITERION = {'name': 'K', 'type': 'numeric', 'weight': 1, 'scale': [1, 2, 3]}
+
+
+@pytest.mark.parametrize('alternatives, criteria, experts', [
+    (['A', 'A'], [CRITERION], ['E']),
+    (['A', 'B'], [CRITERION, dict(CRITERION)], ['E']),
+    (['A', 'B'], [CRITERION], ['E', 'E']),
+])
+def test_rating_store_rejects_duplicates(alternatives, criteria, experts):
+    with pytest.raises(ValueError, match='Повторяющиеся имена'):
+        RatingStore(alternatives, criteria, experts)
+
+
+def test_request_with_duplicate_alternatives(flask_app, make_request):
+    req = make_request(alternatives=('Дом', 'Дом'), criteria=('K1',), experts=('E1',))
+    with flask_app.app_context():
+        with pytest.raises(ValueError, match='Дом'):
+            RatingStore.from_db(req['id'])
+        with pytest.raises(ValueError, match='Дом'):
+            incremental_scoring.IncrementalScore.build(req['id'])
+    with pytest.raises(SolverError, match='Дом'):
+        solver_backends.InProcessSolverBackend().solve(req['id'])
+
+
+def test_manager_form_rejects_duplicate_alternatives(flask_app, client, make_request):
+    from app import Alternative
+
+    req = make_request(alternatives=(), criteria=('K1',), experts=('E1',))
+    with client.session_transaction() as session:
+        session['request_data'] = {'request_id': req['id'], 'num_alternatives': 2}
+    response = client.post('/manager_request_alternatives', data={'alt_0': 'Дом', 'alt_1': 'Дом'})
+    assert response.headers['Location'].endswith('/manager_request_alternatives')
+    with flask_app.app_context():
+        assert Alternative.query.filter_by(request_id=req['id']).count() == 0
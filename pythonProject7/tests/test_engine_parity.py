@@ -0,0 +1,57 @@
+"""Векторизованный и эталонный режимы DecisionMaker дают одинаковые
+оценки и рейтинг на случайных задачах."""
+import random
+
+import pytest
+
+from data_parser import InputData
+from decision_maker import ENGINE_REFERENCE, ENGINE_VECTORIZED, DecisionMaker
+from mcdm import round_half_up
+
+LABELS = ['плохо', 'средне', 'хорошо', 'отлично']
+
+
+def random_problem(rng: random.Random) -> InputData:
+    alternatives = [f'A{i}' for i in range(rng.randint(2, 12))]
+    experts = [f'E{i}' for i in range(rng.randint(1, 7))]
+    criteria = []
+    for j in range(rng.randint(1, 6)):
+        if rng.random() < 0.25:
+            criterion = {'name': f'C{j}', 'type': 'linguistic', 'scale': LABELS}
+        else:
+            criterion = {'name': f'C{j}', 'type': 'numeric', 'scale': list(range(1, rng.choice([3, 5, 7, 10]) + 1))}
+        # Целые и дробные веса, часть критериев — стоимостные
+        criterion['weight'] = rng.choice([rng.randint(1, 5), round(rng.uniform(0.05, 1), 3)])
+        if rng.random() < 0.3:
+            criterion['direction'] = 'cost'
+        criteria.append(criterion)
+    ratings = [
+        {'alternative': alt, 'criteria': c['name'], 'expert': expert, 'value': rng.choice(c['scale'])}
+        for alt in alternatives for c in criteria for expert in experts
+        if rng.random() < 0.8
+    ]
+    return InputData(alternatives=alternatives, criteria=criteria, experts=experts, ratings=ratings)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_engines_agree(seed):
+    data = random_problem(random.Random(seed))
+    reference = DecisionMaker(data, engine=ENGINE_REFERENCE).calculate()
+    vectorized = DecisionMaker(data, engine=ENGINE_VECTORIZED).calculate()
+
+    assert vectorized['final_scores'] == reference['final_scores']
+    assert vectorized['ranking'] == reference['ranking']
+    assert vectorized['criteria_weights'] == reference['criteria_weights']
+    assert all(type(w) is float for w in reference['criteria_weights'].values())
+    assert vectorized['criteria_scores'] == reference['criteria_scores']
+
+
+@pytest.mark.parametrize('value, digits, expected', [
+    (0.325, 2, 0.33),
+    (0.125, 2, 0.13),
+    (2.675, 2, 2.68),
+    (-0.325, 2, -0.33),
+    (0.12344999, 4, 0.1234),
+])
+def test_round_half_up(value, digits, expected):
+    assert round_half_up(value, digits) == expected
@@ -0,0 +1,57 @@
+"""Неудавшаяся выгрузка показывает ошибку и не перезапускается сама."""
+import time
+
+import pytest
+
+import export_jobs
+from solver_client import JOB_FAILED
+
+
+def wait_state(key, state, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = export_jobs.default_jobs.status(key)
+        if job is not None and job['state'] == state:
+            return job
+        if time.monotonic() > deadline:
+            pytest.fail(f"Задание {key} не перешло в {state}: {job}")
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    # Число запусков построения выгрузки
+    calls = []
+    original = export_jobs.ExportJobs._build
+
+    def counting(self, key):
+        calls.append(key)
+        return original(self, key)
+    monkeypatch.setattr(export_jobs.ExportJobs, '_build', counting)
+    return calls
+
+
+def test_failed_export_waits_for_retry(client, make_request, builds):
+    # У запроса нет оценок — построение выгрузки завершается ошибкой
+    req = make_request()
+    with client.session_transaction() as session:
+        session['manager_id'] = req['manager_id']
+    url = f"/manager_archive/{req['id']}/export/csv"
+    key = (req['id'], 0, 'csv', None)
+
+    client.get(url)
+    wait_state(key, JOB_FAILED)
+
+    for _ in range(3):
+        page = client.get(url).get_data(as_text=True)
+        assert 'нет оценок' in page
+        assert 'http-equiv="refresh"' not in page
+        assert 'retry=1' in page
+    assert len(builds) == 1
+    assert export_jobs.default_jobs.status(key)['state'] == JOB_FAILED
+
+    response = client.get(url + '?retry=1')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(url)
+    wait_state(key, JOB_FAILED)
+    assert len(builds) == 2
@@ -0,0 +1,37 @@
+"""Потоковые выгрузки StreamingExporter."""
+import zipfile
+
+import pytest
+
+from exporters import StreamingExporter
+
+RESULTS = {
+    'criteria_weights': {'K1': 1, 'K2': 0.5},
+    'expert_weights': {'E1': 1.0},
+    'final_scores': {'A': 0.9, 'B': 0.4},
+    # У первой альтернативы нет оценки по K2: столбец начинается с пустого значения
+    'criteria_scores': {'A': {'K1': 0.9}, 'B': {'K1': 0.2, 'K2': 0.4}},
+    'ranking': [('A', 0.9), ('B', 0.4)],
+}
+
+
+def test_parquet_schema(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = StreamingExporter(RESULTS).export(tmp_path / 'result.parquet')
+    with zipfile.ZipFile(path) as archive:
+        archive.extractall(tmp_path)
+
+    weights = pq.read_schema(tmp_path / 'criteria_weights.parquet')
+    assert [str(t) for t in weights.types] == ['string', 'double']
+    ranking = pq.read_schema(tmp_path / 'ranking.parquet')
+    assert [str(t) for t in ranking.types] == ['int64', 'string', 'double']
+    scores = pq.read_table(tmp_path / 'criteria_scores.parquet')
+    assert [str(t) for t in scores.schema.types] == ['string', 'double', 'double']
+    assert scores.column('K2').to_pylist() == [None, 0.4]
+
+
+def test_csv_export(tmp_path):
+    path = StreamingExporter(RESULTS, top=1).export(tmp_path / 'result.csv')
+    with zipfile.ZipFile(path) as archive:
+        ranking = archive.read('ranking.csv').decode('utf-8').splitlines()
+    assert ranking == ['Rank,Alternative,Final Score', '1,A,0.9']
@@ -0,0 +1,31 @@
+"""Методы mcdm на матрице с неоцененными ячейками."""
+import numpy as np
+import pytest
+
+from mcdm import METHODS, DecisionMatrix
+
+CRITERIA = [
+    {'name': 'Цена', 'type': 'numeric', 'weight': 1, 'scale': [1, 2, 3, 4, 5], 'direction': 'cost'},
+    {'name': 'Качество', 'type': 'numeric', 'weight': 1, 'scale': [1, 2, 3, 4, 5]},
+]
+
+
+def matrix_with_gap() -> DecisionMatrix:
+    # У C нет оценки по стоимостному критерию: ноль в матрице — не лучшая цена
+    values = np.array([[0.4, 0.6], [0.8, 0.6], [0.0, 0.6]])
+    rated = np.array([[True, True], [True, True], [False, True]])
+    return DecisionMatrix(['A', 'B', 'C'], CRITERIA, values, rated)
+
+
+@pytest.mark.parametrize('method', ['topsis', 'vikor'])
+def test_unrated_cell_is_not_ideal(method):
+    scores, _, _ = METHODS[method](matrix_with_gap())
+    a, b, c = scores.tolist()
+    assert a > b
+    assert c == b
+
+
+def test_topsis_ideal_ignores_unrated():
+    _, _, details = METHODS['topsis'](matrix_with_gap())
+    # A лучшая по цене среди оцененных и равна остальным по качеству
+    assert details['distance_to_ideal'][0] == 0
@@ -0,0 +1,60 @@
+"""Запуск python app.py: эксперт сдает оценки, решатель считает рейтинг,
+результат открывается по /decision_result/<id>."""
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(flask_app):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='0', SOLVER_ASYNC='0')
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            requests.get(url + '/about', timeout=1)
+            break
+        except requests.ConnectionError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.fail('Сервер не запустился: ' + process.stderr.read().decode(errors='replace'))
+            time.sleep(0.2)
+    yield url
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def test_submit_solve_view(server, make_request):
+    req = make_request(alternatives=('Alpha', 'Beta'), criteria=('K1',), experts=('Ivan',))
+    http = requests.Session()
+
+    response = http.post(server + '/expert', data={'name': 'Ivan', 'psw': req['access_code']})
+    assert response.url.endswith('/expert_assessment')
+
+    crit = req['criteria']['K1']
+    form = {f"rating_{req['alternatives']['Alpha']}_{crit}": '2',
+            f"rating_{req['alternatives']['Beta']}_{crit}": '5'}
+    response = http.post(server + '/expert_assessment', data=form)
+    assert response.url.endswith('/expert_finish')
+
+    response = http.post(server + '/send_decision', data={'request_id': req['id']})
+    assert response.status_code == 200
+    assert response.url.endswith(f"/decision_result/{req['id']}")
+    assert response.text.index('Beta') < response.text.index('Alpha')
@@ -0,0 +1,76 @@
+"""Состояние инкрементального пересчета помнит версию оценок запроса и
+перестраивается, если оценки менялись в обход него."""
+import pytest
+
+import incremental_scoring
+from decision_maker import DecisionMaker
+from rating_ingest import store_ratings
+from rating_store import RatingStore
+from scale_cache import parsed_scale
+
+
+def request_version(request_id):
+    from app import db, Request
+    return db.session.get(Request, request_id).ratings_version
+
+
+@pytest.fixture
+def rated_request(flask_app, make_request, submit_ratings):
+    req = make_request(alternatives=('A', 'B', 'C'), criteria=('K1', 'K2'), experts=('E1', 'E2'))
+    submit_ratings(req, 'E1', {('A', 'K1'): 5, ('B', 'K1'): 3, ('C', 'K2'): 4})
+    submit_ratings(req, 'E2', {('A', 'K2'): 1, ('B', 'K1'): 4, ('C', 'K1'): 2})
+    return req
+
+
+def test_state_tracks_ratings_version(flask_app, rated_request):
+    with flask_app.app_context():
+        state = incremental_scoring.IncrementalScore.load(rated_request['id'])
+        assert state is not None
+        assert state.ratings_version == request_version(rated_request['id']) == 2
+        assert state.check_consistency() == []
+
+
+def test_write_past_state_rebuilds(flask_app, rated_request):
+    from app import Criterion, db
+
+    request_id = rated_request['id']
+    with flask_app.app_context():
+        # Запись оценок без учета в состоянии (другой процесс, ручная правка)
+        criterion = db.session.get(Criterion, rated_request['criteria']['K2'])
+        store_ratings(request_id, rated_request['experts']['E1'],
+                      {(rated_request['alternatives']['B'], criterion.id): '5'},
+                      {criterion.id: parsed_scale(criterion.scale)})
+        assert incremental_scoring.IncrementalScore.load(request_id) is None
+
+        results = incremental_scoring.request_results(request_id)
+        expected = DecisionMaker(RatingStore.from_db(request_id)).calculate()
+        assert results['ranking'] == expected['ranking']
+        assert incremental_scoring.IncrementalScore.load(request_id).ratings_version == 3
+
+
+def test_version_gap_drops_state(flask_app, rated_request):
+    request_id = rated_request['id']
+    with flask_app.app_context():
+        state = incremental_scoring.IncrementalScore.load(request_id)
+        cell = (rated_request['alternatives']['A'], rated_request['criteria']['K1'])
+        incremental_scoring.record_submission(state, {cell: '1'}, {}, state.ratings_version + 2)
+        assert incremental_scoring.IncrementalScore.load(request_id) is None
+
+
+def test_check_scores_command(flask_app, rated_request):
+    runner = flask_app.test_cli_runner()
+    result = runner.invoke(args=['check-scores', str(rated_request['id'])])
+    assert result.exit_code == 0, result.output
+    assert 'согласовано' in result.output
+
+    # Порча сохраненных оценок: команда находит расхождение и перестраивает
+    with flask_app.app_context():
+        state = incremental_scoring.IncrementalScore.load(rated_request['id'])
+        state.scores += 1
+        state.save()
+    result = runner.invoke(args=['check-scores', str(rated_request['id'])])
+    assert result.exit_code == 1
+    result = runner.invoke(args=['check-scores', '--rebuild', str(rated_request['id'])])
+    assert result.exit_code == 0
+    result = runner.invoke(args=['check-scores', str(rated_request['id'])])
+    assert result.exit_code == 0, result.output
@@ -0,0 +1,39 @@
+"""Расчет с top сохраняет весь рейтинг; число мест ограничивает только просмотр."""
+import time
+
+import pytest
+
+import result_store
+
+NAMES = ('Первый', 'Второй', 'Третий', 'Четвертый')
+
+
+def shown(page):
+    return [name for name in NAMES if name in page]
+
+
+@pytest.mark.parametrize('solver_async', [False, True])
+def test_top_applies_to_view_only(flask_app, client, make_request, submit_ratings, monkeypatch, solver_async):
+    monkeypatch.setitem(flask_app.config, 'SOLVER_ASYNC', solver_async)
+    req = make_request(alternatives=NAMES, criteria=('K1',), experts=('E1',))
+    submit_ratings(req, 'E1', {(name, 'K1'): 5 - i for i, name in enumerate(NAMES)})
+
+    response = client.post('/send_decision', data={'request_id': req['id'], 'top': 1})
+    assert 'top=1' in response.headers['Location']
+    if solver_async:
+        # Страница задания перенаправляет на результат, когда решатель ответит
+        job_url = response.headers['Location']
+        deadline = time.monotonic() + 10
+        while (response := client.get(job_url)).status_code != 302:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert 'top=1' in response.headers['Location']
+    assert shown(client.get(response.headers['Location']).get_data(as_text=True)) == ['Первый']
+
+    with flask_app.app_context():
+        _, results = result_store.load_result(req['id'])
+    assert [name for name, _ in results['ranking']] == list(NAMES)
+
+    url = f"/decision_result/{req['id']}"
+    assert shown(client.get(url + '?top=0').get_data(as_text=True)) == list(NAMES)
+    assert shown(client.get(url + '?top=3').get_data(as_text=True)) == list(NAMES[:3])